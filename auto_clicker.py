@@ -1,58 +1,95 @@
 import sys
+import startup_profile
+
+# Time every import below when asked to
+if "--profile-startup" in sys.argv:
+    startup_profile.enable()
+
 import os
 import time
-import json
-import pyautogui
 import threading
-from PIL import ImageGrab, Image
+import multiprocessing
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtGui import QPixmap
+from engine import (DetectionEngine, EngineConfig, MAIN_REGION, ORDER_NEAREST, ORDER_READING,
+                    ORDER_SCORE, SETTINGS_PATH, ensure_snips_directory, target_entry)
+from settings_store import SettingsStore
+from status_channel import StatusChannel
+from capture import BACKEND_AUTO, BACKEND_NAMES, BACKEND_REPLAY, DeferredCapture, benchmark_backends
+from metrics import format_snapshot
+from matching import (MODE_FIRST_FOUND, MODE_BEST, NUMPY_AVAILABLE, OPENCV_AVAILABLE, IMAGE_COLOR,
+                      IMAGE_GRAY, IMAGE_CHANNEL, IMAGE_EDGES, METHOD_AKAZE, METHOD_ORB,
+                      METHOD_TEMPLATE, SCALE_MAX, SCALE_MIN, SCALE_STEPS,
+                      default_workers)
+from scheduler import CPU_BUDGET, MAX_INTERVAL, MIN_INTERVAL
+from process_pool import POOL_PROCESSES, POOL_THREADS, PROCESS_POOL_AVAILABLE
+from template_index import TEMPLATE_INDEX_AVAILABLE
+from features import method_available
 
-# Check if OpenCV is installed
-OPENCV_AVAILABLE = False
-try:
-    import cv2
-    OPENCV_AVAILABLE = True
-except ImportError:
-    print("OpenCV is not installed. The 'confidence' feature will not work.")
+# Check if OpenCV is installed, it is only imported once matching starts
+if not OPENCV_AVAILABLE:
+    if NUMPY_AVAILABLE:
+        print("OpenCV is not installed. Using slower NumPy matching instead.")
+    else:
+        print("OpenCV is not installed. The 'confidence' feature will not work.")
     print("To install OpenCV, run: pip install opencv-python")
 
 
-def ensure_snips_directory():
-    """Create the snips directory if it doesn't exist."""
-    if not os.path.exists("snips"):
-        os.makedirs("snips")
-        return True
-    return False
+# How often the window shows status updates from the search loop
+STATUS_REFRESH_MS = 50
+# How long the indicator shows a hit before going back to running
+FOUND_INDICATOR_MS = 500
 
 
 class App(QtWidgets.QMainWindow):
     decision_flag = False
-    stop_while = False
-    stop_for = False
 
     def __init__(self):
         super(App, self).__init__()
         # We don't create snips directory on startup anymore
         # It will be created when needed
         
-        # List of target images
+        # List of target images, dicts with the "path" and per-image options
         self.target_images = []
         self.current_selected_image = -1
         
+        # Saves settings in the background, a short while after the last change
+        self.settings_store = SettingsStore(SETTINGS_PATH, on_error=self.update_status)
+        # Set while load_settings() fills in the window, so nothing half-loaded is saved
+        self.loading_settings = False
+        
+        # Screen capture backend, chosen automatically until settings say otherwise
+        self.capture_backend_name = BACKEND_AUTO
+        self.replay_source = ""
+        
+        # Latest status from worker threads, shown by status_timer
+        self.status_channel = StatusChannel()
+        # Hits since the search was started
+        self.hit_count = 0
+        
+        # Search loop, runs on its own thread and reports back through callbacks
+        with startup_profile.step("engine"):
+            self.engine = DetectionEngine(
+                on_status=self.update_status,
+                on_found=self.on_image_found,
+                on_stopped=self.on_engine_stopped
+            )
+        
         # Timer for blinking stop button effect
         self.blink_timer = QtCore.QTimer()
         self.blink_timer.timeout.connect(self.blink_stop_button)
         self.blink_state = False
         
-        self.initUI()
+        with startup_profile.step("initUI"):
+            self.initUI()
         
         # Initialize initial status indicator
         self.status_indicator.setText("⚫")
         self.status_indicator.setStyleSheet("font-size: 20px; color: gray;")
         
         # Auto load settings at startup
-        self.load_settings()
+        with startup_profile.step("load_settings"):
+            self.load_settings()
 
     def initUI(self):
         self.setGeometry(300, 200, 400, 600)  # Increased height
@@ -78,6 +115,34 @@ class App(QtWidgets.QMainWindow):
         self.search_area_label.setStyleSheet("font-weight: bold;")
         self.screen_layout.addWidget(self.search_area_label)
         
+        # More named search areas, e.g. separate panels of a dashboard
+        self.regions_list_widget = QtWidgets.QListWidget()
+        self.regions_list_widget.setMaximumHeight(60)
+        self.screen_layout.addWidget(self.regions_list_widget)
+        
+        self.regions_buttons_layout = QtWidgets.QHBoxLayout()
+        self.add_region_btn = QtWidgets.QPushButton("Add Named Area")
+        self.add_region_btn.clicked.connect(self.activateSnippingForRegion)
+        self.remove_region_btn = QtWidgets.QPushButton("Remove Area")
+        self.remove_region_btn.clicked.connect(self.remove_selected_region)
+        self.regions_buttons_layout.addWidget(self.add_region_btn)
+        self.regions_buttons_layout.addWidget(self.remove_region_btn)
+        self.screen_layout.addLayout(self.regions_buttons_layout)
+        
+        # Capture backend selection
+        self.capture_layout = QtWidgets.QHBoxLayout()
+        self.capture_label = QtWidgets.QLabel("Capture method:")
+        self.capture_combo = QtWidgets.QComboBox(self)
+        for name in BACKEND_NAMES:
+            self.capture_combo.addItem(name, name)
+        self.capture_combo.currentIndexChanged.connect(self.update_capture_backend)
+        self.capture_speed_btn = QtWidgets.QPushButton("Test Speed")
+        self.capture_speed_btn.clicked.connect(self.test_capture_speed)
+        self.capture_layout.addWidget(self.capture_label)
+        self.capture_layout.addWidget(self.capture_combo)
+        self.capture_layout.addWidget(self.capture_speed_btn)
+        self.screen_layout.addLayout(self.capture_layout)
+        
         self.main_layout.addWidget(self.screen_group)
 
         # Target image selection
@@ -97,16 +162,72 @@ class App(QtWidgets.QMainWindow):
         
         self.image_layout.addLayout(self.image_buttons_layout)
 
-        # Image list
+        # Image list, unchecked images are not looked for
         self.images_list_widget = QtWidgets.QListWidget()
         self.images_list_widget.setMaximumHeight(100)
         self.images_list_widget.itemClicked.connect(self.on_image_selected)
+        self.images_list_widget.itemChanged.connect(self.update_image_enabled)
         self.image_layout.addWidget(self.images_list_widget)
         
         # Remove image button
         self.remove_image_btn = QtWidgets.QPushButton("Remove Selected Image")
         self.remove_image_btn.clicked.connect(self.remove_selected_image)
         self.image_layout.addWidget(self.remove_image_btn)
+        
+        # How the selected image is compared with the screen
+        self.image_mode_layout = QtWidgets.QHBoxLayout()
+        self.image_mode_label = QtWidgets.QLabel("Compare selected image using:")
+        self.image_mode_combo = QtWidgets.QComboBox(self)
+        self.image_mode_combo.addItem("Full color", IMAGE_COLOR)
+        self.image_mode_combo.addItem("Grayscale (faster)", IMAGE_GRAY)
+        self.image_mode_combo.addItem("Single channel (faster)", IMAGE_CHANNEL)
+        self.image_mode_combo.addItem("Edges (ignores color changes)", IMAGE_EDGES)
+        self.image_mode_combo.currentIndexChanged.connect(self.update_image_mode)
+        self.image_mode_layout.addWidget(self.image_mode_label)
+        self.image_mode_layout.addWidget(self.image_mode_combo)
+        self.image_layout.addLayout(self.image_mode_layout)
+        
+        # How the selected image is found, features also find rotated or partly covered targets
+        self.method_layout = QtWidgets.QHBoxLayout()
+        self.method_label = QtWidgets.QLabel("Find selected image by:")
+        self.method_combo = QtWidgets.QComboBox(self)
+        self.method_combo.addItem("Template matching", METHOD_TEMPLATE)
+        self.method_combo.addItem("ORB features (rotated, covered)", METHOD_ORB)
+        self.method_combo.addItem("AKAZE features (slower, more robust)", METHOD_AKAZE)
+        # Not every OpenCV build includes AKAZE, checked when the search starts to keep OpenCV out of startup
+        self.method_combo.currentIndexChanged.connect(self.update_method)
+        self.method_layout.addWidget(self.method_label)
+        self.method_layout.addWidget(self.method_combo)
+        self.image_layout.addLayout(self.method_layout)
+        
+        # Match order and re-click cooldown of the selected image
+        self.image_order_layout = QtWidgets.QHBoxLayout()
+        self.image_priority_label = QtWidgets.QLabel("Priority (higher first):")
+        self.image_priority_spinbox = QtWidgets.QSpinBox(self)
+        self.image_priority_spinbox.setRange(-99, 99)
+        self.image_priority_spinbox.setValue(0)
+        self.image_priority_spinbox.valueChanged.connect(self.update_image_order)
+        self.image_cooldown_label = QtWidgets.QLabel("Cooldown after click:")
+        self.image_cooldown_spinbox = QtWidgets.QDoubleSpinBox(self)
+        self.image_cooldown_spinbox.setRange(0.0, 3600.0)
+        self.image_cooldown_spinbox.setSingleStep(0.5)
+        self.image_cooldown_spinbox.setSuffix(" s")
+        self.image_cooldown_spinbox.setSpecialValueText("none")
+        self.image_cooldown_spinbox.setValue(0.0)
+        self.image_cooldown_spinbox.valueChanged.connect(self.update_image_order)
+        self.image_order_layout.addWidget(self.image_priority_label)
+        self.image_order_layout.addWidget(self.image_priority_spinbox)
+        self.image_order_layout.addWidget(self.image_cooldown_label)
+        self.image_order_layout.addWidget(self.image_cooldown_spinbox)
+        self.image_layout.addLayout(self.image_order_layout)
+        
+        # Search areas the selected image is looked for in, none checked means all
+        self.image_regions_label = QtWidgets.QLabel("Search selected image in (none checked = all areas):")
+        self.image_layout.addWidget(self.image_regions_label)
+        self.image_regions_list = QtWidgets.QListWidget()
+        self.image_regions_list.setMaximumHeight(60)
+        self.image_regions_list.itemChanged.connect(self.update_image_regions)
+        self.image_layout.addWidget(self.image_regions_list)
 
         # Image preview
         self.image_preview = QtWidgets.QLabel(self)
@@ -135,6 +256,41 @@ class App(QtWidgets.QMainWindow):
         self.return_mouse_checkbox.setChecked(True)
         self.options_layout.addWidget(self.return_mouse_checkbox)
         
+        # Dry run checkbox
+        self.dry_run_checkbox = QtWidgets.QCheckBox("Dry run (log clicks to snips/dry_run.log, don't move the mouse)")
+        self.dry_run_checkbox.setChecked(False)
+        self.options_layout.addWidget(self.dry_run_checkbox)
+        
+        # Debug frame dump checkbox
+        self.save_frames_checkbox = QtWidgets.QCheckBox("Save captured frames to snips/ (debug)")
+        self.save_frames_checkbox.setChecked(False)
+        self.options_layout.addWidget(self.save_frames_checkbox)
+        
+        # Region tracking checkbox
+        self.roi_tracking_checkbox = QtWidgets.QCheckBox("Search near last found position first")
+        self.roi_tracking_checkbox.setChecked(True)
+        self.roi_tracking_checkbox.toggled.connect(self.update_roi_tracking)
+        self.options_layout.addWidget(self.roi_tracking_checkbox)
+        
+        # Change detection checkbox
+        self.skip_unchanged_checkbox = QtWidgets.QCheckBox("Only re-match parts of the screen that changed")
+        self.skip_unchanged_checkbox.setChecked(True)
+        self.skip_unchanged_checkbox.toggled.connect(self.update_skip_unchanged)
+        self.options_layout.addWidget(self.skip_unchanged_checkbox)
+        
+        # Template index checkbox, for long lists of target images
+        self.index_templates_checkbox = QtWidgets.QCheckBox("Skip target images whose colors aren't on screen")
+        self.index_templates_checkbox.setChecked(False)
+        self.index_templates_checkbox.setEnabled(TEMPLATE_INDEX_AVAILABLE)
+        self.index_templates_checkbox.toggled.connect(self.update_index_templates)
+        self.options_layout.addWidget(self.index_templates_checkbox)
+        
+        # Reorder images of the same priority by how often and how quickly they are found
+        self.adaptive_order_checkbox = QtWidgets.QCheckBox("Match often found, quick to match images first")
+        self.adaptive_order_checkbox.setChecked(False)
+        self.adaptive_order_checkbox.toggled.connect(self.update_adaptive_order)
+        self.options_layout.addWidget(self.adaptive_order_checkbox)
+        
         # Install OpenCV button (shown if OpenCV is not installed)
         if not OPENCV_AVAILABLE:
             self.install_opencv_btn = QtWidgets.QPushButton("Install OpenCV (required for precision matching)")
@@ -173,12 +329,16 @@ class App(QtWidgets.QMainWindow):
         self.confidence_layout.addLayout(self.confidence_descriptions)
         
         # Add warning if OpenCV is not installed
-        if not OPENCV_AVAILABLE:
+        if not OPENCV_AVAILABLE and NUMPY_AVAILABLE:
+            self.opencv_warning = QtWidgets.QLabel("⚠️ OpenCV not installed. Using slower NumPy matching.")
+            self.opencv_warning.setStyleSheet("color: #FF8C00; font-style: italic;")
+            self.confidence_layout.addWidget(self.opencv_warning)
+        elif not OPENCV_AVAILABLE:
             self.opencv_warning = QtWidgets.QLabel("⚠️ OpenCV not installed. Precision control unavailable.")
             self.opencv_warning.setStyleSheet("color: #FF8C00; font-style: italic;")
             self.confidence_layout.addWidget(self.opencv_warning)
             
-            # Disable confidence slider if OpenCV is not installed
+            # Disable confidence slider if neither OpenCV nor NumPy is installed
             self.confidence_slider.setEnabled(False)
         
         self.control_layout.addLayout(self.confidence_layout)
@@ -209,7 +369,133 @@ class App(QtWidgets.QMainWindow):
         self.move_delay_layout.addWidget(self.move_delay_label)
         self.move_delay_layout.addWidget(self.move_delay_input)
         self.control_layout.addLayout(self.move_delay_layout)
-
+        
+        # Adaptive scan rate, replaces the fixed delay time when checked
+        self.adaptive_checkbox = QtWidgets.QCheckBox("Adaptive scan rate (search less often while nothing changes)")
+        self.adaptive_checkbox.setChecked(False)
+        self.adaptive_checkbox.toggled.connect(self.update_adaptive_rate)
+        self.control_layout.addWidget(self.adaptive_checkbox)
+        
+        self.adaptive_layout = QtWidgets.QHBoxLayout()
+        self.min_interval_label = QtWidgets.QLabel("Min (s):")
+        self.min_interval_input = QtWidgets.QLineEdit(self)
+        self.min_interval_input.setText(str(MIN_INTERVAL))
+        self.max_interval_label = QtWidgets.QLabel("Max (s):")
+        self.max_interval_input = QtWidgets.QLineEdit(self)
+        self.max_interval_input.setText(str(MAX_INTERVAL))
+        self.cpu_budget_label = QtWidgets.QLabel("CPU budget:")
+        self.cpu_budget_spinbox = QtWidgets.QSpinBox(self)
+        self.cpu_budget_spinbox.setRange(0, 100)
+        self.cpu_budget_spinbox.setSuffix(" %")
+        self.cpu_budget_spinbox.setSpecialValueText("no limit")
+        self.cpu_budget_spinbox.setValue(int(CPU_BUDGET * 100))
+        self.cpu_budget_spinbox.valueChanged.connect(self.update_adaptive_rate)
+        self.adaptive_layout.addWidget(self.min_interval_label)
+        self.adaptive_layout.addWidget(self.min_interval_input)
+        self.adaptive_layout.addWidget(self.max_interval_label)
+        self.adaptive_layout.addWidget(self.max_interval_input)
+        self.adaptive_layout.addWidget(self.cpu_budget_label)
+        self.adaptive_layout.addWidget(self.cpu_budget_spinbox)
+        self.control_layout.addLayout(self.adaptive_layout)
+        self.set_adaptive_inputs_enabled(False)
+        
+        # Matching threads
+        self.match_workers_layout = QtWidgets.QHBoxLayout()
+        self.match_workers_label = QtWidgets.QLabel("Matching threads:")
+        self.match_workers_spinbox = QtWidgets.QSpinBox(self)
+        self.match_workers_spinbox.setRange(1, max(default_workers() * 2, 2))
+        self.match_workers_spinbox.setValue(default_workers())
+        self.match_workers_spinbox.valueChanged.connect(self.update_match_engine)
+        self.match_workers_layout.addWidget(self.match_workers_label)
+        self.match_workers_layout.addWidget(self.match_workers_spinbox)
+        self.control_layout.addLayout(self.match_workers_layout)
+        
+        # Threads or worker processes, processes also speed up Python-heavy matching
+        self.match_pool_layout = QtWidgets.QHBoxLayout()
+        self.match_pool_label = QtWidgets.QLabel("Match in:")
+        self.match_pool_combo = QtWidgets.QComboBox(self)
+        self.match_pool_combo.addItem("Threads", POOL_THREADS)
+        self.match_pool_combo.addItem("Processes", POOL_PROCESSES)
+        if not PROCESS_POOL_AVAILABLE:
+            # Frames are shared with the processes as NumPy arrays
+            self.match_pool_combo.model().item(1).setEnabled(False)
+        self.match_pool_combo.currentIndexChanged.connect(self.update_match_engine)
+        self.match_pool_layout.addWidget(self.match_pool_label)
+        self.match_pool_layout.addWidget(self.match_pool_combo)
+        self.control_layout.addLayout(self.match_pool_layout)
+        
+        # Match mode
+        self.match_mode_layout = QtWidgets.QHBoxLayout()
+        self.match_mode_label = QtWidgets.QLabel("When several images match:")
+        self.match_mode_combo = QtWidgets.QComboBox(self)
+        self.match_mode_combo.addItem("Click first found", MODE_FIRST_FOUND)
+        self.match_mode_combo.addItem("Click best match", MODE_BEST)
+        self.match_mode_combo.currentIndexChanged.connect(self.update_match_engine)
+        self.match_mode_layout.addWidget(self.match_mode_label)
+        self.match_mode_layout.addWidget(self.match_mode_combo)
+        self.control_layout.addLayout(self.match_mode_layout)
+        
+        # Find-all mode clicks every match in one pass
+        self.find_all_layout = QtWidgets.QHBoxLayout()
+        self.find_all_checkbox = QtWidgets.QCheckBox("Click every match in one pass, order:")
+        self.find_all_checkbox.setChecked(False)
+        self.find_all_checkbox.toggled.connect(self.update_find_all)
+        self.click_order_combo = QtWidgets.QComboBox(self)
+        self.click_order_combo.addItem("Reading order", ORDER_READING)
+        self.click_order_combo.addItem("Nearest first", ORDER_NEAREST)
+        self.click_order_combo.addItem("Best match first", ORDER_SCORE)
+        self.click_order_combo.currentIndexChanged.connect(self.update_find_all)
+        self.click_order_combo.setEnabled(False)
+        self.find_all_layout.addWidget(self.find_all_checkbox)
+        self.find_all_layout.addWidget(self.click_order_combo)
+        self.control_layout.addLayout(self.find_all_layout)
+        
+        # Pyramid levels for coarse-to-fine matching
+        self.pyramid_layout = QtWidgets.QHBoxLayout()
+        self.pyramid_label = QtWidgets.QLabel("Pyramid levels (1 = full resolution only):")
+        self.pyramid_spinbox = QtWidgets.QSpinBox(self)
+        self.pyramid_spinbox.setRange(1, 5)
+        self.pyramid_spinbox.setValue(1)
+        self.pyramid_spinbox.valueChanged.connect(self.update_pyramid_levels)
+        self.pyramid_layout.addWidget(self.pyramid_label)
+        self.pyramid_layout.addWidget(self.pyramid_spinbox)
+        self.control_layout.addLayout(self.pyramid_layout)
+        if not OPENCV_AVAILABLE:
+            self.pyramid_spinbox.setEnabled(False)
+        
+        # Multi-scale matching for zoomed pages and other display scaling
+        self.multi_scale_checkbox = QtWidgets.QCheckBox("Also search for resized images (zoom / DPI changes)")
+        self.multi_scale_checkbox.setChecked(False)
+        self.multi_scale_checkbox.toggled.connect(self.update_multi_scale)
+        self.control_layout.addWidget(self.multi_scale_checkbox)
+        
+        self.scale_layout = QtWidgets.QHBoxLayout()
+        self.scale_min_label = QtWidgets.QLabel("Scale from:")
+        self.scale_min_spinbox = QtWidgets.QDoubleSpinBox(self)
+        self.scale_min_spinbox.setRange(0.25, 1.0)
+        self.scale_min_spinbox.setSingleStep(0.05)
+        self.scale_min_spinbox.setValue(SCALE_MIN)
+        self.scale_min_spinbox.valueChanged.connect(self.update_multi_scale)
+        self.scale_max_label = QtWidgets.QLabel("to:")
+        self.scale_max_spinbox = QtWidgets.QDoubleSpinBox(self)
+        self.scale_max_spinbox.setRange(1.0, 4.0)
+        self.scale_max_spinbox.setSingleStep(0.05)
+        self.scale_max_spinbox.setValue(SCALE_MAX)
+        self.scale_max_spinbox.valueChanged.connect(self.update_multi_scale)
+        self.scale_steps_label = QtWidgets.QLabel("Steps:")
+        self.scale_steps_spinbox = QtWidgets.QSpinBox(self)
+        self.scale_steps_spinbox.setRange(2, 15)
+        self.scale_steps_spinbox.setValue(SCALE_STEPS)
+        self.scale_steps_spinbox.valueChanged.connect(self.update_multi_scale)
+        self.scale_layout.addWidget(self.scale_min_label)
+        self.scale_layout.addWidget(self.scale_min_spinbox)
+        self.scale_layout.addWidget(self.scale_max_label)
+        self.scale_layout.addWidget(self.scale_max_spinbox)
+        self.scale_layout.addWidget(self.scale_steps_label)
+        self.scale_layout.addWidget(self.scale_steps_spinbox)
+        self.control_layout.addLayout(self.scale_layout)
+        self.set_scale_inputs_enabled(False)
+        
         # Start/Stop Buttons
         self.buttons_layout = QtWidgets.QHBoxLayout()
         
@@ -237,6 +523,30 @@ class App(QtWidgets.QMainWindow):
         
         self.main_layout.addWidget(self.control_group)
 
+        # Performance panel, collapsed by unchecking its title
+        self.metrics_group = QtWidgets.QGroupBox("Performance")
+        self.metrics_group.setCheckable(True)
+        self.metrics_group.setChecked(False)
+        self.metrics_group.toggled.connect(self.toggle_metrics_panel)
+        self.metrics_layout = QtWidgets.QVBoxLayout()
+        self.metrics_group.setLayout(self.metrics_layout)
+        
+        self.metrics_label = QtWidgets.QLabel("No data yet")
+        self.metrics_label.setStyleSheet("font-family: monospace; font-size: 10px;")
+        self.metrics_layout.addWidget(self.metrics_label)
+        
+        self.metrics_export_btn = QtWidgets.QPushButton("Export Metrics...")
+        self.metrics_export_btn.clicked.connect(self.toggle_metrics_export)
+        self.metrics_layout.addWidget(self.metrics_export_btn)
+        
+        self.metrics_label.hide()
+        self.metrics_export_btn.hide()
+        self.main_layout.addWidget(self.metrics_group)
+        
+        # Refresh the panel from the GUI thread
+        self.metrics_timer = QtCore.QTimer()
+        self.metrics_timer.timeout.connect(self.refresh_metrics_panel)
+        
         # Status label
         self.status_layout = QtWidgets.QHBoxLayout()
         
@@ -252,6 +562,24 @@ class App(QtWidgets.QMainWindow):
         self.status_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
         self.status_layout.addWidget(self.status_label)
         
+        # Searches per second, refreshed while running
+        self.rate_label = QtWidgets.QLabel("")
+        self.rate_label.setStyleSheet("color: gray; font-size: 11px;")
+        self.status_layout.addWidget(self.rate_label)
+        
+        self.rate_timer = QtCore.QTimer()
+        self.rate_timer.timeout.connect(self.refresh_rate_label)
+        
+        # Shows what worker threads posted to the status channel, at a fixed rate
+        self.status_timer = QtCore.QTimer()
+        self.status_timer.timeout.connect(self.drain_status_channel)
+        self.status_timer.start(STATUS_REFRESH_MS)
+        
+        # Puts the indicator back to running a while after the last hit
+        self.indicator_timer = QtCore.QTimer()
+        self.indicator_timer.setSingleShot(True)
+        self.indicator_timer.timeout.connect(self.reset_running_indicator)
+        
         self.main_layout.addLayout(self.status_layout)
 
         # Debug Info label
@@ -264,8 +592,8 @@ class App(QtWidgets.QMainWindow):
         self.area_selector = ScreenAreaSelector()
         self.area_selector.closed.connect(self.on_area_selected)
         
-        # Initialize image crop snipper
-        self.image_snipper = ImageCropWidget()
+        # Initialize image crop snipper, with its own capture of the live screen
+        self.image_snipper = ImageCropWidget(DeferredCapture())
         self.image_snipper.closed.connect(self.on_image_cropped)
         
         # Variable to store target image path
@@ -281,26 +609,342 @@ class App(QtWidgets.QMainWindow):
             "height": None
         }
         
+        # More search areas, each a dict like search_area with a "name"
+        self.search_regions = []
+        # Name of the area being selected, None while selecting the main search area
+        self.pending_region_name = None
+        
         # Confidence level for image matching (0.1 to 1.0)
         self.confidence = 0.8
         
-        # Thread for image search
-        self.search_thread = None
-        self.running = False
+        # Number of pyramid levels, 1 matches at full resolution only
+        self.pyramid_levels = 1
+        
+        # Search near the last found position of each target image first
+        self.roi_tracking = True
+        
+        # Only re-match the parts of the screen that changed
+        self.skip_unchanged = True
+        # Only match target images that can plausibly be on screen
+        self.index_templates = False
+        # Order images of the same priority by recent hits and match time
+        self.adaptive_order = False
 
     def update_confidence(self, value):
         """Update confidence value when slider is moved."""
         self.confidence = value / 10.0
         self.confidence_value_label.setText(str(self.confidence))
         
-        # Save settings when changed
-        self.save_settings()
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def update_adaptive_rate(self, *args):
+        """Enable or disable the adaptive scan rate and update its limits."""
+        self.set_adaptive_inputs_enabled(self.adaptive_checkbox.isChecked())
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def set_adaptive_inputs_enabled(self, enabled):
+        """Enable the adaptive limits, or the fixed delay time."""
+        for widget in (self.min_interval_input, self.max_interval_input, self.cpu_budget_spinbox):
+            widget.setEnabled(enabled)
+        self.delay_input.setEnabled(not enabled)
+
+    def refresh_rate_label(self):
+        """Show how often the engine is currently searching."""
+        if not self.engine.running:
+            self.rate_timer.stop()
+            self.rate_label.setText("")
+            return
+        self.rate_label.setText(f"{self.engine.effective_rate:.1f} scans/s, {self.hit_count} found")
+
+    def update_match_engine(self, *args):
+        """Apply matching thread count, pool and mode when they are changed."""
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def update_find_all(self, *args):
+        """Enable or disable find-all mode and update its click order."""
+        find_all = self.find_all_checkbox.isChecked()
+        self.click_order_combo.setEnabled(find_all)
+        # Find-all mode clicks every match, the match mode doesn't apply
+        self.match_mode_combo.setEnabled(not find_all)
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def update_pyramid_levels(self, value):
+        """Update pyramid levels when the spin box is changed."""
+        self.pyramid_levels = value
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def update_multi_scale(self, *args):
+        """Enable or disable multi-scale matching and update its scale range."""
+        self.set_scale_inputs_enabled(self.multi_scale_checkbox.isChecked())
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def set_scale_inputs_enabled(self, enabled):
+        """Enable the scale range inputs."""
+        for widget in (self.scale_min_spinbox, self.scale_max_spinbox, self.scale_steps_spinbox):
+            widget.setEnabled(enabled)
+
+    def update_roi_tracking(self, checked):
+        """Enable or disable searching near the last found position."""
+        self.roi_tracking = checked
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def update_skip_unchanged(self, checked):
+        """Enable or disable skipping unchanged parts of the screen."""
+        self.skip_unchanged = checked
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def update_index_templates(self, checked):
+        """Enable or disable skipping target images that can't be on screen."""
+        self.index_templates = checked
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def update_adaptive_order(self, checked):
+        """Enable or disable ordering target images by recent hits and match time."""
+        self.adaptive_order = checked
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def update_capture_backend(self, *args):
+        """Switch the screen capture backend when the selection changes."""
+        name = self.capture_combo.currentData()
+        if name == self.capture_backend_name and name != BACKEND_REPLAY:
+            return
+        
+        old_name, old_source = self.capture_backend_name, self.replay_source
+        self.capture_backend_name = name
+        if name == BACKEND_REPLAY:
+            self.replay_source = self.get_replay_source()
+        
+        try:
+            self.apply_settings()
+        except Exception as e:
+            self.status_label.setText(f"Error: {str(e)}")
+            # Go back to the backend that is still in use
+            self.capture_backend_name, self.replay_source = old_name, old_source
+            self.capture_combo.blockSignals(True)
+            self.capture_combo.setCurrentIndex(self.capture_combo.findData(self.capture_backend_name))
+            self.capture_combo.blockSignals(False)
+            return
+        
+        self.status_label.setText(f"Capture method: {self.engine.capture.name}")
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def get_replay_source(self):
+        """Ask for recorded frames to replay instead of the screen."""
+        file_path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, 'Select recording (a video, .npy/.npz stack, or any image in a frame folder)',
+            self.replay_source,
+            "Recordings (*.mp4 *.avi *.mkv *.npy *.npz *.png *.jpg *.bmp *.jpeg);;All files (*)"
+        )
+        if file_path.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")):
+            # Replay every image in the folder
+            return os.path.dirname(file_path)
+        return file_path
+
+    def test_capture_speed(self):
+        """Measure the capture rate of every available backend."""
+        if self.search_area["x1"] is None:
+            bbox = (0, 0, 800, 600)
+        else:
+            bbox = (self.search_area["x1"], self.search_area["y1"],
+                    self.search_area["x2"], self.search_area["y2"])
+        
+        self.capture_speed_btn.setEnabled(False)
+        self.debug_label.setText("Measuring capture speed...")
+        
+        # Create and start thread to measure
+        speed_thread = threading.Thread(target=self._run_capture_speed_test, args=(bbox,))
+        speed_thread.daemon = True
+        speed_thread.start()
+
+    def _run_capture_speed_test(self, bbox):
+        """Run the capture benchmark in a separate thread."""
+        try:
+            results = benchmark_backends(bbox)
+            lines = []
+            for name, rate in results:
+                if isinstance(rate, float):
+                    lines.append(f"{name}: {rate:.1f} frames/s")
+                else:
+                    lines.append(f"{name}: error ({rate})")
+            message = "Capture speed: " + ", ".join(lines)
+        except Exception as e:
+            message = f"Error measuring capture speed: {str(e)}"
+        
+        QtCore.QMetaObject.invokeMethod(
+            self.debug_label, 
+            "setText", 
+            QtCore.Qt.ConnectionType.QueuedConnection,
+            QtCore.Q_ARG(str, message)
+        )
+        QtCore.QMetaObject.invokeMethod(
+            self.capture_speed_btn, 
+            "setEnabled", 
+            QtCore.Qt.ConnectionType.QueuedConnection,
+            QtCore.Q_ARG(bool, True)
+        )
+
+    def toggle_metrics_panel(self, checked):
+        """Show or hide the performance panel."""
+        self.metrics_label.setVisible(checked)
+        self.metrics_export_btn.setVisible(checked)
+        if checked:
+            self.refresh_metrics_panel()
+            self.metrics_timer.start(500)
+        else:
+            self.metrics_timer.stop()
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def refresh_metrics_panel(self):
+        """Show the latest loop timings in the performance panel."""
+        metrics = self.engine.metrics
+        if metrics.iteration_count == 0:
+            self.metrics_label.setText("No data yet")
+        else:
+            self.metrics_label.setText(format_snapshot(metrics.snapshot()))
+
+    def toggle_metrics_export(self):
+        """Start or stop writing loop timings to a CSV or JSON lines file."""
+        metrics = self.engine.metrics
+        try:
+            if metrics.export_path:
+                path = metrics.export_path
+                metrics.stop_export()
+                self.metrics_export_btn.setText("Export Metrics...")
+                self.status_label.setText(f"Metrics saved to {os.path.basename(path)}")
+                return
+            
+            file_path, _ = QtWidgets.QFileDialog.getSaveFileName(
+                self, 'Export metrics', 'snips/metrics.csv',
+                "CSV files (*.csv);;JSON lines (*.jsonl)"
+            )
+            if file_path:
+                metrics.start_export(file_path)
+                self.metrics_export_btn.setText("Stop Exporting Metrics")
+                self.status_label.setText(f"Exporting metrics to {os.path.basename(file_path)}")
+        except Exception as e:
+            self.status_label.setText(f"Error: {str(e)}")
 
     def activateSnipping(self):
         """Activate screen area selection."""
+        self.pending_region_name = None
+        self.area_selector.set_regions(self.region_rects())
         self.area_selector.show()
         self.status_label.setText("Selecting screen area...")
 
+    def activateSnippingForRegion(self):
+        """Ask for a name, then activate selection of a named search area."""
+        name, ok = QtWidgets.QInputDialog.getText(self, "Add Named Area", "Area name:")
+        name = name.strip()
+        if not ok or not name:
+            return
+        if name == MAIN_REGION or self.find_region(name) is not None:
+            self.status_label.setText(f"Error: an area named {name} already exists")
+            return
+        self.pending_region_name = name
+        self.area_selector.set_regions(self.region_rects())
+        self.area_selector.show()
+        self.status_label.setText(f"Selecting area {name}...")
+
+    def find_region(self, name):
+        """Return the named search area dict, or None."""
+        for region in self.search_regions:
+            if region["name"] == name:
+                return region
+        return None
+
+    def region_rects(self):
+        """Return (name, QRect) of the search areas selected so far."""
+        rects = []
+        for name, area in [(MAIN_REGION, self.search_area)] + [(r["name"], r) for r in self.search_regions]:
+            if area["x1"] is not None:
+                rects.append((name, QtCore.QRect(QtCore.QPoint(area["x1"], area["y1"]),
+                                                 QtCore.QPoint(area["x2"], area["y2"]))))
+        return rects
+
+    def refresh_regions(self):
+        """Show the named search areas and the areas of the selected image."""
+        self.regions_list_widget.clear()
+        for region in self.search_regions:
+            self.regions_list_widget.addItem(
+                f"{region['name']}: ({region['x1']}, {region['y1']}) to ({region['x2']}, {region['y2']})"
+            )
+        self.refresh_image_regions()
+
+    def refresh_image_regions(self):
+        """Check the search areas the selected image is looked for in."""
+        item = self.images_list_widget.currentItem()
+        entry = self.find_target(item.data(QtCore.Qt.ItemDataRole.UserRole)) if item is not None else None
+        self.image_regions_list.blockSignals(True)
+        self.image_regions_list.clear()
+        for name in [MAIN_REGION] + [region["name"] for region in self.search_regions]:
+            region_item = QtWidgets.QListWidgetItem(name)
+            region_item.setFlags(region_item.flags() | QtCore.Qt.ItemFlag.ItemIsUserCheckable)
+            checked = entry is not None and name in entry["regions"]
+            region_item.setCheckState(QtCore.Qt.CheckState.Checked if checked else QtCore.Qt.CheckState.Unchecked)
+            self.image_regions_list.addItem(region_item)
+        self.image_regions_list.setEnabled(entry is not None)
+        self.image_regions_list.blockSignals(False)
+
+    def update_image_regions(self, *args):
+        """Change the search areas the selected image is looked for in."""
+        item = self.images_list_widget.currentItem()
+        if item is None:
+            return
+        entry = self.find_target(item.data(QtCore.Qt.ItemDataRole.UserRole))
+        if entry is None:
+            return
+        entry["regions"] = [
+            self.image_regions_list.item(row).text()
+            for row in range(self.image_regions_list.count())
+            if self.image_regions_list.item(row).checkState() == QtCore.Qt.CheckState.Checked
+        ]
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def remove_selected_region(self):
+        """Remove the selected named search area."""
+        try:
+            current_row = self.regions_list_widget.currentRow()
+            if current_row < 0:
+                return
+            region = self.search_regions.pop(current_row)
+            
+            # Images only looked for in this area are looked for everywhere again
+            for entry in self.target_images:
+                if region["name"] in entry["regions"]:
+                    entry["regions"].remove(region["name"])
+            
+            self.refresh_regions()
+            self.status_label.setText(f"Removed area: {region['name']}")
+            
+            # Apply and save settings when changed
+            self.settings_changed()
+        except Exception as e:
+            self.status_label.setText(f"Error: {str(e)}")
+
     def activateSnippingForImage(self):
         """Activate image cropping from screen."""
         self.image_snipper.show()
@@ -310,7 +954,7 @@ class App(QtWidgets.QMainWindow):
         """Handle the selected screen area."""
         try:
             # Get coordinates from area_selector
-            self.search_area = {
+            area = {
                 "x1": self.area_selector.begin.x(),
                 "y1": self.area_selector.begin.y(),
                 "x2": self.area_selector.end.x(),
@@ -319,6 +963,20 @@ class App(QtWidgets.QMainWindow):
                 "height": abs(self.area_selector.end.y() - self.area_selector.begin.y())
             }
             
+            # A named area was being selected
+            if self.pending_region_name is not None:
+                area["name"] = self.pending_region_name
+                self.pending_region_name = None
+                self.search_regions.append(area)
+                self.refresh_regions()
+                self.status_label.setText(f"Search area {area['name']} selected")
+                
+                # Apply and save settings when changed
+                self.settings_changed()
+                return
+            
+            self.search_area = area
+            
             # Display coordinates instead of image
             self.search_area_label.setText(
                 f"Search area: ({self.search_area['x1']}, {self.search_area['y1']}) to "
@@ -328,8 +986,8 @@ class App(QtWidgets.QMainWindow):
             
             self.status_label.setText("Search area selected")
             
-            # Save settings when changed
-            self.save_settings()
+            # Apply and save settings when changed
+            self.settings_changed()
             
         except Exception as e:
             self.status_label.setText(f"Error: {str(e)}")
@@ -352,8 +1010,8 @@ class App(QtWidgets.QMainWindow):
             
             self.status_label.setText(f"Image cropped and saved as {image_filename}")
             
-            # Save settings when changed
-            self.save_settings()
+            # Apply and save settings when changed
+            self.settings_changed()
             
         except Exception as e:
             self.status_label.setText(f"Error: {str(e)}")
@@ -369,26 +1027,48 @@ class App(QtWidgets.QMainWindow):
                 self.add_image_to_list(file_path)
                 self.status_label.setText(f"Image selected: {os.path.basename(file_path)}")
                 
-                # Save settings when changed
-                self.save_settings()
+                # Apply and save settings when changed
+                self.settings_changed()
         except Exception as e:
             self.status_label.setText(f"Error: {str(e)}")
 
-    def add_image_to_list(self, image_path):
-        """Add an image to the list widget and target images list."""
+    def find_target(self, image_path):
+        """Return the target images entry for a path, or None."""
+        for entry in self.target_images:
+            if entry["path"] == image_path:
+                return entry
+        return None
+
+    def add_image_to_list(self, image_path, entry=None, select=True):
+        """Add an image to the list widget and target images list, selecting it unless told not to."""
         if image_path and os.path.exists(image_path):
             # Add to list if not already present
-            if image_path not in self.target_images:
-                self.target_images.append(image_path)
+            if self.find_target(image_path) is None:
+                entry = target_entry(entry or image_path)
+                entry["path"] = image_path
+                self.target_images.append(entry)
                 
-                # Add to list widget
-                item = QtWidgets.QListWidgetItem(os.path.basename(image_path))
+                # Add to list widget, checked while the image is looked for
+                item = QtWidgets.QListWidgetItem(self.image_item_text(entry))
                 item.setData(QtCore.Qt.ItemDataRole.UserRole, image_path)
+                item.setFlags(item.flags() | QtCore.Qt.ItemFlag.ItemIsUserCheckable)
+                item.setCheckState(QtCore.Qt.CheckState.Checked if entry["enabled"] else QtCore.Qt.CheckState.Unchecked)
                 self.images_list_widget.addItem(item)
                 
                 # Select added image
-                self.images_list_widget.setCurrentRow(self.images_list_widget.count() - 1)
-                self.on_image_selected(item)
+                if select:
+                    self.images_list_widget.setCurrentRow(self.images_list_widget.count() - 1)
+                    self.on_image_selected(item)
+
+    def image_item_text(self, entry):
+        """Return the list text of a target image, with its priority and cooldown if set."""
+        name = os.path.basename(entry["path"])
+        details = []
+        if entry["priority"]:
+            details.append(f"priority {entry['priority']}")
+        if entry["cooldown"]:
+            details.append(f"{entry['cooldown']:g}s cooldown")
+        return f"{name} [{', '.join(details)}]" if details else name
 
     def on_image_selected(self, item):
         """Handle image selection from the list."""
@@ -400,12 +1080,29 @@ class App(QtWidgets.QMainWindow):
                 # Save selected image index
                 self.current_selected_image = self.images_list_widget.currentRow()
                 
+                # Show how the image is compared
+                entry = self.find_target(image_path)
+                if entry is not None:
+                    self.image_mode_combo.blockSignals(True)
+                    self.image_mode_combo.setCurrentIndex(self.image_mode_combo.findData(entry["image_mode"]))
+                    self.image_mode_combo.blockSignals(False)
+                    self.method_combo.blockSignals(True)
+                    self.method_combo.setCurrentIndex(self.method_combo.findData(entry["method"]))
+                    self.method_combo.blockSignals(False)
+                    # Features always compare grayscale keypoints
+                    self.image_mode_combo.setEnabled(entry["method"] == METHOD_TEMPLATE)
+                    for spinbox, value in ((self.image_priority_spinbox, entry["priority"]),
+                                           (self.image_cooldown_spinbox, entry["cooldown"])):
+                        spinbox.blockSignals(True)
+                        spinbox.setValue(value)
+                        spinbox.blockSignals(False)
+                self.refresh_image_regions()
+                
                 # Display selected image for preview
                 pixmap = QPixmap(image_path)
                 
                 # Get original image dimensions
-                img = Image.open(image_path)
-                img_width, img_height = img.width, img.height
+                img_width, img_height = pixmap.width(), pixmap.height()
                 
                 # Set maximum size while maintaining aspect ratio
                 max_height = 150
@@ -449,8 +1146,10 @@ class App(QtWidgets.QMainWindow):
                 image_path = item.data(QtCore.Qt.ItemDataRole.UserRole)
                 
                 # Remove from list
-                if image_path in self.target_images:
-                    self.target_images.remove(image_path)
+                entry = self.find_target(image_path)
+                if entry is not None:
+                    self.target_images.remove(entry)
+                self.engine.template_cache.remove(image_path)
                 
                 # Remove from list widget
                 self.images_list_widget.takeItem(current_row)
@@ -463,53 +1162,82 @@ class App(QtWidgets.QMainWindow):
                     self.image_preview.clear()
                     self.image_preview.setText("No image")
                     self.current_selected_image = -1
+                    self.refresh_image_regions()
                 
                 self.status_label.setText(f"Removed: {os.path.basename(image_path)}")
                 
-                # Save settings when changed
-                self.save_settings()
+                # Apply and save settings when changed
+                self.settings_changed()
         except Exception as e:
             self.status_label.setText(f"Error: {str(e)}")
 
+    def update_image_mode(self, *args):
+        """Change how the selected image is compared with the screen."""
+        item = self.images_list_widget.currentItem()
+        if item is None:
+            return
+        entry = self.find_target(item.data(QtCore.Qt.ItemDataRole.UserRole))
+        if entry is None:
+            return
+        entry["image_mode"] = self.image_mode_combo.currentData()
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def update_method(self, *args):
+        """Change how the selected image is found on the screen."""
+        item = self.images_list_widget.currentItem()
+        if item is None:
+            return
+        entry = self.find_target(item.data(QtCore.Qt.ItemDataRole.UserRole))
+        if entry is None:
+            return
+        entry["method"] = self.method_combo.currentData()
+        self.image_mode_combo.setEnabled(entry["method"] == METHOD_TEMPLATE)
+        if entry["method"] != METHOD_TEMPLATE and not method_available(entry["method"]):
+            self.status_label.setText(f"{entry['method'].upper()} feature matching is not available "
+                                      f"in this OpenCV installation")
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def update_image_enabled(self, item):
+        """Look for a target image or not when its checkbox is toggled."""
+        entry = self.find_target(item.data(QtCore.Qt.ItemDataRole.UserRole))
+        enabled = item.checkState() == QtCore.Qt.CheckState.Checked
+        # Also called when the item text changes
+        if entry is None or entry["enabled"] == enabled:
+            return
+        entry["enabled"] = enabled
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
+    def update_image_order(self, *args):
+        """Change the priority and cooldown of the selected image."""
+        item = self.images_list_widget.currentItem()
+        if item is None:
+            return
+        entry = self.find_target(item.data(QtCore.Qt.ItemDataRole.UserRole))
+        if entry is None:
+            return
+        entry["priority"] = self.image_priority_spinbox.value()
+        entry["cooldown"] = self.image_cooldown_spinbox.value()
+        item.setText(self.image_item_text(entry))
+        
+        # Apply and save settings when changed
+        self.settings_changed()
+
     def startButton(self):
         """Start the image search and click process."""
         try:
-            # Check if search area is selected
-            if (self.search_area["x1"] is None or 
-                self.search_area["y1"] is None or 
-                self.search_area["x2"] is None or 
-                self.search_area["y2"] is None):
-                self.status_label.setText("Error: Please select a search area first")
-                return
+            # Hand the current settings to the engine, it checks them before starting
+            self.apply_settings()
+            self.engine.start()
             
-            # Check if there are any images to search
-            if not self.target_images:
-                self.status_label.setText("Error: Please select at least one target image")
-                return
-            
-            # Check delay time
-            try:
-                delay_time = float(self.delay_input.text())
-                if delay_time < 0:
-                    self.status_label.setText("Error: Delay time must be positive")
-                    return
-            except ValueError:
-                self.status_label.setText("Error: Invalid delay time")
-                return
-            
-            # If running, stop current thread
-            if self.running:
-                self.stopClick()
-            
-            # Set running flag
-            self.running = True
-            self.stop_while = False
-            self.stop_for = False
-            
-            # Create and start new thread
-            self.search_thread = threading.Thread(target=self.search_and_click)
-            self.search_thread.daemon = True
-            self.search_thread.start()
+            # Drop updates left over from the previous run
+            self.status_channel.drain()
+            self.hit_count = 0
             
             # Update UI to show running state
             self.status_label.setText("Started searching...")
@@ -526,17 +1254,21 @@ class App(QtWidgets.QMainWindow):
             self.blink_state = False
             self.blink_timer.start(500)  # 500ms = 0.5 seconds between blinks
             
+            # Show the effective scan rate next to the status
+            self.rate_timer.start(500)
+            
         except Exception as e:
             self.status_label.setText(f"Error: {str(e)}")
 
     def stopClick(self):
         """Stop the image search process."""
-        self.stop_while = True
-        self.stop_for = True
-        self.running = False
+        self.engine.stop()
         
         # Stop blinking effect
         self.blink_timer.stop()
+        self.rate_timer.stop()
+        self.indicator_timer.stop()
+        self.rate_label.setText("")
         
         # Update UI to show stopped state
         self.status_label.setText("Stopped")
@@ -549,254 +1281,63 @@ class App(QtWidgets.QMainWindow):
         self.start_button.show()
         self.stop_button.hide()
 
-    def search_and_click(self):
-        """Search for the target image and click on it."""
-        try:
-            delay_time = float(self.delay_input.text())
-            preview_only = self.preview_checkbox.isChecked()
-            return_mouse = self.return_mouse_checkbox.isChecked()
-            
-            # Get delay before clicking
-            try:
-                click_delay_time = float(self.click_delay_input.text())
-                if click_delay_time < 0:
-                    click_delay_time = 0
-            except ValueError:
-                click_delay_time = 0
-                
-            # Get delay after image found and before moving mouse
-            try:
-                move_delay_time = float(self.move_delay_input.text())
-                if move_delay_time < 0:
-                    move_delay_time = 0
-            except ValueError:
-                move_delay_time = 0
-            
-            while self.running and not self.stop_while:
-                # Save initial mouse position if needed
-                if return_mouse:
-                    original_position = pyautogui.position()
-                
-                # Take screenshot of search area
-                screenshot = ImageGrab.grab(bbox=(
-                    self.search_area["x1"], 
-                    self.search_area["y1"], 
-                    self.search_area["x2"], 
-                    self.search_area["y2"]
-                ))
-                
-                # Save temporary screenshot
-                ensure_snips_directory()
-                temp_screenshot_path = "snips/temp_screenshot.png"
-                screenshot.save(temp_screenshot_path)
-                
-                found_image = False
-                found_image_path = ""
-                
-                # Search for all target images
-                for image_path in self.target_images:
-                    if self.stop_for:
-                        break
-                    
-                    if not os.path.exists(image_path):
-                        continue
-                    
-                    # Search for image
-                    location = self.find_image(temp_screenshot_path, image_path)
-                    
-                    if location:
-                        found_image = True
-                        found_image_path = image_path
-                        
-                        # Calculate click position
-                        target_img = Image.open(image_path)
-                        click_x = self.search_area["x1"] + location[0] + target_img.width // 2
-                        click_y = self.search_area["y1"] + location[1] + target_img.height // 2
-                        
-                        # Display information
-                        self.update_status(f"Found image: {os.path.basename(image_path)} at ({click_x}, {click_y})")
-                        # Update found indicator
-                        self.update_found_indicator()
-                        
-                        # Wait after image found and before moving mouse
-                        if move_delay_time > 0:
-                            self.update_status(f"Waiting {move_delay_time}s before moving mouse...")
-                            for i in range(int(move_delay_time * 10)):
-                                if self.stop_for:
-                                    break
-                                time.sleep(0.1)
-                        
-                        if self.stop_for:
-                            break
-                        
-                        if preview_only:
-                            # Move mouse without clicking
-                            pyautogui.moveTo(click_x, click_y)
-                        else:
-                            # Move mouse to position before clicking
-                            pyautogui.moveTo(click_x, click_y)
-                            
-                            # Wait before clicking if there's delay
-                            if click_delay_time > 0:
-                                self.update_status(f"Waiting {click_delay_time}s before clicking...")
-                                for i in range(int(click_delay_time * 10)):
-                                    if self.stop_for:
-                                        break
-                                    time.sleep(0.1)
-                            
-                            # Click at found position
-                            if not self.stop_for:
-                                pyautogui.click()
-                                self.update_status(f"Clicked at ({click_x}, {click_y})")
-                        
-                        # Move mouse back to original position if needed
-                        if return_mouse and not preview_only:
-                            pyautogui.moveTo(original_position)
-                        
-                        break
-                
-                if not found_image:
-                    self.update_status("Image not found")
-                
-                # Delay before searching again
-                for i in range(int(delay_time * 10)):
-                    if self.stop_for:
-                        break
-                    time.sleep(0.1)
-            
-            # When done, update UI
-            self.update_ui_after_stop()
-            
-        except Exception as e:
-            self.update_status(f"Error: {str(e)}")
-            self.update_ui_after_stop()
+    def on_image_found(self, match):
+        """Called by the engine thread when a target image is found."""
+        self.update_found_indicator()
+
+    def on_engine_stopped(self, message):
+        """Called by the engine thread when the search loop ends."""
+        self.status_channel.post_stopped(message)
 
     def update_status(self, message):
         """Update status label from a thread."""
-        QtCore.QMetaObject.invokeMethod(
-            self.status_label, 
-            "setText", 
-            QtCore.Qt.ConnectionType.QueuedConnection,
-            QtCore.Q_ARG(str, message)
-        )
+        self.status_channel.post_status(message)
         
     def update_found_indicator(self):
-        """Update status indicator to show image found."""
-        QtCore.QMetaObject.invokeMethod(
-            self.status_indicator, 
-            "setText", 
-            QtCore.Qt.ConnectionType.QueuedConnection,
-            QtCore.Q_ARG(str, "🔍")
-        )
-        QtCore.QMetaObject.invokeMethod(
-            self.status_indicator, 
-            "setStyleSheet", 
-            QtCore.Qt.ConnectionType.QueuedConnection,
-            QtCore.Q_ARG(str, "font-size: 20px; color: blue;")
-        )
+        """Update status indicator to show image found, from a thread."""
+        self.status_channel.post_found()
+
+    def drain_status_channel(self):
+        """Show the latest updates posted by worker threads."""
+        status, hits, stopped, stop_message = self.status_channel.drain()
+        if stopped:
+            self.update_ui_after_stop()
+        if status is not None:
+            self.status_label.setText(status)
+        elif stopped and stop_message:
+            self.status_label.setText(stop_message)
         
-        # Thay thế QTimer.singleShot bằng threading.Timer
-        if self.running:
-            timer = threading.Timer(0.5, self.reset_running_indicator)
-            timer.daemon = True
-            timer.start()
+        if hits and self.engine.running:
+            self.hit_count += hits
+            self.status_indicator.setText("🔍")
+            self.status_indicator.setStyleSheet("font-size: 20px; color: blue;")
+            # Restarting the timer keeps the indicator on while hits keep coming
+            self.indicator_timer.start(FOUND_INDICATOR_MS)
     
     def reset_running_indicator(self):
         """Reset status indicator back to running state."""
-        if not self.running:
+        if not self.engine.running:
             return
-            
-        QtCore.QMetaObject.invokeMethod(
-            self.status_indicator, 
-            "setText", 
-            QtCore.Qt.ConnectionType.QueuedConnection,
-            QtCore.Q_ARG(str, "🟢")
-        )
-        QtCore.QMetaObject.invokeMethod(
-            self.status_indicator, 
-            "setStyleSheet", 
-            QtCore.Qt.ConnectionType.QueuedConnection,
-            QtCore.Q_ARG(str, "font-size: 20px; color: green;")
-        )
+        self.status_indicator.setText("🟢")
+        self.status_indicator.setStyleSheet("font-size: 20px; color: green;")
 
     def update_ui_after_stop(self):
-        """Update UI elements after stopping the search."""
+        """Update UI elements after the search loop ended."""
         # Stop blinking effect
         self.blink_timer.stop()
+        self.rate_timer.stop()
+        self.indicator_timer.stop()
+        self.rate_label.setText("")
         
-        QtCore.QMetaObject.invokeMethod(
-            self.start_button, 
-            "show", 
-            QtCore.Qt.ConnectionType.QueuedConnection
-        )
-        QtCore.QMetaObject.invokeMethod(
-            self.stop_button, 
-            "hide", 
-            QtCore.Qt.ConnectionType.QueuedConnection
-        )
-        QtCore.QMetaObject.invokeMethod(
-            self.status_label, 
-            "setText", 
-            QtCore.Qt.ConnectionType.QueuedConnection,
-            QtCore.Q_ARG(str, "Stopped")
-        )
+        self.start_button.show()
+        self.stop_button.hide()
+        self.status_label.setText("Stopped")
         # Update running state indicator and style
-        QtCore.QMetaObject.invokeMethod(
-            self.status_label, 
-            "setStyleSheet", 
-            QtCore.Qt.ConnectionType.QueuedConnection,
-            QtCore.Q_ARG(str, "font-weight: bold; font-size: 14px; padding: 5px;")
-        )
-        QtCore.QMetaObject.invokeMethod(
-            self.status_indicator, 
-            "setText", 
-            QtCore.Qt.ConnectionType.QueuedConnection,
-            QtCore.Q_ARG(str, "🔴")
-        )
-        QtCore.QMetaObject.invokeMethod(
-            self.status_indicator, 
-            "setStyleSheet", 
-            QtCore.Qt.ConnectionType.QueuedConnection,
-            QtCore.Q_ARG(str, "font-size: 20px; color: red;")
-        )
+        self.status_label.setStyleSheet("font-weight: bold; font-size: 14px; padding: 5px;")
+        self.status_indicator.setText("🔴")
+        self.status_indicator.setStyleSheet("font-size: 20px; color: red;")
         # Update window title
-        QtCore.QMetaObject.invokeMethod(
-            self, 
-            "setWindowTitle", 
-            QtCore.Qt.ConnectionType.QueuedConnection,
-            QtCore.Q_ARG(str, "Auto Clicker with Image Detection")
-        )
-
-    def find_image(self, screenshot_path, template_path):
-        """Find the template image in the screenshot."""
-        try:
-            if OPENCV_AVAILABLE:
-                # Use OpenCV for finding with accuracy
-                screenshot = cv2.imread(screenshot_path)
-                template = cv2.imread(template_path)
-                
-                if screenshot is None or template is None:
-                    return None
-                
-                result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-                
-                if max_val >= self.confidence:
-                    return max_loc
-                return None
-            else:
-                # Use pyautogui if OpenCV is not installed
-                location = pyautogui.locate(
-                    template_path, 
-                    screenshot_path, 
-                    confidence=self.confidence if hasattr(pyautogui, 'confidence') else 0.9
-                )
-                if location:
-                    return (location.left, location.top)
-                return None
-        except Exception as e:
-            self.update_status(f"Error finding image: {str(e)}")
-            return None
+        self.setWindowTitle("Auto Clicker with Image Detection")
 
     def install_opencv(self):
         """Install OpenCV using pip."""
@@ -844,34 +1385,76 @@ class App(QtWidgets.QMainWindow):
                 QtCore.Q_ARG(bool, True)
             )
 
+    def current_settings(self):
+        """Return the settings shown in the window, as saved to snips/settings.json."""
+        return {
+            "search_area": self.search_area,
+            "search_regions": self.search_regions,
+            "confidence": self.confidence,
+            "delay_time": self.delay_input.text(),
+            "click_delay_time": self.click_delay_input.text(),
+            "move_delay_time": self.move_delay_input.text(),  # Save delay setting
+            "adaptive_rate": self.adaptive_checkbox.isChecked(),
+            "min_interval": self.min_interval_input.text(),
+            "max_interval": self.max_interval_input.text(),
+            "cpu_budget": self.cpu_budget_spinbox.value(),
+            "preview_only": self.preview_checkbox.isChecked(),
+            "return_mouse": self.return_mouse_checkbox.isChecked(),
+            "save_debug_frames": self.save_frames_checkbox.isChecked(),
+            "match_workers": self.match_workers_spinbox.value(),
+            "match_mode": self.match_mode_combo.currentData(),
+            "match_pool": self.match_pool_combo.currentData(),
+            "find_all": self.find_all_checkbox.isChecked(),
+            "click_order": self.click_order_combo.currentData(),
+            "pyramid_levels": self.pyramid_levels,
+            "multi_scale": self.multi_scale_checkbox.isChecked(),
+            "scale_min": self.scale_min_spinbox.value(),
+            "scale_max": self.scale_max_spinbox.value(),
+            "scale_steps": self.scale_steps_spinbox.value(),
+            "capture_backend": self.capture_backend_name,
+            "replay_source": self.replay_source,
+            "dry_run": self.dry_run_checkbox.isChecked(),
+            "show_metrics": self.metrics_group.isChecked(),
+            "roi_tracking": self.roi_tracking,
+            "skip_unchanged": self.skip_unchanged,
+            "index_templates": self.index_templates,
+            "adaptive_order": self.adaptive_order,
+            "target_images": self.target_images
+        }
+
+    def apply_settings(self):
+        """Push the settings shown in the window to the detection engine."""
+        self.engine.configure(EngineConfig(self.current_settings()))
+        # Crops come from the live screen, also while the engine replays a recording
+        name = BACKEND_AUTO if self.capture_backend_name == BACKEND_REPLAY else self.capture_backend_name
+        if self.image_snipper.capture.requested != name:
+            self.image_snipper.capture.close()
+            self.image_snipper.capture = DeferredCapture(name)
+
+    def settings_changed(self):
+        """Apply settings to the engine and save them after a change in the window."""
+        try:
+            self.apply_settings()
+        except Exception as e:
+            self.status_label.setText(f"Error: {str(e)}")
+        self.save_settings()
+
     def save_settings(self):
-        """Save current settings to a JSON file."""
+        """Save current settings to a JSON file, in the background."""
+        # Settings are saved once loading is complete
+        if self.loading_settings:
+            return
         try:
-            # Ensure snips directory exists
-            ensure_snips_directory()
-            
-            settings = {
-                "search_area": self.search_area,
-                "confidence": self.confidence,
-                "delay_time": self.delay_input.text(),
-                "click_delay_time": self.click_delay_input.text(),
-                "move_delay_time": self.move_delay_input.text(),  # Save delay setting
-                "return_mouse": self.return_mouse_checkbox.isChecked(),
-                "target_images": self.target_images
-            }
-            
-            with open("snips/settings.json", "w") as f:
-                json.dump(settings, f, indent=4)
+            self.settings_store.save(self.current_settings())
         except Exception as e:
             self.status_label.setText(f"Error saving settings: {str(e)}")
 
     def load_settings(self):
         """Load settings from a JSON file."""
+        self.loading_settings = True
         try:
-            if os.path.exists("snips/settings.json"):
-                with open("snips/settings.json", "r") as f:
-                    settings = json.load(f)
-                
+            settings, problems = self.settings_store.load()
+            if settings is not None:
                 # Load search area
                 if "search_area" in settings:
                     self.search_area = settings["search_area"]
@@ -887,6 +1470,11 @@ class App(QtWidgets.QMainWindow):
                             f"Size: {self.search_area['width']}x{self.search_area['height']} pixels"
                         )
                 
+                # Load named search areas
+                if "search_regions" in settings:
+                    self.search_regions = [dict(region) for region in settings["search_regions"]]
+                    self.refresh_regions()
+                
                 # Load confidence
                 if "confidence" in settings:
                     self.confidence = settings["confidence"]
@@ -905,29 +1493,183 @@ class App(QtWidgets.QMainWindow):
                 if "move_delay_time" in settings:
                     self.move_delay_input.setText(settings["move_delay_time"])
                 
+                # Load adaptive scan rate settings without saving half-loaded settings
+                if "min_interval" in settings:
+                    self.min_interval_input.setText(settings["min_interval"])
+                if "max_interval" in settings:
+                    self.max_interval_input.setText(settings["max_interval"])
+                self.adaptive_checkbox.blockSignals(True)
+                self.cpu_budget_spinbox.blockSignals(True)
+                if "cpu_budget" in settings:
+                    self.cpu_budget_spinbox.setValue(int(settings["cpu_budget"]))
+                if "adaptive_rate" in settings:
+                    self.adaptive_checkbox.setChecked(settings["adaptive_rate"])
+                self.adaptive_checkbox.blockSignals(False)
+                self.cpu_budget_spinbox.blockSignals(False)
+                self.set_adaptive_inputs_enabled(self.adaptive_checkbox.isChecked())
+                
+                # Load preview setting
+                if "preview_only" in settings:
+                    self.preview_checkbox.setChecked(settings["preview_only"])
+                
                 # Load return mouse setting
                 if "return_mouse" in settings:
                     self.return_mouse_checkbox.setChecked(settings["return_mouse"])
                 
-                # Load target images
+                # Load debug frame dump setting
+                if "save_debug_frames" in settings:
+                    self.save_frames_checkbox.setChecked(settings["save_debug_frames"])
+                
+                # Load matching threads, pool and mode without saving half-loaded settings
+                self.match_workers_spinbox.blockSignals(True)
+                self.match_pool_combo.blockSignals(True)
+                self.match_mode_combo.blockSignals(True)
+                if "match_workers" in settings:
+                    self.match_workers_spinbox.setValue(settings["match_workers"])
+                if "match_pool" in settings and PROCESS_POOL_AVAILABLE:
+                    index = self.match_pool_combo.findData(settings["match_pool"])
+                    if index >= 0:
+                        self.match_pool_combo.setCurrentIndex(index)
+                if "match_mode" in settings:
+                    index = self.match_mode_combo.findData(settings["match_mode"])
+                    if index >= 0:
+                        self.match_mode_combo.setCurrentIndex(index)
+                self.match_workers_spinbox.blockSignals(False)
+                self.match_pool_combo.blockSignals(False)
+                self.match_mode_combo.blockSignals(False)
+                
+                # Load find-all mode without saving half-loaded settings
+                self.find_all_checkbox.blockSignals(True)
+                self.click_order_combo.blockSignals(True)
+                if "click_order" in settings:
+                    index = self.click_order_combo.findData(settings["click_order"])
+                    if index >= 0:
+                        self.click_order_combo.setCurrentIndex(index)
+                if "find_all" in settings:
+                    self.find_all_checkbox.setChecked(settings["find_all"])
+                self.find_all_checkbox.blockSignals(False)
+                self.click_order_combo.blockSignals(False)
+                self.click_order_combo.setEnabled(self.find_all_checkbox.isChecked())
+                self.match_mode_combo.setEnabled(not self.find_all_checkbox.isChecked())
+                
+                # Load pyramid levels
+                if "pyramid_levels" in settings:
+                    self.pyramid_levels = settings["pyramid_levels"]
+                    self.pyramid_spinbox.blockSignals(True)
+                    self.pyramid_spinbox.setValue(self.pyramid_levels)
+                    self.pyramid_spinbox.blockSignals(False)
+                
+                # Load multi-scale settings without saving half-loaded settings
+                scale_widgets = (self.multi_scale_checkbox, self.scale_min_spinbox,
+                                 self.scale_max_spinbox, self.scale_steps_spinbox)
+                for widget in scale_widgets:
+                    widget.blockSignals(True)
+                if "scale_min" in settings:
+                    self.scale_min_spinbox.setValue(settings["scale_min"])
+                if "scale_max" in settings:
+                    self.scale_max_spinbox.setValue(settings["scale_max"])
+                if "scale_steps" in settings:
+                    self.scale_steps_spinbox.setValue(settings["scale_steps"])
+                if "multi_scale" in settings:
+                    self.multi_scale_checkbox.setChecked(settings["multi_scale"])
+                for widget in scale_widgets:
+                    widget.blockSignals(False)
+                self.set_scale_inputs_enabled(self.multi_scale_checkbox.isChecked())
+                
+                # Load region tracking setting
+                if "roi_tracking" in settings:
+                    self.roi_tracking = settings["roi_tracking"]
+                    self.roi_tracking_checkbox.blockSignals(True)
+                    self.roi_tracking_checkbox.setChecked(self.roi_tracking)
+                    self.roi_tracking_checkbox.blockSignals(False)
+                
+                # Load change detection setting
+                if "skip_unchanged" in settings:
+                    self.skip_unchanged = settings["skip_unchanged"]
+                    self.skip_unchanged_checkbox.blockSignals(True)
+                    self.skip_unchanged_checkbox.setChecked(self.skip_unchanged)
+                    self.skip_unchanged_checkbox.blockSignals(False)
+                
+                # Load template index setting
+                if "index_templates" in settings and TEMPLATE_INDEX_AVAILABLE:
+                    self.index_templates = settings["index_templates"]
+                    self.index_templates_checkbox.blockSignals(True)
+                    self.index_templates_checkbox.setChecked(self.index_templates)
+                    self.index_templates_checkbox.blockSignals(False)
+                
+                # Load target order setting
+                if "adaptive_order" in settings:
+                    self.adaptive_order = settings["adaptive_order"]
+                    self.adaptive_order_checkbox.blockSignals(True)
+                    self.adaptive_order_checkbox.setChecked(self.adaptive_order)
+                    self.adaptive_order_checkbox.blockSignals(False)
+                
+                # Load capture backend
+                if "replay_source" in settings:
+                    self.replay_source = settings["replay_source"]
+                if "capture_backend" in settings:
+                    index = self.capture_combo.findData(settings["capture_backend"])
+                    if index >= 0:
+                        self.capture_combo.blockSignals(True)
+                        self.capture_combo.setCurrentIndex(index)
+                        self.capture_combo.blockSignals(False)
+                        self.capture_backend_name = settings["capture_backend"]
+                
+                # Load dry run setting
+                if "dry_run" in settings:
+                    self.dry_run_checkbox.setChecked(settings["dry_run"])
+                
+                # Load performance panel state
+                if "show_metrics" in settings:
+                    self.metrics_group.blockSignals(True)
+                    self.metrics_group.setChecked(settings["show_metrics"])
+                    self.metrics_group.blockSignals(False)
+                    self.metrics_label.setVisible(settings["show_metrics"])
+                    self.metrics_export_btn.setVisible(settings["show_metrics"])
+                    if settings["show_metrics"]:
+                        self.metrics_timer.start(500)
+                
+                # Load target images, only the selected one gets a preview
                 if "target_images" in settings:
-                    for image_path in settings["target_images"]:
-                        if os.path.exists(image_path):
-                            self.add_image_to_list(image_path)
+                    self.images_list_widget.setUpdatesEnabled(False)
+                    for entry in settings["target_images"]:
+                        entry = target_entry(entry)
+                        if os.path.exists(entry["path"]):
+                            self.add_image_to_list(entry["path"], entry, select=False)
+                    self.images_list_widget.setUpdatesEnabled(True)
                 
                 # Automatically select the first image in the list if any exist
                 if self.images_list_widget.count() > 0:
                     self.images_list_widget.setCurrentRow(0)
                     self.on_image_selected(self.images_list_widget.item(0))
                 
-                self.status_label.setText("Settings loaded")
+                # Hand the loaded settings to the engine
+                message = "Settings loaded"
+                try:
+                    self.apply_settings()
+                except Exception as e:
+                    message = f"Settings loaded, cannot restore capture method ({str(e)}), using auto"
+                    self.capture_backend_name = BACKEND_AUTO
+                    self.capture_combo.blockSignals(True)
+                    self.capture_combo.setCurrentIndex(self.capture_combo.findData(BACKEND_AUTO))
+                    self.capture_combo.blockSignals(False)
+                    self.apply_settings()
+                
+                if problems:
+                    message += f", skipped {len(problems)} invalid values"
+                self.status_label.setText(message)
         except Exception as e:
             self.status_label.setText(f"Error loading settings: {str(e)}")
+        finally:
+            self.loading_settings = False
 
     def closeEvent(self, event):
         """Handle window close event."""
-        # Save settings when closing application
+        # Save settings when closing application, waiting for the write
         self.save_settings()
+        self.settings_store.close()
+        self.engine.close()
+        self.image_snipper.capture.close()
         event.accept()
 
     def blink_stop_button(self):
@@ -953,12 +1695,28 @@ class ScreenAreaSelector(QtWidgets.QWidget):
         self.setCursor(QtGui.QCursor(QtCore.Qt.CursorShape.CrossCursor))
         self.setStyleSheet("background-color: gray;")
         
+        # Search areas selected before, shown as (name, QRect) while selecting
+        self.regions = []
+        
         # Hide widget when created
         self.hide()
 
+    def set_regions(self, regions):
+        """Show the given (name, QRect) search areas while selecting."""
+        self.regions = list(regions)
+        self.begin = QtCore.QPoint()
+        self.end = QtCore.QPoint()
+
     def paintEvent(self, event):
         """Paint the selection rectangle."""
         qp = QtGui.QPainter(self)
+        
+        # Outline the other search areas with their names
+        qp.setPen(QtGui.QPen(QtGui.QColor('yellow'), 1))
+        for name, rect in self.regions:
+            qp.drawRect(rect)
+            qp.drawText(rect.topLeft() + QtCore.QPoint(4, 14), name)
+        
         qp.setPen(QtGui.QPen(QtGui.QColor('red'), 2))
         qp.setBrush(QtGui.QColor(128, 128, 255, 128))
         qp.drawRect(QtCore.QRect(self.begin, self.end))
@@ -995,8 +1753,9 @@ class ImageCropWidget(QtWidgets.QWidget):
     """Widget for cropping an image from the screen."""
     closed = QtCore.pyqtSignal()
 
-    def __init__(self):
+    def __init__(self, capture):
         super(ImageCropWidget, self).__init__()
+        self.capture = capture
         self.begin = QtCore.QPoint()
         self.end = QtCore.QPoint()
         self.setWindowFlags(QtCore.Qt.WindowType.FramelessWindowHint)
@@ -1048,7 +1807,7 @@ class ImageCropWidget(QtWidgets.QWidget):
             y2 = max(self.begin.y(), self.end.y())
             
             # Take screenshot
-            screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
+            screenshot = self.capture.grab_image((x1, y1, x2, y2))
             self.cropped_image = screenshot
             
             self.hide()
@@ -1060,11 +1819,21 @@ class ImageCropWidget(QtWidgets.QWidget):
 
 def main():
     """Main function to run the application."""
-    app = QtWidgets.QApplication(sys.argv)
-    ex = App()
-    ex.show()
+    with startup_profile.step("QApplication"):
+        app = QtWidgets.QApplication(sys.argv)
+    with startup_profile.step("App"):
+        ex = App()
+    with startup_profile.step("show"):
+        ex.show()
+    
+    # Print the profile once the first events are processed, then quit
+    if startup_profile.enabled():
+        QtCore.QTimer.singleShot(0, lambda: (startup_profile.report(), app.quit()))
+    
     sys.exit(app.exec_())
 
 
 if __name__ == "__main__":
+    # Matching processes start by importing this module, also in frozen builds
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
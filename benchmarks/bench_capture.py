@@ -0,0 +1,38 @@
+"""
+Measure the capture rate of every screen capture backend on this host.
+
+Usage: python benchmarks/bench_capture.py [--bbox 0 0 1920 1080] [--duration 2]
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture import AUTO_ORDER, BACKENDS, available_backends, benchmark_backends
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bbox", type=int, nargs=4, default=[0, 0, 1920, 1080],
+                        metavar=("X1", "Y1", "X2", "Y2"))
+    parser.add_argument("--duration", type=float, default=2.0,
+                        help="seconds to capture with each backend")
+    args = parser.parse_args()
+
+    available = available_backends()
+    for name in AUTO_ORDER:
+        if name not in available:
+            print(f"{name:<6} not available")
+
+    print(f"Capturing {args.bbox[2] - args.bbox[0]}x{args.bbox[3] - args.bbox[1]} "
+          f"for {args.duration}s per backend")
+    for name, rate in benchmark_backends(tuple(args.bbox), args.duration):
+        if isinstance(rate, float):
+            print(f"{name:<6} {rate:8.1f} frames/s  ({BACKENDS[name].__name__})")
+        else:
+            print(f"{name:<6} error: {rate}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Benchmark the detection loop: capture -> match -> click decision.
+
+Frames are replayed from a synthetic recording and clicks go to a dry-run
+mouse, so the results are reproducible on headless machines. Each case
+reports per-stage latency percentiles and iterations per second; --output
+saves them as a JSON baseline and --compare checks against an older one.
+
+Usage: python benchmarks/bench_detection.py [--quick] [--output baseline.json]
+                                            [--compare baseline.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import itertools
+
+import cv2
+import numpy as np
+
+from common import make_templates, percentiles, synthetic_screen
+from capture import ReplayCapture
+from input_backend import DryRunInput
+from matching import (Frame, MatchEngine, default_workers, match_template, match_template_fft,
+                      match_template_locate)
+
+# Matching backends that can be compared
+MATCHERS = {
+    "opencv": match_template,
+    "numpy": match_template_fft,
+    "locate": match_template_locate,
+}
+
+# Backends run by default, locate clicks the first place above the confidence
+# rather than the best one, so on the synthetic screen it hits a look-alike
+DEFAULT_BACKENDS = ("opencv", "numpy")
+
+# Stages timed in every iteration
+STAGES = ("capture", "match", "click")
+
+# Version of the JSON layout written by --output
+BASELINE_VERSION = 1
+
+# Largest click error in pixels before a case counts as a wrong result
+MAX_CLICK_ERROR = 2
+
+
+def parse_sizes(text):
+    """Parse "1280x720,1920x1080" into [(1280, 720), (1920, 1080)]."""
+    sizes = []
+    for item in text.split(","):
+        width, height = item.lower().split("x")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+def parse_list(text, cast):
+    """Parse a comma separated list."""
+    return [cast(item) for item in text.split(",") if item]
+
+
+def case_key(case):
+    """Identify a case across runs."""
+    return "{screen}|t{template_size}|n{template_count}|c{confidence}|{backend}".format(**case)
+
+
+def run_case(directory, screen_size, template_size, template_count, confidence,
+             backend, iterations, workers):
+    """Run one benchmark case and return its result dictionary."""
+    width, height = screen_size
+    screen = synthetic_screen(width, height)
+
+    # Two frames so the capture stage can't just hand back the same buffer
+    recording = os.path.join(directory, f"frames_{width}x{height}.npy")
+    if not os.path.exists(recording):
+        np.save(recording, np.stack([screen, screen.copy()]))
+    capture = ReplayCapture(recording)
+
+    # The last template is the one on screen, so "first found" has to look at all
+    templates, locations = make_templates(directory, screen, template_size, template_count)
+    templates.reverse()
+    locations.reverse()
+
+    engine = MatchEngine(workers=workers, matcher=MATCHERS[backend])
+    mouse = DryRunInput()
+    bbox = (0, 0, width, height)
+    samples = {stage: [] for stage in STAGES}
+    hits = 0
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        frame = Frame(capture.grab(bbox))
+        t1 = time.perf_counter()
+        match = engine.search(frame, templates, confidence)
+        t2 = time.perf_counter()
+        if match is not None:
+            hits += 1
+            click_x = bbox[0] + match.location[0] + match.template.width // 2
+            click_y = bbox[1] + match.location[1] + match.template.height // 2
+            mouse.move_to(click_x, click_y)
+            mouse.click()
+        t3 = time.perf_counter()
+        samples["capture"].append(t1 - t0)
+        samples["match"].append(t2 - t1)
+        samples["click"].append(t3 - t2)
+    elapsed = time.perf_counter() - start
+
+    engine.shutdown()
+    capture.close()
+
+    # How far the clicks landed from the center of the template on screen
+    x, y = next(location for location in locations if location is not None)
+    center = (x + template_size // 2, y + template_size // 2)
+    errors = [max(abs(cx - center[0]), abs(cy - center[1])) for cx, cy in mouse.clicks()]
+    return {
+        "screen": f"{width}x{height}",
+        "template_size": template_size,
+        "template_count": template_count,
+        "confidence": confidence,
+        "backend": backend,
+        "iterations": iterations,
+        "iterations_per_second": round(iterations / elapsed, 3),
+        "hit_rate": round(hits / iterations, 3),
+        "click_error_px": max(errors) if errors else None,
+        "stages_ms": {stage: percentiles(samples[stage]) for stage in STAGES},
+    }
+
+
+def wrong_result(result):
+    """Check whether a case missed the target or clicked too far from it."""
+    error = result["click_error_px"]
+    return error is None or error > MAX_CLICK_ERROR
+
+
+def describe_error(error):
+    """Describe the click error of a case."""
+    if error is None:
+        return "not found  WRONG"
+    if error == 0:
+        return "exact"
+    if error > MAX_CLICK_ERROR:
+        return f"off by {error}px  WRONG"
+    return f"off by {error}px"
+
+
+def print_result(result):
+    """Print one result line."""
+    match = result["stages_ms"]["match"]
+    capture = result["stages_ms"]["capture"]
+    print(f"{result['screen']:>10} {result['template_size']:>5} {result['template_count']:>5} "
+          f"{result['confidence']:>5} {result['backend']:>7} "
+          f"{capture['p50']:>9.2f} {match['p50']:>9.2f} {match['p95']:>9.2f} "
+          f"{result['iterations_per_second']:>8.2f}  {describe_error(result['click_error_px'])}")
+
+
+def compare(results, baseline_path, tolerance):
+    """Compare iterations per second against a saved baseline, return regressions."""
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    previous = {case_key(result): result for result in baseline.get("results", [])}
+
+    print(f"\nCompared with {baseline_path} ({baseline.get('created', 'unknown date')}):")
+    regressions = 0
+    for result in results:
+        old = previous.get(case_key(result))
+        if old is None:
+            continue
+        ratio = result["iterations_per_second"] / old["iterations_per_second"]
+        flag = ""
+        if ratio < 1.0 - tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{case_key(result):<45} {old['iterations_per_second']:>8.2f} -> "
+              f"{result['iterations_per_second']:>8.2f} it/s ({ratio:.2f}x){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--screens", default="1280x720,1920x1080",
+                        help="comma separated WIDTHxHEIGHT list")
+    parser.add_argument("--template-sizes", default="32,64")
+    parser.add_argument("--template-counts", default="1,8")
+    parser.add_argument("--confidences", default="0.8")
+    parser.add_argument("--backends", default=",".join(DEFAULT_BACKENDS),
+                        help="comma separated list of: " + ", ".join(MATCHERS))
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--quick", action="store_true",
+                        help="one small case per backend, for smoke tests")
+    parser.add_argument("--output", help="save results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed slowdown before a case counts as a regression")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.screens, args.template_sizes, args.template_counts = "640x480", "32", "4"
+        args.iterations = min(args.iterations, 5)
+
+    backends = parse_list(args.backends, str)
+    unknown = [backend for backend in backends if backend not in MATCHERS]
+    if unknown:
+        parser.error(f"unknown backend: {', '.join(unknown)}")
+
+    cases = itertools.product(
+        parse_sizes(args.screens),
+        parse_list(args.template_sizes, int),
+        parse_list(args.template_counts, int),
+        parse_list(args.confidences, float),
+        backends,
+    )
+
+    print(f"{'screen':>10} {'tsize':>5} {'count':>5} {'conf':>5} {'backend':>7} "
+          f"{'cap p50':>9} {'match p50':>9} {'match p95':>9} {'it/s':>8}  result")
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for screen, size, count, confidence, backend in cases:
+            result = run_case(directory, screen, size, count, confidence,
+                              backend, args.iterations, args.workers)
+            results.append(result)
+            print_result(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "version": BASELINE_VERSION,
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "host": {
+                    "platform": platform.platform(),
+                    "python": platform.python_version(),
+                    "opencv": cv2.__version__,
+                    "cpus": os.cpu_count(),
+                    "workers": args.workers,
+                },
+                "results": results,
+            }, f, indent=4)
+        print(f"\nSaved baseline to {args.output}")
+
+    failed = False
+    wrong = [case_key(result) for result in results if wrong_result(result)]
+    if wrong:
+        print(f"\n{len(wrong)} case(s) missed the target or clicked the wrong place: {', '.join(wrong)}")
+        failed = True
+    if args.compare:
+        failed = compare(results, args.compare, args.tolerance) > 0 or failed
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
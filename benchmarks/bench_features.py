@@ -0,0 +1,106 @@
+"""
+Benchmark keypoint feature matching against template matching.
+
+A target cut from another screen is pasted rotated, resized or partly
+covered into a synthetic screen. Each method reports whether it found the
+target, how far its click point was from the target center, and the time
+per search with the frame's keypoints computed fresh.
+
+Usage: python benchmarks/bench_features.py [--width 1280] [--height 720] [--size 96]
+"""
+import os
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+from common import MIN_TEMPLATE_STD, synthetic_screen, timed
+from templates import TemplateCache
+from matching import Frame, METHOD_AKAZE, METHOD_ORB, match_template
+from features import match_features, method_available
+
+# (name, rotation in degrees, scale, share of the target covered)
+CASES = (
+    ("unchanged", 0, 1.0, 0.0),
+    ("rotated 15", 15, 1.0, 0.0),
+    ("rotated 90", 90, 1.0, 0.0),
+    ("scaled 0.8", 0, 0.8, 0.0),
+    ("rotated 20, 1.2", 20, 1.2, 0.0),
+    ("30% covered", 0, 1.0, 0.3),
+)
+
+
+def cut_target(size, seed=9):
+    """Cut a size x size target with enough detail from a different screen."""
+    source = synthetic_screen(size * 5, size * 4, seed=seed)
+    rng = np.random.default_rng(seed)
+    while True:
+        x = int(rng.integers(0, source.shape[1] - size))
+        y = int(rng.integers(0, source.shape[0] - size))
+        target = source[y:y + size, x:x + size]
+        if target.std() >= MIN_TEMPLATE_STD:
+            return target.copy()
+
+
+def place_target(screen, target, angle, scale, covered):
+    """Paste the transformed target at the screen center, returning (screen, center)."""
+    screen = screen.copy()
+    height, width = target.shape[:2]
+    center = (screen.shape[1] // 2, screen.shape[0] // 2)
+    matrix = cv2.getRotationMatrix2D((width / 2.0, height / 2.0), angle, scale)
+    matrix[:, 2] += (center[0] - width / 2.0, center[1] - height / 2.0)
+    size = (screen.shape[1], screen.shape[0])
+    warped = cv2.warpAffine(target, matrix, size)
+    mask = cv2.warpAffine(np.full((height, width), 255, np.uint8), matrix, size) > 0
+    screen[mask] = warped[mask]
+    if covered:
+        # A plain panel over the left part of the target
+        left = int(center[0] - width * scale / 2)
+        right = int(left + width * scale * covered)
+        top, bottom = int(center[1] - height * scale / 2), int(center[1] + height * scale / 2)
+        screen[top:bottom, left:right] = (90, 90, 90)
+    return screen, center
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--size", type=int, default=96, help="target size in px")
+    parser.add_argument("--confidence", type=float, default=0.8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    screen = synthetic_screen(args.width, args.height)
+    target = cut_target(args.size)
+    methods = [("template", match_template)]
+    for method in (METHOD_ORB, METHOD_AKAZE):
+        if method_available(method):
+            methods.append((method, lambda frame, template, confidence, method=method:
+                            match_features(frame, template, confidence, method)))
+        else:
+            print(f"{method.upper()} is not available in this OpenCV build, skipped")
+
+    print(f"{args.width}x{args.height} screen, {args.size}px target")
+    print(f"{'case':>16} {'method':>9} {'time':>10} {'score':>6}  result")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "target.png")
+        cv2.imwrite(path, target)
+        template = TemplateCache().add(path)
+        for name, angle, scale, covered in CASES:
+            image, center = place_target(screen, target, angle, scale, covered)
+            for method, matcher in methods:
+                seconds, match = timed(lambda: matcher(Frame(image), template, args.confidence), args.repeat)
+                if match is None or match[0] < args.confidence:
+                    score, result = (match[0] if match is not None else 0.0), "not found"
+                else:
+                    click_x = match[1][0] + template.width // 2
+                    click_y = match[1][1] + template.height // 2
+                    error = max(abs(click_x - center[0]), abs(click_y - center[1]))
+                    score, result = match[0], "exact" if error == 0 else f"off by {error}px"
+                print(f"{name:>16} {method:>9} {seconds * 1000:>7.1f} ms {score:>6.2f}  {result}")
+
+
+if __name__ == "__main__":
+    main()
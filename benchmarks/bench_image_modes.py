@@ -0,0 +1,74 @@
+"""
+Benchmark per-template image modes (gray, single channel, edges) against full color.
+
+Every run matches all templates against a fresh frame, so the per-frame
+conversion, shared by all templates in one mode, is counted every time.
+
+Usage: python benchmarks/bench_image_modes.py [--width 1920] [--height 1080] [--templates 8]
+"""
+import argparse
+import tempfile
+
+from common import make_templates, synthetic_screen, timed
+from matching import (Frame, IMAGE_COLOR, IMAGE_MODES, match_template, match_template_fft,
+                      NUMPY_AVAILABLE)
+
+# Matching backends that support image modes
+MATCHERS = {
+    "opencv": match_template,
+    "numpy": match_template_fft,
+}
+
+
+def run_mode(screen, templates, locations, image_mode, matcher, repeat):
+    """Return (best seconds per frame, number of templates found where expected)."""
+    templates = [template.variant(image_mode) for template in templates]
+
+    def match_all():
+        frame = Frame(screen)
+        return [matcher(frame, template, 0.8) for template in templates]
+
+    seconds, matches = timed(match_all, repeat)
+    found = 0
+    for match, location in zip(matches, locations):
+        if location is not None and match is not None and match[0] >= 0.8 and match[1] == location:
+            found += 1
+    return seconds, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--template-size", type=int, default=48)
+    parser.add_argument("--templates", type=int, default=8)
+    parser.add_argument("--present", type=int, default=4,
+                        help="how many of the templates are on screen")
+    parser.add_argument("--backend", choices=sorted(MATCHERS), default="opencv")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.backend == "numpy" and not NUMPY_AVAILABLE:
+        parser.error("the numpy backend needs NumPy")
+    matcher = MATCHERS[args.backend]
+    screen = synthetic_screen(args.width, args.height)
+
+    with tempfile.TemporaryDirectory() as directory:
+        templates, locations = make_templates(directory, screen, args.template_size,
+                                              args.templates, present=args.present)
+
+        print(f"Frame {args.width}x{args.height}, {args.templates} templates of "
+              f"{args.template_size}px ({args.present} on screen), {args.backend} backend")
+        print(f"{'mode':<8} {'ms/frame':>9} {'frames/s':>9} {'speedup':>8}  found")
+
+        baseline = None
+        for image_mode in IMAGE_MODES:
+            seconds, found = run_mode(screen, templates, locations, image_mode, matcher, args.repeat)
+            if image_mode == IMAGE_COLOR:
+                baseline = seconds
+            print(f"{image_mode:<8} {seconds * 1000:>9.1f} {1.0 / seconds:>9.2f} "
+                  f"{baseline / seconds:>7.2f}x  {found}/{args.present}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark the template index against matching every target image.
+
+Most templates are cut from a different screen, as with a long list of
+targets where only a few are visible at a time. With the index, the cost
+per frame should grow much slower than the number of templates.
+
+Usage: python benchmarks/bench_index.py [--counts 10,40,160] [--present 4]
+"""
+import os
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+from common import MIN_TEMPLATE_STD, make_templates, synthetic_screen, timed
+from templates import TemplateCache
+from matching import Frame, MatchEngine, MODE_BEST
+from template_index import TemplateIndex
+
+# Templates cut from the other screen are between these sizes
+MIN_SIZE, MAX_SIZE = 16, 64
+
+
+def absent_templates(directory, screen, count, seed=3):
+    """Save count templates of random sizes cut from screen, which isn't the one searched."""
+    height, width = screen.shape[:2]
+    rng = np.random.default_rng(seed)
+    cache = TemplateCache()
+    templates = []
+    for i in range(count):
+        # Skip flat areas, they match anywhere and aren't realistic targets
+        while True:
+            w, h = int(rng.integers(MIN_SIZE, MAX_SIZE)), int(rng.integers(MIN_SIZE, MAX_SIZE))
+            x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+            if screen[y:y + h, x:x + w].std() >= MIN_TEMPLATE_STD:
+                break
+        path = os.path.join(directory, f"absent_{i}.png")
+        cv2.imwrite(path, screen[y:y + h, x:x + w])
+        templates.append(cache.add(path))
+    return templates
+
+
+def search(engine, index, frame, templates, confidence):
+    """Match the templates the index keeps, or all of them without an index."""
+    jobs = [(frame, template) for template in templates]
+    if index is not None:
+        # A new frame every time, its statistics are not reused
+        index.clear()
+        jobs, skipped = index.candidates(jobs)
+    return engine.search_jobs(jobs, confidence), len(jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--counts", default="10,40,160")
+    parser.add_argument("--present", type=int, default=4,
+                        help="templates that are on screen, the rest are not")
+    parser.add_argument("--confidence", type=float, default=0.8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    screen = synthetic_screen(args.width, args.height)
+    other = synthetic_screen(args.width, args.height, seed=5)
+    counts = [int(count) for count in args.counts.split(",") if count]
+    engine = MatchEngine(mode=MODE_BEST)
+
+    print(f"{args.width}x{args.height} screen, {args.present} templates on screen")
+    print(f"{'templates':>9} {'all':>11} {'indexed':>11} {'matched':>8} {'speedup':>8}  result")
+    with tempfile.TemporaryDirectory() as directory:
+        present, locations = make_templates(directory, screen, 32, args.present, present=args.present)
+        absent = absent_templates(directory, other, max(counts))
+        for count in counts:
+            templates = present + absent[:max(0, count - len(present))]
+            frame_time, (match, matched) = timed(
+                lambda: search(engine, None, Frame(screen), templates, args.confidence), args.repeat)
+            index_time, (index_match, index_matched) = timed(
+                lambda: search(engine, TemplateIndex(), Frame(screen), templates, args.confidence), args.repeat)
+            same = match is not None and index_match is not None and match.location == index_match.location
+            print(f"{len(templates):>9} {frame_time * 1000:>8.1f} ms {index_time * 1000:>8.1f} ms "
+                  f"{index_matched:>8} {frame_time / index_time:>7.2f}x  {'same' if same else 'DIFFERENT'}")
+    engine.shutdown()
+
+
+if __name__ == "__main__":
+    main()
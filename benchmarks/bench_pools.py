@@ -0,0 +1,92 @@
+"""
+Benchmark matching on the thread pool against matching on worker processes.
+
+Every template is matched against every frame ("best match" mode), so the
+time per frame shows how well each pool spreads the work over the CPUs.
+Process workers are started and sent their templates before timing.
+
+Usage: python benchmarks/bench_pools.py [--workers 1,2,4] [--backends opencv,numpy]
+                                        [--templates 16] [--frames 10]
+"""
+import os
+import argparse
+import tempfile
+
+from common import make_templates, synthetic_screen, timed
+from matching import Frame, MatchEngine, MODE_BEST, match_template, match_template_fft, match_template_locate
+from process_pool import ProcessMatchEngine
+
+# Backend name -> (thread pool matcher, worker matcher name)
+BACKENDS = {
+    "opencv": (match_template, "auto"),
+    "numpy": (match_template_fft, "numpy"),
+    "locate": (match_template_locate, "locate"),
+}
+
+
+def parse_list(text, cast):
+    """Parse a comma separated list."""
+    return [cast(item) for item in text.split(",") if item]
+
+
+def run_frames(engine, frames, templates, confidence):
+    """Match all templates against each frame, returning the last result."""
+    match = None
+    for frame in frames:
+        match = engine.search(frame, templates, confidence)
+    return match
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--template-size", type=int, default=48)
+    parser.add_argument("--templates", type=int, default=16)
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--backends", default="opencv,numpy",
+                        help="comma separated list of: " + ", ".join(BACKENDS))
+    parser.add_argument("--confidence", type=float, default=0.8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = parse_list(args.backends, str)
+    unknown = [backend for backend in backends if backend not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backend: {', '.join(unknown)}")
+
+    screen = synthetic_screen(args.width, args.height)
+    frames = [Frame(screen.copy()) for _ in range(args.frames)]
+    print(f"{args.width}x{args.height} screen, {args.templates} templates of "
+          f"{args.template_size}px, {os.cpu_count()} CPUs")
+    print(f"{'backend':>8} {'workers':>7} {'threads':>12} {'processes':>12} {'speedup':>8}  result")
+
+    with tempfile.TemporaryDirectory() as directory:
+        templates, locations = make_templates(directory, screen, args.template_size, args.templates)
+        for backend in backends:
+            matcher, worker_matcher = BACKENDS[backend]
+            for workers in parse_list(args.workers, int):
+                threads = MatchEngine(workers=workers, mode=MODE_BEST, matcher=matcher)
+                processes = ProcessMatchEngine(workers, MODE_BEST, matcher=worker_matcher)
+                processes.start([template.path for template in templates])
+                try:
+                    # Warm up, the first search also waits for the processes to start
+                    run_frames(processes, frames[:1], templates, args.confidence)
+                    thread_time, thread_match = timed(
+                        lambda: run_frames(threads, frames, templates, args.confidence), args.repeat)
+                    process_time, process_match = timed(
+                        lambda: run_frames(processes, frames, templates, args.confidence), args.repeat)
+                finally:
+                    threads.shutdown()
+                    processes.shutdown()
+
+                same = (thread_match is not None and process_match is not None
+                        and thread_match.location == process_match.location)
+                print(f"{backend:>8} {workers:>7} "
+                      f"{thread_time * 1000 / args.frames:>9.1f} ms {process_time * 1000 / args.frames:>9.1f} ms "
+                      f"{thread_time / process_time:>7.2f}x  {'same' if same else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark coarse-to-fine pyramid matching against single-scale matching.
+
+Usage: python benchmarks/bench_pyramid.py [--width 3840] [--height 2160] [--levels 3]
+"""
+import os
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+from common import synthetic_screen, timed
+from templates import TemplateCache
+from matching import Frame, match_template, match_template_pyramid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--template-size", type=int, default=64)
+    parser.add_argument("--templates", type=int, default=5)
+    parser.add_argument("--levels", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    image = synthetic_screen(args.width, args.height)
+    rng = np.random.default_rng(1)
+    cache = TemplateCache()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        truth = []
+        for i in range(args.templates):
+            x = int(rng.integers(0, args.width - args.template_size))
+            y = int(rng.integers(0, args.height - args.template_size))
+            path = os.path.join(tmp, f"template_{i}.png")
+            cv2.imwrite(path, image[y:y + args.template_size, x:x + args.template_size])
+            truth.append((cache.add(path), (x, y)))
+
+        print(f"Frame {args.width}x{args.height}, template {args.template_size}px, "
+              f"{args.levels} pyramid levels")
+        print(f"{'template':<10} {'single ms':>10} {'pyramid ms':>11} {'speedup':>8}  result")
+
+        total_single = total_pyramid = 0.0
+        for template, location in truth:
+            # A fresh Frame per run so the pyramid cost is counted every time
+            single, single_match = timed(
+                lambda: match_template(Frame(image), template, 0.8), args.repeat)
+            pyramid, pyramid_match = timed(
+                lambda: match_template_pyramid(Frame(image), template, 0.8, args.levels),
+                args.repeat)
+            total_single += single
+            total_pyramid += pyramid
+            same = pyramid_match is not None and pyramid_match[1] == single_match[1]
+            print(f"{os.path.basename(template.path)[:10]:<10} {single * 1000:>10.1f} "
+                  f"{pyramid * 1000:>11.1f} {single / pyramid:>7.1f}x  "
+                  f"{'ok' if same else 'MISMATCH'} {pyramid_match[1] if pyramid_match else None} "
+                  f"(expected {location})")
+
+        print(f"{'total':<10} {total_single * 1000:>10.1f} {total_pyramid * 1000:>11.1f} "
+              f"{total_single / total_pyramid:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Shared helpers for the benchmarks: synthetic screens, templates and timing.
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Make the application modules importable from the benchmarks directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from templates import TemplateCache
+
+# Templates flatter than this standard deviation are not used
+MIN_TEMPLATE_STD = 30.0
+
+
+def synthetic_screen(width, height, seed=0):
+    """Draw a desktop-like frame made of flat panels, buttons and text."""
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), 235, dtype=np.uint8)
+    for _ in range(max(1, width * height // 20000)):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        w, h = int(rng.integers(20, 300)), int(rng.integers(10, 120))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+        cv2.putText(frame, str(int(rng.integers(0, 99999))), (x + 4, y + h // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+
+    # Smooth texture so every spot is unique, like wallpapers and photos are
+    texture = cv2.GaussianBlur(rng.normal(0, 1, (height, width)).astype(np.float32), (0, 0), 3)
+    texture *= 40.0 / max(float(np.abs(texture).max()), 1e-6)
+    frame = np.clip(frame + texture[:, :, np.newaxis], 0, 255).astype(np.uint8)
+    return frame
+
+
+def make_templates(directory, screen, size, count, present=1, seed=1):
+    """Save count templates of size px, the first present ones cut from screen.
+
+    Returns (templates, locations) where locations holds the (x, y) of the
+    present templates and None for the others, which are random patterns.
+    """
+    height, width = screen.shape[:2]
+    rng = np.random.default_rng(seed)
+    cache = TemplateCache()
+    templates, locations = [], []
+    for i in range(count):
+        path = os.path.join(directory, f"template_{size}_{i}.png")
+        if i >= present:
+            noise = rng.integers(0, 255, (size, size, 3)).astype(np.uint8)
+            cv2.imwrite(path, cv2.GaussianBlur(noise, (0, 0), 1))
+            templates.append(cache.add(path))
+            locations.append(None)
+            continue
+
+        # Skip flat areas, they match anywhere and aren't realistic targets
+        while True:
+            x = int(rng.integers(0, width - size))
+            y = int(rng.integers(0, height - size))
+            if screen[y:y + size, x:x + size].std() >= MIN_TEMPLATE_STD:
+                break
+        cv2.imwrite(path, screen[y:y + size, x:x + size])
+        templates.append(cache.add(path))
+        locations.append((x, y))
+    return templates, locations
+
+
+def timed(func, repeat):
+    """Return (best seconds, result) of func over repeat runs."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """Return {"p50": ms, ...} plus the mean for a list of seconds."""
+    values = np.asarray(samples, dtype=float) * 1000.0
+    stats = {f"p{point}": round(float(np.percentile(values, point)), 3) for point in points}
+    stats["mean"] = round(float(values.mean()), 3)
+    return stats
@@ -0,0 +1,466 @@
+"""
+Screen capture backends for Auto Clicker with Image Detection.
+Each backend grabs a screen region straight into a reusable frame buffer.
+The replay backend feeds recorded frames instead, for headless runs.
+"""
+import os
+import sys
+import time
+import threading
+from PIL import Image, ImageGrab
+
+from lazy import lazy_import, module_available
+
+# Check if OpenCV is installed, it is only imported with the first frame
+OPENCV_AVAILABLE = module_available("cv2") and module_available("numpy")
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Check if mss is installed
+MSS_AVAILABLE = module_available("mss")
+mss = lazy_import("mss")
+
+# Backend names, "auto" picks the first available one from AUTO_ORDER
+BACKEND_AUTO = "auto"
+BACKEND_PIL = "pil"
+BACKEND_MSS = "mss"
+BACKEND_XSHM = "xshm"
+BACKEND_REPLAY = "replay"
+BACKEND_NAMES = (BACKEND_AUTO, BACKEND_XSHM, BACKEND_MSS, BACKEND_PIL, BACKEND_REPLAY)
+AUTO_ORDER = (BACKEND_XSHM, BACKEND_MSS, BACKEND_PIL)
+
+# Files the replay backend reads from a directory, in name order
+REPLAY_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+REPLAY_ARRAY_EXTENSIONS = (".npy", ".npz")
+
+# Several regions are captured as their bounding box unless it is this many
+# times larger than the regions together, then each one is grabbed on its own
+BOUNDING_CAPTURE_RATIO = 2.0
+
+
+class ReplayFinished(Exception):
+    """Raised by the replay backend when it runs out of frames."""
+
+
+def image_to_frame(image):
+    """Convert a captured PIL image into the in-memory frame used for matching."""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if OPENCV_AVAILABLE:
+        # OpenCV works on BGR arrays, convert without going through a file
+        return cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+    # pyautogui.locate accepts PIL images directly
+    return image
+
+
+def frame_to_image(frame_image):
+    """Convert a frame back into a PIL image, e.g. to save it."""
+    if hasattr(frame_image, "shape"):
+        return Image.fromarray(cv2.cvtColor(frame_image, cv2.COLOR_BGR2RGB))
+    return frame_image
+
+
+def box_area(box):
+    """Return the area of an (x1, y1, x2, y2) box."""
+    return max(0, box[2] - box[0]) * max(0, box[3] - box[1])
+
+
+def bounding_box(boxes):
+    """Return the smallest (x1, y1, x2, y2) box containing all boxes."""
+    return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+            max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+
+def split_image(image, bounds, boxes):
+    """Cut the boxes out of an image of the bounds region, without copying arrays."""
+    parts = []
+    for x1, y1, x2, y2 in boxes:
+        x1, y1, x2, y2 = x1 - bounds[0], y1 - bounds[1], x2 - bounds[0], y2 - bounds[1]
+        if hasattr(image, "shape"):
+            parts.append(image[y1:y2, x1:x2])
+        else:
+            parts.append(image.crop((x1, y1, x2, y2)))
+    return parts
+
+
+class CaptureBackend:
+    """Base class for screen capture backends.
+
+    grab() returns BGR arrays written into one of two alternating buffers,
+    so a frame stays valid until the second capture after it.
+    """
+
+    name = None
+
+    def __init__(self):
+        self._buffers = [None, None]
+        self._next = 0
+
+    @classmethod
+    def available(cls):
+        """Check whether the backend can be used on this machine."""
+        return True
+
+    def grab(self, bbox):
+        """Capture the (x1, y1, x2, y2) region as a frame image."""
+        raise NotImplementedError
+
+    def grab_image(self, bbox):
+        """Capture the (x1, y1, x2, y2) region as a PIL image."""
+        return frame_to_image(self.grab(bbox)).copy()
+
+    def grab_many(self, bboxes):
+        """Capture several (x1, y1, x2, y2) regions, returning one frame image each.
+
+        Uses one grab of the bounding box when it isn't much larger than the
+        regions, so all of them come from the same moment.
+        """
+        if len(bboxes) == 1:
+            return [self.grab(bboxes[0])]
+        bounds = bounding_box(bboxes)
+        if box_area(bounds) <= BOUNDING_CAPTURE_RATIO * sum(box_area(box) for box in bboxes):
+            return split_image(self.grab(bounds), bounds, bboxes)
+        # Separate grabs would overwrite each other's buffers
+        images = []
+        for bbox in bboxes:
+            image = self.grab(bbox)
+            images.append(image.copy() if hasattr(image, "shape") else image)
+        return images
+
+    def close(self):
+        """Release resources held by the backend."""
+
+    def _buffer(self, height, width):
+        """Return the next reusable BGR buffer of the given size."""
+        index = self._next
+        self._next = 1 - index
+        buffer = self._buffers[index]
+        if buffer is None or buffer.shape[:2] != (height, width):
+            buffer = np.empty((height, width, 3), dtype=np.uint8)
+            self._buffers[index] = buffer
+        return buffer
+
+
+class PILCapture(CaptureBackend):
+    """Capture with PIL.ImageGrab, available everywhere Pillow is."""
+
+    name = BACKEND_PIL
+
+    def grab(self, bbox):
+        image = ImageGrab.grab(bbox=bbox)
+        if not OPENCV_AVAILABLE:
+            return image_to_frame(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        array = np.asarray(image)
+        return cv2.cvtColor(array, cv2.COLOR_RGB2BGR,
+                            dst=self._buffer(array.shape[0], array.shape[1]))
+
+    def grab_image(self, bbox):
+        return ImageGrab.grab(bbox=bbox)
+
+
+class MSSCapture(CaptureBackend):
+    """Capture with mss, which avoids allocating a PIL image per frame."""
+
+    name = BACKEND_MSS
+    # mss 10 uses MIT-SHM on Linux by default, "mss" is the plain XGetImage path and "xshm" the shared one
+    mss_options = {"backend": "xgetimage"} if sys.platform.startswith("linux") else {}
+
+    def __init__(self):
+        super(MSSCapture, self).__init__()
+        # mss handles must be used on the thread that created them
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def available(cls):
+        if not MSS_AVAILABLE:
+            return False
+        try:
+            with mss.mss(**cls.mss_options):
+                return True
+        except Exception:
+            return False
+
+    def _handle(self):
+        """Return the mss handle of the calling thread."""
+        handle = getattr(self._local, "handle", None)
+        if handle is None:
+            handle = mss.mss(**self.mss_options)
+            self._local.handle = handle
+            with self._lock:
+                self._handles.append(handle)
+        return handle
+
+    def _shot(self, bbox):
+        """Grab the region with mss."""
+        x1, y1, x2, y2 = bbox
+        return self._handle().grab({
+            "left": x1,
+            "top": y1,
+            "width": x2 - x1,
+            "height": y2 - y1
+        })
+
+    def grab(self, bbox):
+        shot = self._shot(bbox)
+        if not OPENCV_AVAILABLE:
+            return Image.frombytes("RGB", shot.size, shot.raw, "raw", "BGRX")
+        width, height = shot.size
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(height, width, 4)
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=self._buffer(height, width))
+
+    def grab_image(self, bbox):
+        shot = self._shot(bbox)
+        return Image.frombytes("RGB", shot.size, shot.raw, "raw", "BGRX")
+
+    def close(self):
+        with self._lock:
+            for handle in self._handles:
+                try:
+                    handle.close()
+                except Exception:
+                    pass
+            self._handles = []
+        self._local = threading.local()
+
+
+class XShmCapture(MSSCapture):
+    """Capture through the X11 MIT-SHM extension (shared memory) with mss."""
+
+    name = BACKEND_XSHM
+    mss_options = {"backend": "xshmgetimage"}
+
+    @classmethod
+    def available(cls):
+        if not sys.platform.startswith("linux") or not MSS_AVAILABLE:
+            return False
+        try:
+            with mss.mss(**cls.mss_options) as handle:
+                # mss quietly falls back to XGetImage when MIT-SHM doesn't work, only a grab tells
+                handle.grab({"left": 0, "top": 0, "width": 1, "height": 1})
+                status = getattr(getattr(handle, "_impl", None), "shm_status", None)
+                return getattr(status, "name", None) == "AVAILABLE"
+        except Exception:
+            return False
+
+
+class ReplayCapture(CaptureBackend):
+    """Feed recorded frames instead of grabbing the screen.
+
+    The source is a directory of images, a video file or a .npy/.npz stack
+    of BGR frames. Every frame is treated as the whole screen and cropped to
+    the requested region, so recordings replay with the saved search area.
+    """
+
+    name = BACKEND_REPLAY
+
+    def __init__(self, source, loop=True, preload=False):
+        super(ReplayCapture, self).__init__()
+        if not source or not os.path.exists(source):
+            raise ValueError(f"Replay source not found: {source}")
+
+        self.source = source
+        self.loop = loop
+        self.frame_count = 0
+        self._frames = None
+        self._paths = None
+        self._video = None
+        self._index = 0
+        self._lock = threading.Lock()
+
+        if os.path.isdir(source):
+            self._paths = sorted(
+                os.path.join(source, name) for name in os.listdir(source)
+                if name.lower().endswith(REPLAY_IMAGE_EXTENSIONS)
+            )
+            self.frame_count = len(self._paths)
+            if preload:
+                self._frames = [self._read_image(path) for path in self._paths]
+        elif source.lower().endswith(REPLAY_ARRAY_EXTENSIONS):
+            self._frames = self._read_arrays(source)
+            self.frame_count = len(self._frames)
+        else:
+            self._open_video()
+
+        if self.frame_count == 0:
+            raise ValueError(f"No frames in replay source: {source}")
+
+    def grab(self, bbox):
+        with self._lock:
+            image = self._next_frame()
+        return self._crop(image, bbox)
+
+    def grab_many(self, bboxes):
+        # Every region comes from the same recorded frame
+        bounds = bounding_box(bboxes)
+        with self._lock:
+            image = self._next_frame()
+        return split_image(self._crop(image, bounds), bounds, bboxes)
+
+    def close(self):
+        with self._lock:
+            if self._video is not None:
+                self._video.release()
+                self._video = None
+
+    def _next_frame(self):
+        """Return the next full frame, looping or raising ReplayFinished at the end."""
+        if self._index >= self.frame_count:
+            if not self.loop:
+                raise ReplayFinished(f"Replay finished after {self.frame_count} frames")
+            self._index = 0
+            if self._video is not None:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+        index = self._index
+        self._index += 1
+        if self._frames is not None:
+            return self._frames[index]
+        if self._video is not None:
+            ok, image = self._video.read()
+            if not ok:
+                if index == 0:
+                    raise ValueError(f"Cannot read replay video: {self.source}")
+                # Some containers report more frames than they hold
+                self.frame_count = index
+                return self._next_frame()
+            return image
+        return self._read_image(self._paths[index])
+
+    def _crop(self, image, bbox):
+        """Cut bbox out of a full frame into a reusable buffer."""
+        x1, y1, x2, y2 = bbox
+        if hasattr(image, "shape"):
+            height, width = image.shape[:2]
+            x1, x2 = max(0, min(x1, width)), max(0, min(x2, width))
+            y1, y2 = max(0, min(y1, height)), max(0, min(y2, height))
+            buffer = self._buffer(y2 - y1, x2 - x1)
+            buffer[...] = image[y1:y2, x1:x2, :3]
+            return buffer
+        return image.crop((x1, y1, x2, y2))
+
+    def _read_image(self, path):
+        """Decode a frame image from disk."""
+        if OPENCV_AVAILABLE:
+            image = cv2.imread(path)
+            if image is None:
+                raise ValueError(f"Cannot read replay frame: {path}")
+            return image
+        with Image.open(path) as img:
+            return img.convert("RGB")
+
+    def _read_arrays(self, path):
+        """Load a (frames, height, width, 3) stack from .npy or .npz."""
+        if not OPENCV_AVAILABLE:
+            raise RuntimeError("Replaying .npy/.npz frames requires OpenCV and NumPy")
+        if path.lower().endswith(".npz"):
+            with np.load(path) as archive:
+                arrays = [archive[key] for key in sorted(archive.files)]
+            stack = arrays[0] if len(arrays) == 1 else arrays
+        else:
+            stack = np.load(path, mmap_mode="r")
+        if isinstance(stack, np.ndarray) and stack.ndim == 3:
+            stack = stack[np.newaxis]
+        return stack
+
+    def _open_video(self):
+        """Open a video file with OpenCV."""
+        if not OPENCV_AVAILABLE:
+            raise RuntimeError("Replaying video requires OpenCV")
+        self._video = cv2.VideoCapture(self.source)
+        if not self._video.isOpened():
+            raise ValueError(f"Cannot open replay video: {self.source}")
+        self.frame_count = int(self._video.get(cv2.CAP_PROP_FRAME_COUNT))
+
+
+BACKENDS = {
+    BACKEND_PIL: PILCapture,
+    BACKEND_MSS: MSSCapture,
+    BACKEND_XSHM: XShmCapture,
+}
+
+
+def available_backends():
+    """Return the names of the backends that work on this machine."""
+    return [name for name in AUTO_ORDER if BACKENDS[name].available()]
+
+
+def create_backend(name=BACKEND_AUTO, replay_source=None):
+    """Create a capture backend by name, falling back to the fastest available one."""
+    if name == BACKEND_REPLAY:
+        return ReplayCapture(replay_source)
+    if name in BACKENDS and BACKENDS[name].available():
+        return BACKENDS[name]()
+    for candidate in AUTO_ORDER:
+        if BACKENDS[candidate].available():
+            return BACKENDS[candidate]()
+    return PILCapture()
+
+
+class DeferredCapture:
+    """A capture backend chosen by name on its first use.
+
+    Finding out which backends work imports mss and opens a display
+    connection, so the window and the engine start without doing it.
+    """
+
+    def __init__(self, name=BACKEND_AUTO):
+        self.requested = name
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        """Return the backend, creating it on first use."""
+        with self._lock:
+            if self._backend is None:
+                self._backend = create_backend(self.requested)
+            return self._backend
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    def grab(self, bbox):
+        return self.backend.grab(bbox)
+
+    def grab_image(self, bbox):
+        return self.backend.grab_image(bbox)
+
+    def grab_many(self, bboxes):
+        return self.backend.grab_many(bboxes)
+
+    def close(self):
+        with self._lock:
+            backend, self._backend = self._backend, None
+        if backend is not None:
+            backend.close()
+
+
+def measure_backend(backend, bbox, duration=1.0):
+    """Grab bbox repeatedly for about duration seconds and return frames per second."""
+    frames = 0
+    start = time.perf_counter()
+    while True:
+        backend.grab(bbox)
+        frames += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            return frames / elapsed
+
+
+def benchmark_backends(bbox, duration=1.0):
+    """Return a list of (name, frames per second or error) for every available backend."""
+    results = []
+    for name in available_backends():
+        backend = BACKENDS[name]()
+        try:
+            results.append((name, measure_backend(backend, bbox, duration)))
+        except Exception as e:
+            results.append((name, str(e)))
+        finally:
+            backend.close()
+    return results
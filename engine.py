@@ -0,0 +1,747 @@
+"""
+Detection engine for Auto Clicker with Image Detection.
+Runs the capture -> match -> click loop without any GUI, configured with the
+same keys as snips/settings.json. The PyQt window and headless.py both drive it.
+"""
+import os
+import time
+import threading
+
+from templates import TemplateCache
+from settings_store import read_settings
+from capture import BACKEND_AUTO, BACKEND_REPLAY, DeferredCapture, ReplayCapture, ReplayFinished, frame_to_image
+from input_backend import DryRunInput, PyAutoGUIInput
+from metrics import LoopMetrics
+from scheduler import AdaptiveInterval, Scheduler, TargetOrder, CPU_BUDGET, MAX_INTERVAL, MIN_INTERVAL
+from frame_diff import ChangeDetector, IncrementalMatcher
+from features import match_features, method_available
+from template_index import TEMPLATE_INDEX_AVAILABLE, TemplateIndex
+from process_pool import POOL_KINDS, POOL_PROCESSES, POOL_THREADS, PROCESS_POOL_AVAILABLE, ProcessMatchEngine
+from matching import (Frame, MatchEngine, RegionTracker, ScaleHints, IMAGE_COLOR, IMAGE_MODES,
+                      MATCH_METHODS, METHOD_TEMPLATE, MODE_FIRST_FOUND, SCALE_MAX, SCALE_MIN, SCALE_STEPS, default_workers,
+                      find_all_matches, find_all_multi_scale, match_multi_scale, match_template,
+                      match_template_pyramid, match_tracked, scale_list)
+
+# Files written next to the saved target images
+SNIPS_DIR = "snips"
+SETTINGS_PATH = os.path.join(SNIPS_DIR, "settings.json")
+DEBUG_FRAME_PATH = os.path.join(SNIPS_DIR, "temp_screenshot.png")
+DRY_RUN_LOG_PATH = os.path.join(SNIPS_DIR, "dry_run.log")
+
+# Name of the search area chosen with "Select Screen Area", other areas are named by the user
+MAIN_REGION = "Main"
+
+# Order in which find-all mode clicks its hits
+ORDER_READING = "reading"
+ORDER_NEAREST = "nearest"
+ORDER_SCORE = "score"
+CLICK_ORDERS = (ORDER_READING, ORDER_NEAREST, ORDER_SCORE)
+
+# Shortest wait between checks while every target image is unchecked
+IDLE_WAIT = 0.5
+
+
+def ensure_snips_directory():
+    """Create the snips directory if it doesn't exist."""
+    if not os.path.exists(SNIPS_DIR):
+        os.makedirs(SNIPS_DIR)
+        return True
+    return False
+
+
+def parse_seconds(value, default=None):
+    """Parse a delay given as a number or text, returning default if invalid."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def order_clicks(clicks, order, start=(0, 0)):
+    """Sort (match, (x, y)) click targets for find-all mode.
+
+    Reading order goes row by row, top to bottom and left to right, where
+    hits less than half a target's height apart share a row. Nearest-first
+    always goes to the closest remaining hit, starting from start.
+    """
+    if order == ORDER_SCORE:
+        return sorted(clicks, key=lambda click: -click[0].score)
+
+    if order == ORDER_NEAREST:
+        remaining = list(clicks)
+        ordered = []
+        x, y = start
+        while remaining:
+            index = min(range(len(remaining)),
+                        key=lambda i: (remaining[i][1][0] - x) ** 2 + (remaining[i][1][1] - y) ** 2)
+            click = remaining.pop(index)
+            ordered.append(click)
+            x, y = click[1]
+        return ordered
+
+    rows = []
+    for click in sorted(clicks, key=lambda click: click[1][1]):
+        if rows and click[1][1] - rows[-1][0][1][1] < rows[-1][0][0].template.height / 2:
+            rows[-1].append(click)
+        else:
+            rows.append([click])
+    return [click for row in rows for click in sorted(row, key=lambda click: click[1][0])]
+
+
+def area_box(area):
+    """Return a search area dict as (x1, y1, x2, y2), or None if not selected."""
+    if any(area.get(key) is None for key in ("x1", "y1", "x2", "y2")):
+        return None
+    return (area["x1"], area["y1"], area["x2"], area["y2"])
+
+
+def debug_frame_path(region):
+    """Return where the captured frame of a search area is saved when debugging."""
+    if region == MAIN_REGION:
+        return DEBUG_FRAME_PATH
+    name = "".join(c if c.isalnum() else "_" for c in region)
+    return os.path.join(SNIPS_DIR, f"temp_screenshot_{name}.png")
+
+
+def target_entry(entry):
+    """Return a target image entry as a dict, also accepting a plain path from old settings."""
+    if isinstance(entry, str):
+        entry = {"path": entry}
+    entry = dict(entry)
+    if entry.get("image_mode") not in IMAGE_MODES:
+        entry["image_mode"] = IMAGE_COLOR
+    # Template matching, or keypoint features for rotated or partly covered targets
+    if entry.get("method") not in MATCH_METHODS:
+        entry["method"] = METHOD_TEMPLATE
+    # Names of the search areas to look in, all of them when empty
+    entry["regions"] = list(entry.get("regions") or [])
+    # Unchecked images are kept in the list but not looked for
+    entry["enabled"] = bool(entry.get("enabled", True))
+    # Images with a higher priority are matched first
+    entry["priority"] = int(entry.get("priority") or 0)
+    # Seconds after a click before the image is looked for again
+    entry["cooldown"] = max(0.0, float(entry.get("cooldown") or 0.0))
+    return entry
+
+
+class EngineConfig:
+    """Search loop settings, read from the same keys as snips/settings.json."""
+
+    def __init__(self, settings=None):
+        settings = settings or {}
+        self.search_area = dict(settings.get("search_area") or {
+            "x1": None, "y1": None, "x2": None, "y2": None, "width": None, "height": None
+        })
+        # More search areas, dicts like search_area with a "name"
+        self.search_regions = [dict(region) for region in settings.get("search_regions", [])]
+        self.confidence = float(settings.get("confidence", 0.8))
+        # Kept as given so validate() can report invalid text
+        self.delay_time = settings.get("delay_time", "2")
+        self.click_delay_time = max(0.0, parse_seconds(settings.get("click_delay_time"), 0.0))
+        self.move_delay_time = max(0.0, parse_seconds(settings.get("move_delay_time"), 0.0))
+        self.preview_only = bool(settings.get("preview_only", False))
+        self.return_mouse = bool(settings.get("return_mouse", True))
+        self.save_debug_frames = bool(settings.get("save_debug_frames", False))
+        self.dry_run = bool(settings.get("dry_run", False))
+        self.match_workers = int(settings.get("match_workers") or default_workers())
+        # Match on threads, or on worker processes that don't share the GIL
+        self.match_pool = settings.get("match_pool", POOL_THREADS)
+        if self.match_pool not in POOL_KINDS:
+            self.match_pool = POOL_THREADS
+        self.adaptive_rate = bool(settings.get("adaptive_rate", False))
+        self.min_interval = max(0.0, parse_seconds(settings.get("min_interval"), MIN_INTERVAL))
+        self.max_interval = max(0.0, parse_seconds(settings.get("max_interval"), MAX_INTERVAL))
+        # Percent of one CPU core, 0 for no limit
+        self.cpu_budget = float(settings.get("cpu_budget", CPU_BUDGET * 100))
+        self.match_mode = settings.get("match_mode", MODE_FIRST_FOUND)
+        self.pyramid_levels = int(settings.get("pyramid_levels", 1))
+        self.roi_tracking = bool(settings.get("roi_tracking", True))
+        # Also try the target images resized, for zoomed pages and other DPI settings
+        self.multi_scale = bool(settings.get("multi_scale", False))
+        self.scale_min = float(settings.get("scale_min", SCALE_MIN))
+        self.scale_max = float(settings.get("scale_max", SCALE_MAX))
+        self.scale_steps = int(settings.get("scale_steps", SCALE_STEPS))
+        self.skip_unchanged = bool(settings.get("skip_unchanged", True))
+        # Match only target images whose colors can be on screen, for long image lists
+        self.index_templates = bool(settings.get("index_templates", False))
+        # Match often found, quick to match images first, within each priority
+        self.adaptive_order = bool(settings.get("adaptive_order", False))
+        # Click every hit of every target image in one pass, in click_order
+        self.find_all = bool(settings.get("find_all", False))
+        self.click_order = settings.get("click_order", ORDER_READING)
+        if self.click_order not in CLICK_ORDERS:
+            self.click_order = ORDER_READING
+        self.capture_backend = settings.get("capture_backend", BACKEND_AUTO)
+        self.replay_source = settings.get("replay_source", "")
+        # Dicts with the image "path" and its per-image options
+        self.target_images = [target_entry(entry) for entry in settings.get("target_images", [])]
+        # Only used by headless runs, never saved by the GUI
+        self.replay_loop = bool(settings.get("replay_loop", True))
+        self.max_iterations = int(settings.get("max_iterations", 0))
+
+    @classmethod
+    def load(cls, path=SETTINGS_PATH):
+        """Read a settings file, returning (config, list of invalid values skipped).
+
+        Settings saved by older versions are upgraded.
+        """
+        settings, problems = read_settings(path)
+        return cls(settings), problems
+
+    def bbox(self):
+        """Return the search area as (x1, y1, x2, y2), or None if not selected."""
+        return area_box(self.search_area)
+
+    def regions(self):
+        """Return (name, (x1, y1, x2, y2)) of every selected search area, the main one first."""
+        regions = []
+        if self.bbox() is not None:
+            regions.append((MAIN_REGION, self.bbox()))
+        for region in self.search_regions:
+            box = area_box(region)
+            if box is not None and region.get("name"):
+                regions.append((region["name"], box))
+        return regions
+
+    def entry_regions(self, entry, regions=None):
+        """Return the names of the search areas a target image is looked for in."""
+        names = [name for name, box in (regions or self.regions())]
+        assigned = [name for name in entry["regions"] if name in names]
+        return assigned or names
+
+    def target_paths(self):
+        """Return the paths of the target images."""
+        return [entry["path"] for entry in self.target_images]
+
+    def delay_seconds(self):
+        """Return the delay between searches in seconds."""
+        return parse_seconds(self.delay_time, 0.0)
+
+    def scales(self):
+        """Return the template scales to try, nearest to 1 first."""
+        if not self.multi_scale:
+            return [1.0]
+        return scale_list(self.scale_min, self.scale_max, self.scale_steps)
+
+    def validate(self):
+        """Raise ValueError if the loop can't run with these settings."""
+        if not self.regions():
+            raise ValueError("Please select a search area first")
+        if not self.target_images:
+            raise ValueError("Please select at least one target image")
+        if not any(entry["enabled"] for entry in self.target_images):
+            raise ValueError("Please enable at least one target image")
+        delay_time = parse_seconds(self.delay_time)
+        if delay_time is None:
+            raise ValueError("Invalid delay time")
+        if delay_time < 0:
+            raise ValueError("Delay time must be positive")
+        if self.multi_scale and (self.scale_min <= 0 or self.scale_max < self.scale_min):
+            raise ValueError("Invalid scale range")
+        if self.match_pool == POOL_PROCESSES and not PROCESS_POOL_AVAILABLE:
+            raise ValueError("Matching processes need NumPy installed")
+        if self.index_templates and not TEMPLATE_INDEX_AVAILABLE:
+            raise ValueError("Skipping target images by color needs NumPy installed")
+        for entry in self.target_images:
+            if entry["method"] != METHOD_TEMPLATE and not method_available(entry["method"]):
+                raise ValueError(f"{entry['method'].upper()} feature matching is not available "
+                                 f"in this OpenCV installation")
+
+
+class DetectionEngine:
+    """Capture the search area, match the target images and click on hits.
+
+    Callbacks are called from the loop thread: on_status(message) for
+    progress text, on_found(match) on every hit and on_stopped(message)
+    once the loop ends, with message None when it was simply stopped.
+    """
+
+    def __init__(self, config=None, on_status=None, on_found=None, on_stopped=None):
+        self.on_status = on_status
+        self.on_found = on_found
+        self.on_stopped = on_stopped
+
+        # Decoded target images, reloaded only when the file changes
+        self.template_cache = TemplateCache()
+        # Timings of the search loop stages
+        self.metrics = LoopMetrics()
+        # Last found position of each target image
+        self.region_tracker = RegionTracker()
+        # Previous frame of each search area and results, so unchanged parts aren't matched again
+        self.change_detectors = {}
+        self.incremental_matcher = IncrementalMatcher(self.match_frame, self.match_region)
+        # Color statistics that rule out target images before they are matched
+        self.template_index = TemplateIndex()
+        # Scale each target image was last found at, tried first next time
+        self.scale_hints = ScaleHints()
+        self._scales = [1.0]
+        # Which target images each search matches and in what order, with their cooldowns
+        self.target_order = TargetOrder()
+        # Thread pool that matches the target images in parallel
+        self.match_engine = MatchEngine(matcher=self.score_image, all_matcher=self.score_all)
+        # Worker processes used instead of the thread pool, started when first needed
+        self.process_engine = None
+        # Templates that had no hits in find-all mode, while the screen stays the same
+        self._find_all_misses = None
+
+        self.capture = None
+        self._capture_key = None
+        self._mouse = None
+        self._dry_run_mouse = None
+
+        # Deadline waits between and within searches, woken up by stop()
+        self.scheduler = Scheduler()
+        # Wait between searches in adaptive mode, and the resulting searches per second
+        self.rate_controller = AdaptiveInterval()
+        self.effective_rate = 0.0
+
+        self.running = False
+        self._thread = None
+
+        self.config = EngineConfig()
+        self.configure(config or EngineConfig())
+
+    def configure(self, config):
+        """Apply new settings, also while the loop is running.
+
+        Raises ValueError, leaving the old settings in place, if the capture
+        backend can't be created.
+        """
+        old = self.config
+
+        # Capture backend first, it is the only part that can fail
+        key = (config.capture_backend, config.replay_source, config.replay_loop)
+        if self.capture is None or key != self._capture_key:
+            if config.capture_backend == BACKEND_REPLAY:
+                capture = ReplayCapture(config.replay_source, loop=config.replay_loop)
+            else:
+                # The backend is picked with the first capture, not at startup
+                capture = DeferredCapture(config.capture_backend)
+            if self.capture is not None and not self.running:
+                self.capture.close()
+            self.capture = capture
+            self._capture_key = key
+            self.reset_frame_history()
+
+        self.config = config
+        self._scales = config.scales()
+        self.incremental_matcher.max_scale = max(self._scales)
+        self.match_engine.configure(workers=config.match_workers, mode=config.match_mode)
+        if config.match_pool == POOL_PROCESSES:
+            self.pool_engine(config).configure(workers=config.match_workers, mode=config.match_mode,
+                                               pyramid_levels=config.pyramid_levels, scales=self._scales)
+        elif self.process_engine is not None and not self.running:
+            self.process_engine.shutdown()
+        self.rate_controller.configure(config.min_interval, config.max_interval,
+                                       config.cpu_budget / 100.0)
+
+        # Removed target images, new ones are decoded when the loop starts
+        paths = config.target_paths()
+        for path in old.target_paths():
+            if path not in paths:
+                self.template_cache.remove(path)
+
+        # Positions and frames are relative to the search area
+        if config.regions() != old.regions() or config.roi_tracking != old.roi_tracking:
+            self.region_tracker.clear()
+        if config.regions() != old.regions() or config.skip_unchanged != old.skip_unchanged:
+            self.reset_frame_history()
+        if self._scales != old.scales():
+            self.scale_hints.clear()
+            self.reset_frame_history()
+
+    def reset_frame_history(self):
+        """Forget the previous frame and its match results."""
+        self.change_detectors.clear()
+        self.incremental_matcher.clear()
+        self.template_index.clear()
+        self._find_all_misses = None
+
+    def start(self):
+        """Run the loop on a background thread, raising ValueError for bad settings."""
+        self.config.validate()
+        # A loop that was just stopped may still be finishing its iteration,
+        # and it marks the engine as not running when it exits
+        if self._thread is not None and self._thread.is_alive():
+            self.stop()
+            self.wait()
+
+        # Positions, scales and frames from a previous run may be out of date
+        self.region_tracker.clear()
+        self.scale_hints.clear()
+        self.reset_frame_history()
+        self.metrics.reset()
+        self.rate_controller.reset()
+        self.target_order.reset()
+
+        self.running = True
+        self.scheduler.reset()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the loop, interrupting any wait it is in."""
+        self.scheduler.stop()
+        self.running = False
+
+    def wait(self, timeout=None):
+        """Wait for the background loop to finish."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def close(self):
+        """Stop the loop and release threads, files and capture handles."""
+        self.stop()
+        self.wait(1.0)
+        self.match_engine.shutdown()
+        if self.process_engine is not None:
+            self.process_engine.shutdown()
+        self.metrics.stop_export()
+        if self.capture is not None:
+            self.capture.close()
+
+    def run(self):
+        """Run the search loop on the calling thread until stopped."""
+        self.config.validate()
+        self.running = True
+        self.scheduler.reset()
+        self._run()
+
+    def _run(self):
+        """Loop until stopped and report why it ended."""
+        message = None
+        try:
+            # Decode target images before the first search rather than during it
+            for path in self.config.target_paths():
+                self.template_cache.add(path)
+            if self.config.match_pool == POOL_PROCESSES:
+                self.pool_engine(self.config).start(self.config.target_paths())
+
+            while self.running and not self.scheduler.stopped:
+                self.run_once(self.config)
+                limit = self.config.max_iterations
+                if limit and self.metrics.iteration_count >= limit:
+                    message = f"Finished {limit} iterations"
+                    break
+        except ReplayFinished as e:
+            message = str(e)
+        except Exception as e:
+            message = f"Error: {str(e)}"
+        finally:
+            self.running = False
+            self.effective_rate = 0.0
+            if self.on_stopped is not None:
+                self.on_stopped(message)
+
+    def run_once(self, config):
+        """Capture, match and click once, then wait for the search delay."""
+        mouse = self.mouse(config)
+        metrics = self.metrics
+        start_time = time.perf_counter()
+        start_cpu = time.process_time()
+
+        # Enabled images not in cooldown, in the order to match them
+        targets = self.target_order.select(config.target_images, config.adaptive_order)
+        if not targets:
+            return self.wait_for_targets(config, start_time, start_cpu)
+
+        # Save initial mouse position if needed
+        if config.return_mouse:
+            original_position = mouse.position()
+
+        # Only capture the search areas some target image is looked for in
+        regions = config.regions()
+        entry_regions = [config.entry_regions(entry, regions) for entry in targets]
+        used = set(name for names in entry_regions for name in names)
+        regions = [(name, box) for name, box in regions if name in used]
+
+        # Take screenshots of the search areas straight into frame buffers
+        with metrics.time("capture"):
+            images = self.capture.grab_many([box for name, box in regions])
+            frames = {}
+            for (name, box), image in zip(regions, images):
+                frame = Frame(image, (box[0], box[1]), name)
+                # Adaptive mode also needs to know whether the screen changed
+                if config.skip_unchanged or config.adaptive_rate:
+                    frame.dirty = self.change_detector(name).update(frame)
+                frames[name] = frame
+
+        # Keep the frames in memory, only write them out when debugging
+        if config.save_debug_frames:
+            ensure_snips_directory()
+            for name, frame in frames.items():
+                frame_to_image(frame.image).save(debug_frame_path(name))
+
+        # Get decoded images, skip files that are missing or unreadable
+        with metrics.time("template_load"):
+            jobs = []
+            for entry, names in zip(targets, entry_regions):
+                template = self.template_cache.get(entry["path"], entry["image_mode"], entry["method"])
+                if template is not None:
+                    # Match each image only in its own search areas
+                    jobs.extend((frames[name], template) for name in names)
+
+        # Match all target images against their frames
+        with metrics.time("match"):
+            if config.index_templates:
+                jobs = self.prune_jobs(jobs, config)
+            if config.find_all:
+                hits = self.find_all(jobs, config)
+            else:
+                match = self.pool_engine(config).search_jobs(
+                    jobs, config.confidence,
+                    should_stop=lambda: self.scheduler.stopped
+                )
+                hits = [match] if match is not None else []
+
+        if self.scheduler.stopped:
+            return None
+
+        # The best hit is reported in the metrics
+        match = max(hits, key=lambda hit: hit.score) if hits else None
+        if hits:
+            clicks = [(hit, self.click_point(hit)) for hit in hits]
+            if len(clicks) > 1:
+                self.status(f"Found {len(clicks)} matches")
+                start = original_position if config.return_mouse else mouse.position()
+                clicks = order_clicks(clicks, config.click_order, start)
+
+            # Click every hit without capturing again in between
+            for hit, (click_x, click_y) in clicks:
+                if not self.click_match(config, mouse, hit, click_x, click_y):
+                    return match
+
+            # Move mouse back to original position if needed
+            if config.return_mouse and not config.preview_only:
+                with metrics.time("move"):
+                    mouse.move_to(*original_position)
+        else:
+            self.status("Image not found")
+
+        # Delay before searching again, shorter while the screen is active in adaptive mode
+        busy_time = time.perf_counter() - start_time
+        if config.adaptive_rate:
+            active = match is not None or any(frame.dirty != [] for frame in frames.values())
+            delay = self.rate_controller.next_interval(
+                active, busy_time, time.process_time() - start_cpu
+            )
+        else:
+            delay = config.delay_seconds()
+        self.effective_rate = 1.0 / (busy_time + delay) if busy_time + delay > 0 else 0.0
+        self.sleep(delay)
+
+        metrics.end_iteration(
+            found=os.path.basename(match.template.path) if match is not None else "",
+            score=round(match.score, 4) if match is not None else "",
+            interval_ms=round(delay * 1000.0, 3)
+        )
+        return match
+
+    def wait_for_targets(self, config, start_time, start_cpu):
+        """Wait without searching while no target image can be looked for."""
+        if config.adaptive_rate:
+            delay = self.rate_controller.next_interval(
+                False, time.perf_counter() - start_time, time.process_time() - start_cpu
+            )
+        else:
+            delay = config.delay_seconds()
+        wait = self.target_order.ready_in(config.target_images)
+        if wait is not None:
+            self.status(f"All target images cooling down, next in {wait:.1f}s")
+            delay = max(delay, wait)
+        else:
+            # Unchecked while running, checked again once one is enabled by configure()
+            self.status("No target images enabled")
+            delay = max(delay, IDLE_WAIT)
+        self.effective_rate = 0.0
+        self.sleep(delay)
+        self.metrics.end_iteration(found="", score="", interval_ms=round(delay * 1000.0, 3))
+        return None
+
+    def click_point(self, match):
+        """Return the screen position of the center of a hit."""
+        return (match.frame.origin[0] + match.location[0] + match.template.width // 2,
+                match.frame.origin[1] + match.location[1] + match.template.height // 2)
+
+    def click_match(self, config, mouse, match, click_x, click_y):
+        """Move to a hit and click it, returning False if stopped before moving."""
+        # Display information
+        name = os.path.basename(match.template.path)
+        if match.frame.region not in (None, MAIN_REGION):
+            name = f"{name} in {match.frame.region}"
+        self.status(f"Found image: {name} at ({click_x}, {click_y})")
+        if self.on_found is not None:
+            self.on_found(match)
+
+        # Wait after image found and before moving mouse
+        if config.move_delay_time > 0:
+            self.status(f"Waiting {config.move_delay_time}s before moving mouse...")
+            self.sleep(config.move_delay_time)
+
+        if self.scheduler.stopped:
+            return False
+
+        with self.metrics.time("move"):
+            mouse.move_to(click_x, click_y)
+        # Not looked for again until its cooldown is over
+        self.target_order.clicked(match.template.path)
+
+        if not config.preview_only:
+            # Wait before clicking if there's delay
+            if config.click_delay_time > 0:
+                self.status(f"Waiting {config.click_delay_time}s before clicking...")
+                self.sleep(config.click_delay_time)
+
+            # Click at found position
+            if not self.scheduler.stopped:
+                with self.metrics.time("click"):
+                    mouse.click()
+                self.status(f"Clicked at ({click_x}, {click_y})")
+        return True
+
+    def find_all(self, jobs, config):
+        """Return a MatchResult for every hit of every (frame, template) job."""
+        # Nothing changed since a search without hits, so there are still none
+        key = [(frame.region, template.path, template.mtime, template.size, template.image_mode,
+                template.method) for frame, template in jobs]
+        unchanged = all(frame.dirty == [] for frame, template in jobs)
+        if config.skip_unchanged and unchanged and key == self._find_all_misses:
+            return []
+
+        hits = self.pool_engine(config).search_all_jobs(
+            jobs, config.confidence,
+            should_stop=lambda: self.scheduler.stopped
+        )
+        self._find_all_misses = None if hits else key
+        return hits
+
+    def pool_engine(self, config):
+        """Return the engine that matches on the pool chosen in the settings.
+
+        Worker processes match whole search areas, without the tracked
+        positions and unchanged-screen shortcuts of the thread pool.
+        """
+        if config.match_pool != POOL_PROCESSES:
+            return self.match_engine
+        if self.process_engine is None:
+            self.process_engine = ProcessMatchEngine(
+                config.match_workers, config.match_mode,
+                on_timing=self.record_template,
+                on_error=lambda template, message: self.status(f"Error finding image: {message}")
+            )
+            self.process_engine.configure(pyramid_levels=config.pyramid_levels, scales=self._scales)
+        return self.process_engine
+
+    def prune_jobs(self, jobs, config):
+        """Drop the (frame, template) jobs whose template can't be in its frame."""
+        # Resized images have other thumbnails, only their colors are checked then
+        jobs, skipped = self.template_index.candidates(jobs, check_thumbnails=not config.multi_scale)
+        # Later frames only re-match what changed since this result
+        for frame, template in skipped:
+            self.incremental_matcher.record(frame, template, None)
+        return jobs
+
+    def change_detector(self, region):
+        """Return the change detector of a search area."""
+        if region not in self.change_detectors:
+            self.change_detectors[region] = ChangeDetector()
+        return self.change_detectors[region]
+
+    def sleep(self, seconds):
+        """Wait for the given time, returning early when stopped."""
+        with self.metrics.time("sleep"):
+            waited = self.scheduler.wait(seconds)
+        if waited is not None:
+            self.metrics.record_drift(seconds, waited)
+
+    def status(self, message):
+        """Report progress to the status callback."""
+        if self.on_status is not None:
+            self.on_status(message)
+
+    def mouse(self, config):
+        """Return the input backend for this iteration."""
+        if config.dry_run:
+            if self._dry_run_mouse is None:
+                ensure_snips_directory()
+                self._dry_run_mouse = DryRunInput(DRY_RUN_LOG_PATH)
+            return self._dry_run_mouse
+        if self._mouse is None:
+            self._mouse = PyAutoGUIInput()
+        return self._mouse
+
+    def score_image(self, frame, template, confidence):
+        """Return the (score, location) of the best match, or None on error."""
+        start = time.perf_counter()
+        match = None
+        try:
+            # Features are matched on the whole frame, they have no score map to reuse parts of
+            if template.method != METHOD_TEMPLATE:
+                match = match_features(frame, template, confidence, template.method)
+            elif self.config.skip_unchanged:
+                match = self.incremental_matcher(frame, template, confidence)
+            else:
+                match = self.match_frame(frame, template, confidence)
+            return match
+        except Exception as e:
+            self.status(f"Error finding image: {str(e)}")
+            return None
+        finally:
+            self.record_template(template, time.perf_counter() - start, match)
+
+    def score_all(self, frame, template, confidence):
+        """Return every (score, location) above confidence, or an empty list on error."""
+        start = time.perf_counter()
+        matches = []
+        try:
+            if template.method != METHOD_TEMPLATE:
+                # One homography per image, so at most one hit
+                match = match_features(frame, template, confidence, template.method)
+                if match is not None and match[0] >= confidence:
+                    matches = [match]
+            elif len(self._scales) > 1:
+                matches = find_all_multi_scale(frame, template, confidence, self._scales, self.scale_hints)
+            else:
+                matches = find_all_matches(frame, template, confidence)
+            return matches
+        except Exception as e:
+            self.status(f"Error finding image: {str(e)}")
+            return []
+        finally:
+            self.record_template(template, time.perf_counter() - start, matches)
+
+    def record_template(self, template, seconds, result):
+        """Record the match time and whether a template was found, for the metrics and the order."""
+        if isinstance(result, list):
+            found = bool(result)
+        else:
+            found = result is not None and result[0] >= self.config.confidence
+        self.metrics.record_template(template.path, seconds)
+        self.target_order.record(template.path, seconds, found)
+
+    def match_frame(self, frame, template, confidence):
+        """Match the template, near its last found position first if enabled."""
+        if self.config.roi_tracking:
+            return match_tracked(frame, template, confidence, self.region_tracker,
+                                 self.match_full_area, self.match_region)
+        return self.match_full_area(frame, template, confidence)
+
+    def match_region(self, frame, template, confidence):
+        """Match the template against a small part of the frame, at every scale."""
+        if len(self._scales) > 1:
+            return match_multi_scale(frame, template, confidence, self._scales, self.scale_hints)
+        return match_template(frame, template, confidence)
+
+    def match_full_area(self, frame, template, confidence):
+        """Match the template against the whole frame."""
+        if len(self._scales) > 1:
+            return match_multi_scale(frame, template, confidence, self._scales, self.scale_hints,
+                                     self.match_unscaled)
+        return self.match_unscaled(frame, template, confidence)
+
+    def match_unscaled(self, frame, template, confidence):
+        """Match the template as is against the whole frame."""
+        if self.config.pyramid_levels > 1:
+            return match_template_pyramid(frame, template, confidence, self.config.pyramid_levels)
+        return match_template(frame, template, confidence)
@@ -0,0 +1,147 @@
+"""
+Keypoint feature matching for Auto Clicker with Image Detection.
+Finds target images that are rotated, skewed or partly covered, where
+template matching fails, by matching ORB or AKAZE keypoints and fitting a
+homography. Keypoints are computed once per template and once per frame.
+"""
+import os
+import threading
+
+from lazy import lazy_import, module_available
+from matching import IMAGE_GRAY, METHOD_ORB, convert_image
+
+# ORB is part of every OpenCV build, see method_available() for AKAZE
+FEATURES_AVAILABLE = module_available("cv2") and module_available("numpy")
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Most keypoints ORB keeps for a frame and for a template
+FRAME_FEATURES = 20000
+TEMPLATE_FEATURES = 500
+# Corner contrast ORB needs, lower than OpenCV's default of 20 for flat UI graphics
+ORB_FAST_THRESHOLD = 8
+# Templates are padded so keypoints near their edges get a full descriptor patch
+TEMPLATE_BORDER = 32
+# A keypoint match is kept if it is this much closer than the second best
+RATIO_TEST = 0.75
+# Fewest matches agreeing with the homography for a hit
+MIN_INLIERS = 8
+# Distance in pixels within which a match agrees with the homography
+RANSAC_THRESHOLD = 5.0
+# Size of the found target relative to the saved image, by area
+MIN_AREA_RATIO = 0.1
+MAX_AREA_RATIO = 10.0
+
+# OpenCV detectors and matchers are not safe to share between threads
+_local = threading.local()
+
+
+def method_available(method):
+    """Check whether this OpenCV build has the detector, AKAZE is missing from some."""
+    if not FEATURES_AVAILABLE:
+        return False
+    return method == METHOD_ORB or hasattr(cv2, "AKAZE_create")
+
+
+def detector(method):
+    """Return this thread's detector for ORB or AKAZE."""
+    detectors = getattr(_local, "detectors", None)
+    if detectors is None:
+        detectors = _local.detectors = {}
+    if method not in detectors:
+        if method == METHOD_ORB:
+            detectors[method] = cv2.ORB_create(nfeatures=FRAME_FEATURES, fastThreshold=ORB_FAST_THRESHOLD)
+        else:
+            detectors[method] = cv2.AKAZE_create()
+    return detectors[method]
+
+
+def matcher():
+    """Return this thread's brute force matcher for binary descriptors."""
+    if getattr(_local, "matcher", None) is None:
+        _local.matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    return _local.matcher
+
+
+def detect(gray, method, max_features=None, border=0):
+    """Return (points, descriptors) of a gray image, or None if it has too few keypoints."""
+    if border:
+        gray = cv2.copyMakeBorder(gray, border, border, border, border, cv2.BORDER_REPLICATE)
+    keypoints, descriptors = detector(method).detectAndCompute(gray, None)
+    if descriptors is None or len(keypoints) < MIN_INLIERS:
+        return None
+    if max_features is not None and len(keypoints) > max_features:
+        # Keep the strongest, a template needs fewer than a whole frame
+        order = sorted(range(len(keypoints)), key=lambda i: -keypoints[i].response)[:max_features]
+        keypoints = [keypoints[i] for i in order]
+        descriptors = descriptors[order]
+    points = np.float32([keypoint.pt for keypoint in keypoints]) - border
+    return points, descriptors
+
+
+def template_features(template, method):
+    """Return the cached keypoints of a template."""
+    gray = template.derived(IMAGE_GRAY, lambda image: convert_image(image, IMAGE_GRAY))
+    return template.derived(("features", method),
+                            lambda image: detect(gray, method, TEMPLATE_FEATURES, TEMPLATE_BORDER))
+
+
+def frame_features(frame, method):
+    """Return the keypoints of a frame, shared by all templates matched against it."""
+    gray = frame.derived(IMAGE_GRAY, lambda image: convert_image(image, IMAGE_GRAY))
+    return frame.derived(("features", method), lambda image: detect(gray, method))
+
+
+def plausible_outline(corners, area):
+    """Check that the template outline mapped onto the frame is a sane, convex shape."""
+    if not np.all(np.isfinite(corners)):
+        return False
+    edges = np.roll(corners, -1, axis=0) - corners
+    turns = edges[:, 0] * np.roll(edges, -1, axis=0)[:, 1] - edges[:, 1] * np.roll(edges, -1, axis=0)[:, 0]
+    if not (np.all(turns > 0) or np.all(turns < 0)):
+        return False
+    mapped_area = abs(float(cv2.contourArea(corners)))
+    return MIN_AREA_RATIO * area <= mapped_area <= MAX_AREA_RATIO * area
+
+
+def match_features(frame, template, confidence, method=METHOD_ORB):
+    """Return (score, location) of the template found by keypoint features, or None.
+
+    The score is the share of keypoint matches that agree with the fitted
+    homography. The location is where the template would sit, unrotated,
+    around the center the homography maps the template center to, so the
+    click point is still location + template size / 2. Raises ValueError
+    if the template has too few keypoints to be found.
+    """
+    if frame is None or template is None:
+        return None
+    found = template_features(template, method)
+    if found is None:
+        raise ValueError(f"{os.path.basename(template.path)} has too few details for feature matching")
+    scene = frame_features(frame, method)
+    if scene is None:
+        return None
+
+    template_points, template_descriptors = found
+    frame_points, frame_descriptors = scene
+    pairs = matcher().knnMatch(template_descriptors, frame_descriptors, k=2)
+    good = [pair[0] for pair in pairs if len(pair) == 2 and pair[0].distance < RATIO_TEST * pair[1].distance]
+    if len(good) < MIN_INLIERS:
+        return None
+
+    source = template_points[[match.queryIdx for match in good]]
+    target = frame_points[[match.trainIdx for match in good]]
+    homography, mask = cv2.findHomography(source, target, cv2.RANSAC, RANSAC_THRESHOLD)
+    if homography is None:
+        return None
+    inliers = int(mask.sum())
+    if inliers < MIN_INLIERS:
+        return None
+
+    width, height = template.width, template.height
+    corners = np.float32([[0, 0], [width, 0], [width, height], [0, height]]).reshape(-1, 1, 2)
+    if not plausible_outline(cv2.perspectiveTransform(corners, homography).reshape(-1, 2), width * height):
+        return None
+    center = cv2.perspectiveTransform(np.float32([[[width / 2.0, height / 2.0]]]), homography)[0, 0]
+    location = (int(round(center[0])) - width // 2, int(round(center[1])) - height // 2)
+    return inliers / float(len(good)), location
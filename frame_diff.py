@@ -0,0 +1,195 @@
+"""
+Change detection for Auto Clicker with Image Detection.
+Compares each captured frame with the previous one so unchanged screens
+aren't matched again and partly changed screens only re-match the dirty tiles.
+"""
+import threading
+from PIL import ImageChops
+
+from lazy import lazy_import, module_available
+from matching import crop_frame, frame_size, match_template
+
+# Check if OpenCV is installed, it is only imported once frames are compared
+OPENCV_AVAILABLE = module_available("cv2") and module_available("numpy")
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Size of the tiles the frame is split into
+TILE_SIZE = 64
+# Per-channel difference ignored as noise
+DIFF_THRESHOLD = 8
+# Above this fraction of dirty tiles the whole frame is matched again
+MAX_DIRTY_FRACTION = 0.5
+
+# Marks a template that has no result from the previous frame
+_MISSING = object()
+
+
+class ChangeDetector:
+    """Keep the previous frame and report which parts of the next one changed."""
+
+    def __init__(self, tile_size=TILE_SIZE, threshold=DIFF_THRESHOLD,
+                 max_dirty_fraction=MAX_DIRTY_FRACTION):
+        self.tile_size = tile_size
+        self.threshold = threshold
+        self.max_dirty_fraction = max_dirty_fraction
+        self._previous = None
+
+    def reset(self):
+        """Forget the previous frame so the next one is matched in full."""
+        self._previous = None
+
+    def update(self, frame):
+        """Compare frame with the previous one and store it.
+
+        Returns None when the whole frame has to be matched, an empty list
+        when nothing changed, or a list of (x1, y1, x2, y2) dirty boxes.
+        """
+        image = frame.image
+        previous, self._previous = self._previous, image
+        if previous is None or self._size(previous) != self._size(image):
+            return None
+
+        if OPENCV_AVAILABLE and hasattr(image, "shape"):
+            return self._dirty_tiles(previous, image)
+        return self._dirty_bbox(previous, image)
+
+    def _size(self, image):
+        """Return the size of an array or PIL image."""
+        if hasattr(image, "shape"):
+            return image.shape
+        return image.size
+
+    def _dirty_tiles(self, previous, image):
+        """Return the boxes around groups of changed tiles."""
+        diff = cv2.absdiff(previous, image)
+        if diff.ndim == 3:
+            diff = diff.max(axis=2)
+        changed = diff > self.threshold
+        if not changed.any():
+            return []
+
+        # Reduce the changed pixels to one flag per tile
+        height, width = changed.shape
+        tile = self.tile_size
+        rows, cols = -(-height // tile), -(-width // tile)
+        padded = np.zeros((rows * tile, cols * tile), dtype=bool)
+        padded[:height, :width] = changed
+        tiles = padded.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+        if tiles.mean() > self.max_dirty_fraction:
+            return None
+
+        # Merge touching tiles into boxes
+        count, labels, stats, centroids = cv2.connectedComponentsWithStats(
+            tiles.astype(np.uint8), connectivity=8
+        )
+        boxes = []
+        for label in range(1, count):
+            x, y, w, h = stats[label][:4]
+            boxes.append((
+                int(x) * tile,
+                int(y) * tile,
+                min(width, int(x + w) * tile),
+                min(height, int(y + h) * tile)
+            ))
+        return boxes
+
+    def _dirty_bbox(self, previous, image):
+        """Return the single box around all changes, using PIL only."""
+        diff = ImageChops.difference(previous, image).convert("L")
+        diff = diff.point(lambda value: 255 if value > self.threshold else 0)
+        bbox = diff.getbbox()
+        if bbox is None:
+            return []
+        width, height = image.size
+        if (bbox[2] - bbox[0]) * (bbox[3] - bbox[1]) > width * height * self.max_dirty_fraction:
+            return None
+        return [bbox]
+
+
+class IncrementalMatcher:
+    """Reuse each template's previous result for the parts of the frame that didn't change.
+
+    Scores of TM_CCOEFF_NORMED only depend on the pixels under the template,
+    so a result stays valid unless its window overlaps a dirty box, and new
+    matches can only appear in windows that overlap one.
+    """
+
+    def __init__(self, matcher=match_template, region_matcher=match_template):
+        # Used when the whole frame has to be matched
+        self.matcher = matcher
+        # Used for the windows around dirty boxes
+        self.region_matcher = region_matcher
+        # Largest template scale the matchers try, scaled windows reach further
+        self.max_scale = 1.0
+        # (search area, path, mtime, size, image mode) -> (score, location) or None from the last frame
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Forget all previous results."""
+        with self._lock:
+            self._results.clear()
+
+    def record(self, frame, template, match):
+        """Store the result of a template matched, or ruled out, some other way."""
+        key = (frame.region, template.path, template.mtime, template.size, template.image_mode)
+        with self._lock:
+            self._results[key] = match
+
+    def __call__(self, frame, template, confidence):
+        """Return (score, location) like match_template, using frame.dirty."""
+        key = (frame.region, template.path, template.mtime, template.size, template.image_mode)
+        with self._lock:
+            previous = self._results.get(key, _MISSING)
+        dirty = frame.dirty
+
+        if dirty is None or previous is _MISSING:
+            match = self.matcher(frame, template, confidence)
+        elif not dirty:
+            # Nothing changed, no need to match at all
+            match = previous
+        elif previous is not None and self._overlaps(previous[1], template, dirty):
+            match = self.matcher(frame, template, confidence)
+        else:
+            match = self._match_dirty(frame, template, confidence, dirty, previous)
+
+        with self._lock:
+            self._results[key] = match
+        return match
+
+    def _window_size(self, template):
+        """Return the size of the largest window the template is matched with."""
+        scale = max(1.0, self.max_scale)
+        return int(template.width * scale + 0.5), int(template.height * scale + 0.5)
+
+    def _overlaps(self, location, template, boxes):
+        """Check whether the template window at location touches a dirty box."""
+        width, height = self._window_size(template)
+        # Scaled windows share the center of the unscaled one
+        x = location[0] - (width - template.width) // 2
+        y = location[1] - (height - template.height) // 2
+        for x1, y1, x2, y2 in boxes:
+            if x < x2 and x + width > x1 and y < y2 and y + height > y1:
+                return True
+        return False
+
+    def _match_dirty(self, frame, template, confidence, boxes, previous):
+        """Match only the windows that overlap a dirty box."""
+        width, height = frame_size(frame)
+        window_width, window_height = self._window_size(template)
+        best = previous
+        for x1, y1, x2, y2 in boxes:
+            # Any window overlapping the box starts at most one window size before it
+            box = (
+                max(0, x1 - window_width + 1),
+                max(0, y1 - window_height + 1),
+                min(width, x2 + window_width - 1),
+                min(height, y2 + window_height - 1)
+            )
+            if box[2] - box[0] < template.width or box[3] - box[1] < template.height:
+                continue
+            match = self.region_matcher(crop_frame(frame, box), template, confidence)
+            if match is not None and (best is None or match[0] > best[0]):
+                best = (match[0], (box[0] + match[1][0], box[1] + match[1][1]))
+        return best
@@ -0,0 +1,136 @@
+"""
+Headless runner for Auto Clicker with Image Detection.
+Runs the search loop from a settings file without loading PyQt, e.g. on a
+server, over SSH or as a background service.
+
+Usage: python headless.py [--settings snips/settings.json] [--replay PATH]
+                          [--dry-run] [--iterations N] [--duration SECONDS]
+"""
+import sys
+import time
+import argparse
+import threading
+import multiprocessing
+
+from capture import BACKEND_NAMES, BACKEND_REPLAY
+from engine import SETTINGS_PATH, DetectionEngine, EngineConfig
+from process_pool import POOL_KINDS
+from metrics import format_snapshot
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--settings", default=SETTINGS_PATH,
+                        help="settings file saved by the window (default: %(default)s)")
+    parser.add_argument("--capture", choices=BACKEND_NAMES,
+                        help="override the capture method")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="replay recorded frames instead of the screen")
+    parser.add_argument("--once", action="store_true",
+                        help="stop at the end of the replay instead of looping")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="log clicks to snips/dry_run.log instead of moving the mouse")
+    parser.add_argument("--delay", type=float, help="override the delay between searches")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="back off while nothing changes, between the saved min/max intervals")
+    parser.add_argument("--find-all", action="store_true",
+                        help="click every match in one pass, in the saved click order")
+    parser.add_argument("--multi-scale", action="store_true",
+                        help="also search for resized target images, over the saved scale range")
+    parser.add_argument("--index", action="store_true",
+                        help="skip target images whose colors aren't on screen before matching")
+    parser.add_argument("--adaptive-order", action="store_true",
+                        help="match often found, quick to match target images first within each priority")
+    parser.add_argument("--pool", choices=POOL_KINDS,
+                        help="match on threads or on worker processes, overriding the settings")
+    parser.add_argument("--iterations", type=int, default=0,
+                        help="stop after this many searches (0 = no limit)")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="stop after this many seconds (0 = no limit)")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="write loop timings to a .csv or .jsonl file")
+    parser.add_argument("--quiet", action="store_true", help="only print errors and the summary")
+    return parser.parse_args(argv)
+
+
+def load_config(args):
+    """Read the settings file and apply command line overrides, returning (config, problems)."""
+    config, problems = EngineConfig.load(args.settings)
+    if args.capture:
+        config.capture_backend = args.capture
+    if args.replay:
+        config.capture_backend = BACKEND_REPLAY
+        config.replay_source = args.replay
+    if args.once:
+        config.replay_loop = False
+    if args.dry_run:
+        config.dry_run = True
+    if args.delay is not None:
+        config.delay_time = args.delay
+    if args.adaptive:
+        config.adaptive_rate = True
+    if args.find_all:
+        config.find_all = True
+    if args.multi_scale:
+        config.multi_scale = True
+    if args.index:
+        config.index_templates = True
+    if args.adaptive_order:
+        config.adaptive_order = True
+    if args.pool:
+        config.match_pool = args.pool
+    config.max_iterations = args.iterations
+    return config, problems
+
+
+def main(argv=None):
+    """Run the search loop until stopped, a limit is reached or Ctrl+C."""
+    args = parse_args(argv)
+    errors = []
+
+    def print_status(message):
+        if not args.quiet:
+            print(f"{time.strftime('%H:%M:%S')} {message}", flush=True)
+
+    def print_stopped(message):
+        if message:
+            print(message, flush=True)
+            if message.startswith("Error"):
+                errors.append(message)
+
+    try:
+        config, problems = load_config(args)
+        if problems:
+            # Like the window, run with the defaults but say what was skipped
+            print(f"Settings loaded, skipped {len(problems)} invalid values: {', '.join(problems)}",
+                  file=sys.stderr)
+        engine = DetectionEngine(config, on_status=print_status, on_stopped=print_stopped)
+        config.validate()
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+
+    if args.metrics:
+        engine.metrics.start_export(args.metrics)
+    if args.duration > 0:
+        timer = threading.Timer(args.duration, engine.stop)
+        timer.daemon = True
+        timer.start()
+
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        engine.stop()
+        print("Stopped")
+    finally:
+        if engine.metrics.iteration_count:
+            print(format_snapshot(engine.metrics.snapshot()))
+        engine.close()
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    # Matching processes re-import this module, also in frozen builds
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Mouse input backends for Auto Clicker with Image Detection.
+The dry-run backend records clicks instead of moving the real mouse.
+"""
+import time
+import threading
+
+
+class PyAutoGUIInput:
+    """Move and click the real mouse with pyautogui."""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        # Imported on first use, it needs a display to load
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def position(self):
+        """Return the current (x, y) mouse position."""
+        x, y = self._pyautogui.position()
+        return x, y
+
+    def move_to(self, x, y):
+        """Move the mouse to (x, y)."""
+        self._pyautogui.moveTo(x, y)
+
+    def click(self):
+        """Click at the current mouse position."""
+        self._pyautogui.click()
+
+
+class DryRunInput:
+    """Record mouse actions instead of performing them.
+
+    Every action is kept in events as (timestamp, action, x, y) and, when
+    log_path is given, appended to that file as one tab-separated line.
+    """
+
+    name = "dry-run"
+
+    def __init__(self, log_path=None, start_position=(0, 0)):
+        self.log_path = log_path
+        self.events = []
+        self._position = tuple(start_position)
+        self._lock = threading.Lock()
+
+    def position(self):
+        with self._lock:
+            return self._position
+
+    def move_to(self, x, y):
+        with self._lock:
+            self._position = (x, y)
+        self._record("move", x, y)
+
+    def click(self):
+        x, y = self.position()
+        self._record("click", x, y)
+
+    def clicks(self):
+        """Return the (x, y) positions of all recorded clicks."""
+        with self._lock:
+            return [(x, y) for timestamp, action, x, y in self.events if action == "click"]
+
+    def _record(self, action, x, y):
+        """Store an action and append it to the log file."""
+        event = (time.time(), action, x, y)
+        with self._lock:
+            self.events.append(event)
+            if self.log_path:
+                with open(self.log_path, "a") as f:
+                    f.write(f"{event[0]:.3f}\t{action}\t{x}\t{y}\n")
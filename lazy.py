@@ -0,0 +1,54 @@
+"""
+Deferred imports for Auto Clicker with Image Detection.
+Heavy optional modules (OpenCV, NumPy, mss) are only loaded when first used,
+so the window and the bundled executable start quickly.
+"""
+import importlib
+import importlib.util
+
+
+def module_available(name):
+    """Check whether a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Attributes are copied onto the stand-in once looked up, so hot loops
+    only pay for the indirection the first time.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+
+    def _lazy_load(self):
+        """Import the real module."""
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            # The import lock makes concurrent first uses safe
+            module = importlib.import_module(self.__dict__["_lazy_name"])
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        value = getattr(self._lazy_load(), attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __setattr__(self, attr, value):
+        setattr(self._lazy_load(), attr, value)
+        self.__dict__[attr] = value
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_lazy_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """Return a stand-in for module name that imports it on first use."""
+    return LazyModule(name)
@@ -0,0 +1,836 @@
+"""
+Template matching for Auto Clicker with Image Detection.
+Runs the target images against a captured frame, optionally on a thread pool.
+"""
+import os
+import math
+import threading
+from PIL import ImageFilter, ImageStat
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from lazy import lazy_import, module_available
+
+# Check if OpenCV is installed, it is only imported once matching starts
+OPENCV_AVAILABLE = module_available("cv2")
+cv2 = lazy_import("cv2")
+
+# Without OpenCV, NumPy alone still gives scored matches
+NUMPY_AVAILABLE = module_available("numpy")
+np = lazy_import("numpy")
+
+# Match modes
+MODE_FIRST_FOUND = "first"
+MODE_BEST = "best"
+MATCH_MODES = (MODE_FIRST_FOUND, MODE_BEST)
+
+# Image modes, chosen per template: full color, grayscale, the template's
+# highest-contrast channel, or a gradient magnitude (edge) map
+IMAGE_COLOR = "color"
+IMAGE_GRAY = "gray"
+IMAGE_CHANNEL = "channel"
+IMAGE_EDGES = "edges"
+IMAGE_MODES = (IMAGE_COLOR, IMAGE_GRAY, IMAGE_CHANNEL, IMAGE_EDGES)
+
+# How a template is found, chosen per template: template matching, or
+# ORB / AKAZE keypoint features for rotated or partly covered targets
+METHOD_TEMPLATE = "template"
+METHOD_ORB = "orb"
+METHOD_AKAZE = "akaze"
+MATCH_METHODS = (METHOD_TEMPLATE, METHOD_ORB, METHOD_AKAZE)
+
+# Pyramid matching never shrinks a template below this many pixels per side
+MIN_PYRAMID_SIZE = 8
+# Number of coarse candidates confirmed at full resolution
+PYRAMID_CANDIDATES = 3
+
+# Windows with less variance than this score 0 in the NumPy matcher
+FFT_MIN_VARIANCE = 1e-6
+
+# Default multi-scale search range, for zoom and DPI changes
+SCALE_MIN = 0.8
+SCALE_MAX = 1.25
+SCALE_STEPS = 5
+# Scaled templates smaller than this many pixels per side are skipped
+MIN_SCALED_SIZE = 6
+
+# Find-all mode: at most this many hits per template, and hits whose
+# windows overlap by more than this fraction count as the same object
+MAX_MATCHES = 100
+NMS_OVERLAP = 0.3
+
+# Region tracking searches this many template sizes around the last hit
+ROI_EXPAND = 1.0
+# Forget the last hit after this many consecutive misses
+ROI_MAX_MISSES = 3
+
+
+def default_workers():
+    """Number of matching threads to use when none is configured."""
+    return os.cpu_count() or 1
+
+
+class Frame:
+    """A captured frame plus derived images shared by all templates."""
+
+    def __init__(self, image, origin=(0, 0), region=None):
+        # BGR array when OpenCV is available, PIL image otherwise
+        self.image = image
+        # Screen position of the top-left pixel, and the search area it shows
+        self.origin = origin
+        self.region = region
+        # Boxes that changed since the previous frame, None if unknown
+        self.dirty = None
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived(self, key, build):
+        """Return build(self.image), computing it only once per key."""
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = build(self.image)
+            return self._derived[key]
+
+
+def frame_size(frame):
+    """Return (width, height) of a frame."""
+    image = frame.image
+    if hasattr(image, "shape"):
+        return image.shape[1], image.shape[0]
+    return image.width, image.height
+
+
+def crop_frame(frame, box):
+    """Return a new Frame holding the (x1, y1, x2, y2) part of frame."""
+    x1, y1, x2, y2 = box
+    image = frame.image
+    origin = (frame.origin[0] + x1, frame.origin[1] + y1)
+    if hasattr(image, "shape"):
+        return Frame(image[y1:y2, x1:x2], origin, frame.region)
+    return Frame(image.crop((x1, y1, x2, y2)), origin, frame.region)
+
+
+def best_channel(image):
+    """Return the index of the channel with the most contrast."""
+    if hasattr(image, "shape"):
+        return int(image.reshape(-1, image.shape[2]).std(axis=0).argmax())
+    stddev = ImageStat.Stat(image).stddev
+    return stddev.index(max(stddev))
+
+
+def convert_image(image, image_mode, channel=0):
+    """Convert a BGR array or RGB PIL image for matching in image_mode."""
+    if image_mode == IMAGE_GRAY:
+        if hasattr(image, "shape"):
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return image.convert("L")
+    if image_mode == IMAGE_CHANNEL:
+        if hasattr(image, "shape"):
+            return np.ascontiguousarray(image[:, :, channel])
+        return image.getchannel(channel)
+    if image_mode == IMAGE_EDGES:
+        if hasattr(image, "shape"):
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            return cv2.magnitude(cv2.Sobel(gray, cv2.CV_32F, 1, 0), cv2.Sobel(gray, cv2.CV_32F, 0, 1))
+        return image.convert("L").filter(ImageFilter.FIND_EDGES)
+    return image
+
+
+def mode_images(frame, template):
+    """Return (frame image, template image, key) converted for the template's image mode.
+
+    Conversions are cached on the frame, so every template using the same
+    mode shares one converted frame.
+    """
+    image_mode = getattr(template, "image_mode", IMAGE_COLOR)
+    if image_mode not in IMAGE_MODES or image_mode == IMAGE_COLOR:
+        return frame.image, template.image, IMAGE_COLOR
+
+    channel = 0
+    key = image_mode
+    if image_mode == IMAGE_CHANNEL:
+        channel = template.derived("best_channel", best_channel)
+        key = (image_mode, channel)
+    frame_image = frame.derived(key, lambda img: convert_image(img, image_mode, channel))
+    template_image = template.derived(key, lambda img: convert_image(img, image_mode, channel))
+    return frame_image, template_image, key
+
+
+def pyr_down(image, level):
+    """Halve an image level times with cv2.pyrDown."""
+    for _ in range(level):
+        image = cv2.pyrDown(image)
+    return image
+
+
+def match_template(frame, template, confidence):
+    """Return (score, location) of the best match of template in frame, or None."""
+    if frame is None or template is None:
+        return None
+
+    if OPENCV_AVAILABLE:
+        result = score_map_opencv(frame, template)
+        if result is None:
+            return None
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        return max_val, max_loc
+
+    # Use NumPy if OpenCV is not installed
+    if NUMPY_AVAILABLE:
+        return match_template_fft(frame, template, confidence)
+
+    # Use pyautogui as the last resort, it only reports exact hits
+    return match_template_locate(frame, template, confidence)
+
+
+def score_map_opencv(frame, template):
+    """Return the TM_CCOEFF_NORMED score of every window, or None if the template doesn't fit."""
+    image, template_image, key = mode_images(frame, template)
+    if (template.height > image.shape[0] or
+            template.width > image.shape[1]):
+        return None
+    return cv2.matchTemplate(image, template_image, cv2.TM_CCOEFF_NORMED)
+
+
+def score_map(frame, template):
+    """Return the score of every window with the best available backend.
+
+    Returns None if the template doesn't fit or neither OpenCV nor NumPy
+    is installed.
+    """
+    if OPENCV_AVAILABLE:
+        return score_map_opencv(frame, template)
+    if NUMPY_AVAILABLE:
+        return score_map_fft(frame, template)
+    return None
+
+
+def fast_length(n):
+    """Return the smallest length >= n with no prime factors above 5, where FFTs are fastest."""
+    while True:
+        rest = n
+        for factor in (2, 3, 5):
+            while rest % factor == 0:
+                rest //= factor
+        if rest == 1:
+            return n
+        n += 1
+
+
+def float_image(image):
+    """Return an array or PIL image as a float64 (height, width, channels) array."""
+    data = np.asarray(image, dtype=np.float64)
+    if data.ndim == 2:
+        data = data[:, :, np.newaxis]
+    return data
+
+
+def sum_tables(image):
+    """Return zero-padded cumulative sums of an image and of its squares."""
+    data = float_image(image)
+    height, width, channels = data.shape
+    sums = np.zeros((height + 1, width + 1, channels))
+    squares = np.zeros((height + 1, width + 1, channels))
+    sums[1:, 1:] = data.cumsum(axis=0).cumsum(axis=1)
+    squares[1:, 1:] = (data * data).cumsum(axis=0).cumsum(axis=1)
+    return sums, squares
+
+
+def window_sums(table, height, width):
+    """Sum every height x width window using a table from sum_tables."""
+    return (table[height:, width:] - table[:-height, width:] -
+            table[height:, :-width] + table[:-height, :-width])
+
+
+def match_template_fft(frame, template, confidence):
+    """Match with normalized cross-correlation computed by FFT, using NumPy only."""
+    if frame is None or template is None:
+        return None
+
+    scores = score_map_fft(frame, template)
+    if scores is None:
+        return None
+    y, x = np.unravel_index(np.argmax(scores), scores.shape)
+    return float(scores[y, x]), (int(x), int(y))
+
+
+def score_map_fft(frame, template):
+    """Return the normalized cross-correlation of every window, computed by FFT.
+
+    Scores are the same as OpenCV's TM_CCOEFF_NORMED: the correlation with
+    the mean-subtracted template comes from one FFT product, and the window
+    means and variances from sum tables. The frame's FFT and sum tables are
+    shared by all templates matched against it.
+    """
+    width, height = frame_size(frame)
+    if template.width > width or template.height > height:
+        return None
+    shape = (fast_length(height), fast_length(width))
+    frame_image, template_image, key = mode_images(frame, template)
+
+    spectrum = frame.derived(
+        ("fft", key, shape), lambda image: np.fft.rfft2(float_image(frame_image), s=shape, axes=(0, 1))
+    )
+    sums, squares = frame.derived(("sum_tables", key), lambda image: sum_tables(frame_image))
+
+    def template_spectrum(image):
+        data = float_image(template_image)
+        data = data - data.mean(axis=(0, 1))
+        return np.conj(np.fft.rfft2(data, s=shape, axes=(0, 1))), np.sqrt((data * data).sum())
+
+    kernel, template_norm = template.derived(("fft", key, shape), template_spectrum)
+
+    # Correlation of every window with the mean-subtracted template
+    h, w = template.height, template.width
+    correlation = np.fft.irfft2(spectrum * kernel, s=shape, axes=(0, 1))
+    numerator = correlation[:height - h + 1, :width - w + 1].sum(axis=2)
+
+    # Standard deviation of every window times that of the template
+    window = window_sums(sums, h, w)
+    variance = (window_sums(squares, h, w) - window * window / (h * w)).sum(axis=2)
+    denominator = np.sqrt(np.maximum(variance, 0.0)) * template_norm
+
+    scores = np.zeros_like(numerator)
+    valid = variance > FFT_MIN_VARIANCE
+    scores[valid] = numerator[valid] / denominator[valid]
+    return scores
+
+
+def match_template_locate(frame, template, confidence):
+    """Match with pyautogui.locate, the fallback used when OpenCV is missing.
+
+    pyscreeze returns the first position in reading order that passes the
+    confidence, not the best one, and no score, so hits are reported as 1.0.
+    """
+    # pyautogui.locate is pyscreeze.locate, importing it directly needs no display
+    import pyscreeze
+    from PIL import Image
+
+    haystack = frame.image
+    needle = template.image
+    if hasattr(haystack, "shape"):
+        haystack = frame.derived("pil", lambda img: Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)))
+    if hasattr(needle, "shape"):
+        needle = template.derived("pil", lambda img: Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)))
+
+    # Newer pyscreeze versions raise instead of returning None
+    not_found = getattr(pyscreeze, "ImageNotFoundException", ())
+    try:
+        try:
+            # pyscreeze compares in gray by default, other image modes are matched in color
+            grayscale = getattr(template, "image_mode", IMAGE_COLOR) == IMAGE_GRAY
+            location = pyscreeze.locate(needle, haystack, grayscale=grayscale, confidence=confidence)
+        except NotImplementedError:
+            # pyscreeze only takes a confidence when it can use OpenCV, else it finds exact copies
+            location = pyscreeze.locate(needle, haystack, grayscale=grayscale)
+    except not_found:
+        location = None
+    if location:
+        return 1.0, (int(location.left), int(location.top))
+    return None
+
+
+def match_template_pyramid(frame, template, confidence, levels=3):
+    """Coarse-to-fine variant of match_template.
+
+    The frame and template are matched at 1 / 2**(levels - 1) scale first, then
+    the best coarse candidates are confirmed at full resolution in a small
+    window, so the returned score is directly comparable with match_template.
+    """
+    if frame is None or template is None:
+        return None
+
+    # Don't shrink the template so far that it loses its detail
+    level = levels - 1
+    while level > 0 and (template.width >> level < MIN_PYRAMID_SIZE or
+                         template.height >> level < MIN_PYRAMID_SIZE):
+        level -= 1
+    if not OPENCV_AVAILABLE or level <= 0:
+        return match_template(frame, template, confidence)
+
+    image, template_image, key = mode_images(frame, template)
+    frame_height, frame_width = image.shape[:2]
+    if template.height > frame_height or template.width > frame_width:
+        return None
+
+    small_frame = frame.derived(("pyramid", key, level), lambda img: pyr_down(image, level))
+    small_template = template.derived(("pyramid", key, level), lambda img: pyr_down(template_image, level))
+    if (small_template.shape[0] > small_frame.shape[0] or
+            small_template.shape[1] > small_frame.shape[1]):
+        return match_template(frame, template, confidence)
+
+    coarse = cv2.matchTemplate(small_frame, small_template, cv2.TM_CCOEFF_NORMED)
+    scale = 1 << level
+    margin = 2 * scale
+    small_height, small_width = small_template.shape[:2]
+
+    best = None
+    for _ in range(PYRAMID_CANDIDATES):
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(coarse)
+        if max_val <= -1.0:
+            break
+
+        # Suppress this peak so the next candidate is a different window
+        x, y = max_loc
+        coarse[max(0, y - small_height // 2):y + small_height // 2 + 1,
+               max(0, x - small_width // 2):x + small_width // 2 + 1] = -1.0
+
+        # Confirm the candidate at full resolution around its scaled position
+        x0 = max(0, x * scale - margin)
+        y0 = max(0, y * scale - margin)
+        x1 = min(frame_width, x * scale + template.width + margin)
+        y1 = min(frame_height, y * scale + template.height + margin)
+        if x1 - x0 < template.width or y1 - y0 < template.height:
+            continue
+        result = cv2.matchTemplate(image[y0:y1, x0:x1], template_image, cv2.TM_CCOEFF_NORMED)
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        if best is None or max_val > best[0]:
+            best = (max_val, (x0 + max_loc[0], y0 + max_loc[1]))
+
+    return best
+
+
+class RegionTracker:
+    """Remember where each template was last found.
+
+    The next search first looks in a window around that spot, so in steady
+    state the cost depends on the template size rather than the screen size.
+    """
+
+    def __init__(self, expand=ROI_EXPAND, max_misses=ROI_MAX_MISSES):
+        self.expand = expand
+        self.max_misses = max_misses
+        # (search area, template path) -> [location, consecutive misses]
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def window(self, template, width, height, region=None):
+        """Return the (x1, y1, x2, y2) box to try first, or None."""
+        with self._lock:
+            entry = self._positions.get((region, template.path))
+        if entry is None:
+            return None
+
+        (x, y), misses = entry
+        margin_x = int(template.width * self.expand)
+        margin_y = int(template.height * self.expand)
+        box = (
+            max(0, x - margin_x),
+            max(0, y - margin_y),
+            min(width, x + template.width + margin_x),
+            min(height, y + template.height + margin_y)
+        )
+        if box[2] - box[0] < template.width or box[3] - box[1] < template.height:
+            return None
+        return box
+
+    def hit(self, template, location, region=None):
+        """Record where a template was found."""
+        with self._lock:
+            self._positions[(region, template.path)] = [tuple(location), 0]
+
+    def miss(self, template, region=None):
+        """Record a failed search, forgetting the position after too many."""
+        with self._lock:
+            entry = self._positions.get((region, template.path))
+            if entry is None:
+                return
+            entry[1] += 1
+            if entry[1] >= self.max_misses:
+                del self._positions[(region, template.path)]
+
+    def clear(self):
+        """Forget all positions."""
+        with self._lock:
+            self._positions.clear()
+
+
+def match_tracked(frame, template, confidence, tracker, matcher=match_template,
+                  window_matcher=match_template):
+    """Match near the template's last hit first with window_matcher, then fall back to matcher."""
+    if frame is None or template is None:
+        return None
+
+    width, height = frame_size(frame)
+    box = tracker.window(template, width, height, frame.region)
+    if box is not None:
+        match = window_matcher(crop_frame(frame, box), template, confidence)
+        if match is not None and match[0] >= confidence:
+            location = (box[0] + match[1][0], box[1] + match[1][1])
+            tracker.hit(template, location, frame.region)
+            return match[0], location
+
+    # Not near the last hit, search the whole frame
+    match = matcher(frame, template, confidence)
+    if match is not None and match[0] >= confidence:
+        tracker.hit(template, match[1], frame.region)
+    else:
+        tracker.miss(template, frame.region)
+    return match
+
+
+def scale_list(min_scale=SCALE_MIN, max_scale=SCALE_MAX, steps=SCALE_STEPS):
+    """Return steps scales spread evenly (in log space) over the range, closest to 1 first."""
+    min_scale, max_scale = sorted((min_scale, max_scale))
+    steps = max(1, int(steps))
+    if steps == 1 or min_scale == max_scale:
+        scales = [min_scale]
+    else:
+        ratio = (max_scale / min_scale) ** (1.0 / (steps - 1))
+        scales = [round(min_scale * ratio ** i, 4) for i in range(steps)]
+    if min_scale <= 1.0 <= max_scale and 1.0 not in scales:
+        scales.append(1.0)
+    return sorted(scales, key=lambda scale: abs(math.log(scale)))
+
+
+class ScaledTemplate:
+    """A template resized by scale, usable wherever a Template is."""
+
+    def __init__(self, template, scale):
+        self.base = template
+        self.scale = scale
+        self.path = template.path
+        self.mtime = template.mtime
+        self.size = template.size
+        self.width = max(1, int(round(template.width * scale)))
+        self.height = max(1, int(round(template.height * scale)))
+        self.image = resize_image(template.image, self.width, self.height)
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    @property
+    def image_mode(self):
+        return self.base.image_mode
+
+    @property
+    def method(self):
+        return self.base.method
+
+    def derived(self, key, build):
+        """Return build(self.image), computing it only once per key."""
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = build(self.image)
+            return self._derived[key]
+
+
+def resize_image(image, width, height):
+    """Resize a BGR array or PIL image, with area averaging when shrinking."""
+    if hasattr(image, "shape"):
+        shrink = width < image.shape[1]
+        return cv2.resize(image, (width, height),
+                          interpolation=cv2.INTER_AREA if shrink else cv2.INTER_LINEAR)
+    return image.resize((width, height))
+
+
+class ScaleHints:
+    """Remember the scale each template last matched at, so it is tried first."""
+
+    def __init__(self):
+        # template path -> scale
+        self._scales = {}
+        self._lock = threading.Lock()
+
+    def get(self, template):
+        """Return the last matching scale of a template, or None."""
+        with self._lock:
+            return self._scales.get(template.path)
+
+    def hit(self, template, scale):
+        """Record the scale a template matched at."""
+        with self._lock:
+            self._scales[template.path] = scale
+
+    def clear(self):
+        """Forget all scales."""
+        with self._lock:
+            self._scales.clear()
+
+
+def match_multi_scale(frame, template, confidence, scales, hints, matcher=match_template):
+    """Match the template at each scale, the last matching one first.
+
+    Stops at the first scale that passes confidence. The returned location
+    is where the unscaled template would sit with the same center, so the
+    click point is still location + template size / 2.
+    """
+    if frame is None or template is None:
+        return None
+
+    hint = hints.get(template)
+    if hint is not None:
+        scales = [hint] + [scale for scale in scales if scale != hint]
+
+    width, height = frame_size(frame)
+    best = None
+    for scale in scales:
+        if scale == 1.0:
+            candidate = template
+        else:
+            candidate = template.derived(("scaled", scale), lambda img: ScaledTemplate(template, scale))
+            if candidate.width < MIN_SCALED_SIZE or candidate.height < MIN_SCALED_SIZE:
+                continue
+        if candidate.width > width or candidate.height > height:
+            continue
+
+        match = matcher(frame, candidate, confidence)
+        if match is None:
+            continue
+        x, y = match[1]
+        location = (x + (candidate.width - template.width) // 2,
+                    y + (candidate.height - template.height) // 2)
+        if match[0] >= confidence:
+            hints.hit(template, scale)
+            return match[0], location
+        if best is None or match[0] > best[0]:
+            best = (match[0], location)
+    return best
+
+
+def suppress_overlaps(matches, width, height, overlap=NMS_OVERLAP, max_matches=MAX_MATCHES):
+    """Keep the best of each group of overlapping width x height windows (non-maximum suppression).
+
+    matches is a list of (score, (x, y)); the result is sorted by score.
+    """
+    if not matches:
+        return []
+    scores = np.array([match[0] for match in matches], dtype=np.float64)
+    xs = np.array([match[1][0] for match in matches])
+    ys = np.array([match[1][1] for match in matches])
+    order = np.argsort(-scores, kind="stable")
+    scores, xs, ys = scores[order], xs[order], ys[order]
+
+    kept = []
+    limit = overlap * width * height
+    while len(scores) and len(kept) < max_matches:
+        kept.append((float(scores[0]), (int(xs[0]), int(ys[0]))))
+        shared = (np.maximum(0, width - np.abs(xs - xs[0])) *
+                  np.maximum(0, height - np.abs(ys - ys[0])))
+        # The kept window overlaps itself completely, so it is dropped too
+        remaining = shared <= limit
+        scores, xs, ys = scores[remaining], xs[remaining], ys[remaining]
+    return kept
+
+
+def find_all_matches(frame, template, confidence, max_matches=MAX_MATCHES):
+    """Return (score, location) of every match above confidence, best first, one per object."""
+    if frame is None or template is None:
+        return []
+
+    scores = score_map(frame, template)
+    if scores is None:
+        # pyautogui only reports one hit per search
+        match = match_template_locate(frame, template, confidence)
+        return [match] if match is not None and match[0] >= confidence else []
+
+    ys, xs = np.nonzero(scores >= confidence)
+    matches = [(float(score), (int(x), int(y))) for score, x, y in zip(scores[ys, xs], xs, ys)]
+    return suppress_overlaps(matches, template.width, template.height, max_matches=max_matches)
+
+
+def find_all_multi_scale(frame, template, confidence, scales, hints, max_matches=MAX_MATCHES):
+    """Return every match like find_all_matches, trying each scale until one has hits.
+
+    Locations are those of the unscaled template with the same center, as
+    in match_multi_scale.
+    """
+    if frame is None or template is None:
+        return []
+
+    hint = hints.get(template)
+    if hint is not None:
+        scales = [hint] + [scale for scale in scales if scale != hint]
+
+    width, height = frame_size(frame)
+    for scale in scales:
+        if scale == 1.0:
+            candidate = template
+        else:
+            candidate = template.derived(("scaled", scale), lambda img: ScaledTemplate(template, scale))
+            if candidate.width < MIN_SCALED_SIZE or candidate.height < MIN_SCALED_SIZE:
+                continue
+        if candidate.width > width or candidate.height > height:
+            continue
+
+        matches = find_all_matches(frame, candidate, confidence, max_matches)
+        if matches:
+            hints.hit(template, scale)
+            dx = (candidate.width - template.width) // 2
+            dy = (candidate.height - template.height) // 2
+            return [(score, (x + dx, y + dy)) for score, (x, y) in matches]
+    return []
+
+
+class MatchResult:
+    """A template that passed the confidence threshold."""
+
+    def __init__(self, template, location, score, frame=None):
+        self.template = template
+        # Relative to the frame the template was matched in
+        self.location = location
+        self.score = score
+        self.frame = frame
+
+
+class MatchEngine:
+    """Match several templates against the same frame on a thread pool.
+
+    cv2.matchTemplate releases the GIL, so templates are matched in parallel.
+    In "first" mode the search stops at the first template in list order
+    that passes the confidence threshold, as soon as every template before
+    it has failed; in "best" mode the highest score wins.
+    """
+
+    def __init__(self, workers=None, mode=MODE_FIRST_FOUND, matcher=match_template,
+                 all_matcher=find_all_matches):
+        self.workers = max(1, int(workers or default_workers()))
+        self.mode = mode if mode in MATCH_MODES else MODE_FIRST_FOUND
+        self.matcher = matcher
+        # (frame, template, confidence) -> list of (score, location), for search_all
+        self.all_matcher = all_matcher
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def configure(self, workers=None, mode=None):
+        """Change the number of threads and/or the match mode."""
+        with self._lock:
+            if workers is not None:
+                workers = max(1, int(workers))
+                if workers != self.workers:
+                    self.workers = workers
+                    self._shutdown_pool()
+            if mode in MATCH_MODES:
+                self.mode = mode
+
+    def shutdown(self):
+        """Stop the worker threads."""
+        with self._lock:
+            self._shutdown_pool()
+
+    def search(self, frame, templates, confidence, should_stop=None):
+        """Return the MatchResult for the frame according to the mode, or None."""
+        return self.search_jobs([(frame, template) for template in templates], confidence, should_stop)
+
+    def search_jobs(self, jobs, confidence, should_stop=None):
+        """Like search(), for (frame, template) pairs, e.g. templates in their own search areas."""
+        jobs = list(jobs)
+        if not jobs:
+            return None
+
+        pool = self._get_pool() if len(jobs) > 1 else None
+        if pool is None:
+            return self._search_serial(jobs, confidence, should_stop)
+
+        futures = {
+            pool.submit(self._match_one, frame, template, confidence): index
+            for index, (frame, template) in enumerate(jobs)
+        }
+        results = {}
+        finished = set()
+        # Lowest job index whose result isn't known yet
+        first = 0
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished.add(futures[future])
+                    result = future.result()
+                    if result is not None:
+                        results[futures[future]] = result
+                if self.mode == MODE_FIRST_FOUND:
+                    # A later hit only counts once every job before it has failed
+                    while first in finished:
+                        if first in results:
+                            return results[first]
+                        first += 1
+                if should_stop is not None and should_stop():
+                    return None
+        finally:
+            # Drop templates that haven't started yet
+            for future in pending:
+                future.cancel()
+
+        return self._best(results[index] for index in sorted(results))
+
+    def search_all(self, frame, templates, confidence, should_stop=None):
+        """Return a MatchResult for every hit of every template, in template order."""
+        return self.search_all_jobs([(frame, template) for template in templates], confidence, should_stop)
+
+    def search_all_jobs(self, jobs, confidence, should_stop=None):
+        """Like search_all(), for (frame, template) pairs."""
+        jobs = list(jobs)
+        pool = self._get_pool() if len(jobs) > 1 else None
+        if pool is None:
+            results = []
+            for frame, template in jobs:
+                if should_stop is not None and should_stop():
+                    return []
+                results.extend(self._match_all(frame, template, confidence))
+            return results
+
+        futures = [pool.submit(self._match_all, frame, template, confidence) for frame, template in jobs]
+        try:
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.05)
+                if pending and should_stop is not None and should_stop():
+                    return []
+        finally:
+            for future in futures:
+                future.cancel()
+        return [result for future in futures for result in future.result()]
+
+    def _match_all(self, frame, template, confidence):
+        """Match a single template, returning a MatchResult for each hit."""
+        return [MatchResult(template, location, score, frame)
+                for score, location in self.all_matcher(frame, template, confidence)]
+
+    def _search_serial(self, jobs, confidence, should_stop):
+        """Match templates one after another on the calling thread."""
+        results = []
+        for frame, template in jobs:
+            if should_stop is not None and should_stop():
+                return None
+            result = self._match_one(frame, template, confidence)
+            if result is None:
+                continue
+            if self.mode == MODE_FIRST_FOUND:
+                return result
+            results.append(result)
+        return self._best(results)
+
+    def _match_one(self, frame, template, confidence):
+        """Match a single template, returning a MatchResult if it passes."""
+        match = self.matcher(frame, template, confidence)
+        if match is None:
+            return None
+        score, location = match
+        if score >= confidence:
+            return MatchResult(template, location, score, frame)
+        return None
+
+    def _best(self, results):
+        """Pick the highest scoring result, keeping list order on ties."""
+        best = None
+        for result in results:
+            if best is None or result.score > best.score:
+                best = result
+        return best
+
+    def _get_pool(self):
+        """Return the thread pool, creating it on first use."""
+        with self._lock:
+            if self.workers <= 1:
+                return None
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="match"
+                )
+            return self._pool
+
+    def _shutdown_pool(self):
+        """Shut down the current pool, must be called with the lock held."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
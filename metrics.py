@@ -0,0 +1,211 @@
+"""
+Loop instrumentation for Auto Clicker with Image Detection.
+Collects per-stage timings over a rolling window and optionally exports them.
+"""
+import os
+import csv
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Stages timed in every search loop
+STAGES = ("capture", "template_load", "match", "move", "click", "sleep")
+
+# Number of samples kept per stage for percentiles
+WINDOW_SIZE = 200
+
+# Exported rows are flushed to disk after this many iterations
+EXPORT_FLUSH_EVERY = 20
+
+
+def percentile(sorted_values, point):
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(point / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class LoopMetrics:
+    """Rolling timings of the search loop stages and of each template."""
+
+    def __init__(self, window=WINDOW_SIZE):
+        self.window = window
+        self._lock = threading.Lock()
+        self._exporter = None
+        self.reset()
+
+    def reset(self):
+        """Drop all samples."""
+        with self._lock:
+            self._stages = {stage: deque(maxlen=self.window) for stage in STAGES}
+            self._templates = {}
+            self._iterations = deque(maxlen=self.window)
+            self._drift = deque(maxlen=self.window)
+            self._current = {}
+            self._current_drift = 0.0
+            self.iteration_count = 0
+
+    @contextmanager
+    def time(self, stage):
+        """Time the body of a with block as one sample of stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        """Add a sample in seconds to a stage."""
+        with self._lock:
+            self._stages[stage].append(seconds)
+            self._current[stage] = self._current.get(stage, 0.0) + seconds
+
+    def record_template(self, path, seconds):
+        """Add a match time sample for one template."""
+        with self._lock:
+            samples = self._templates.get(path)
+            if samples is None:
+                samples = self._templates[path] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def record_drift(self, requested, actual):
+        """Add how much longer than requested a wait took, both in seconds."""
+        with self._lock:
+            self._drift.append(actual - requested)
+            self._current_drift += actual - requested
+
+    def end_iteration(self, **fields):
+        """Close the current loop iteration and export it if enabled."""
+        now = time.time()
+        with self._lock:
+            self._iterations.append(time.perf_counter())
+            self.iteration_count += 1
+            row = {"time": round(now, 3), "iteration": self.iteration_count}
+            for stage in STAGES:
+                row[stage + "_ms"] = round(self._current.get(stage, 0.0) * 1000.0, 3)
+            row["drift_ms"] = round(self._current_drift * 1000.0, 3)
+            row.update(fields)
+            self._current = {}
+            self._current_drift = 0.0
+            exporter = self._exporter
+        if exporter is not None:
+            exporter.write(row)
+
+    def loop_rate(self):
+        """Return iterations per second over the rolling window."""
+        with self._lock:
+            iterations = list(self._iterations)
+        if len(iterations) < 2 or iterations[-1] <= iterations[0]:
+            return 0.0
+        return (len(iterations) - 1) / (iterations[-1] - iterations[0])
+
+    def snapshot(self):
+        """Return loop rate, per-stage p50/p95 in ms, wait drift and the slowest template."""
+        with self._lock:
+            stages = {stage: sorted(samples) for stage, samples in self._stages.items()}
+            templates = {path: list(samples) for path, samples in self._templates.items()}
+            drift = sorted(self._drift)
+
+        result = {"loop_hz": self.loop_rate(), "stages": {}, "drift": None,
+                  "slowest_template": None}
+        if drift:
+            result["drift"] = {
+                "p50": percentile(drift, 50) * 1000.0,
+                "p95": percentile(drift, 95) * 1000.0,
+                "max": drift[-1] * 1000.0,
+            }
+        for stage, values in stages.items():
+            if values:
+                result["stages"][stage] = {
+                    "p50": percentile(values, 50) * 1000.0,
+                    "p95": percentile(values, 95) * 1000.0,
+                }
+
+        slowest = None
+        for path, values in templates.items():
+            mean = sum(values) / len(values)
+            if slowest is None or mean > slowest[1]:
+                slowest = (path, mean)
+        if slowest is not None:
+            result["slowest_template"] = {"path": slowest[0], "mean_ms": slowest[1] * 1000.0}
+        return result
+
+    def start_export(self, path):
+        """Append one row per iteration to path, as CSV or JSON lines by extension."""
+        exporter = MetricsExporter(path)
+        with self._lock:
+            old, self._exporter = self._exporter, exporter
+        if old is not None:
+            old.close()
+
+    def stop_export(self):
+        """Stop exporting and flush the file."""
+        with self._lock:
+            old, self._exporter = self._exporter, None
+        if old is not None:
+            old.close()
+
+    @property
+    def export_path(self):
+        """Path of the export file, or None."""
+        exporter = self._exporter
+        return exporter.path if exporter is not None else None
+
+
+class MetricsExporter:
+    """Write iteration rows to a .csv file or a .jsonl file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith(".csv")
+        self._file = open(path, "a", newline="")
+        self._writer = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def write(self, row):
+        """Append one row."""
+        with self._lock:
+            if self._file is None:
+                return
+            if self.is_csv:
+                if self._writer is None:
+                    self._writer = csv.DictWriter(self._file, fieldnames=list(row),
+                                                  extrasaction="ignore")
+                    if self._file.tell() == 0:
+                        self._writer.writeheader()
+                self._writer.writerow(row)
+            else:
+                self._file.write(json.dumps(row) + "\n")
+            self._pending += 1
+            if self._pending >= EXPORT_FLUSH_EVERY:
+                self._file.flush()
+                self._pending = 0
+
+    def close(self):
+        """Flush and close the file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def format_snapshot(snapshot):
+    """Render a snapshot as the text shown in the performance panel."""
+    lines = [f"Loop rate: {snapshot['loop_hz']:.2f} Hz"]
+    for stage in STAGES:
+        stats = snapshot["stages"].get(stage)
+        if stats is not None:
+            lines.append(f"{stage:<14} p50 {stats['p50']:8.1f} ms   p95 {stats['p95']:8.1f} ms")
+    drift = snapshot.get("drift")
+    if drift is not None:
+        lines.append(f"{'wait drift':<14} p50 {drift['p50']:8.2f} ms   p95 {drift['p95']:8.2f} ms   "
+                     f"max {drift['max']:.2f} ms")
+    slowest = snapshot["slowest_template"]
+    if slowest is not None:
+        lines.append(f"Slowest image: {os.path.basename(slowest['path'])} "
+                     f"({slowest['mean_ms']:.1f} ms)")
+    return "\n".join(lines)
@@ -0,0 +1,358 @@
+"""
+Process-pool matching for Auto Clicker with Image Detection.
+Worker processes match templates outside the GIL, which helps the NumPy and
+pyautogui fallbacks and Python-heavy preprocessing. Each template is pinned
+to one worker that keeps it decoded; frames are handed over through shared
+memory and results come back over a pipe.
+"""
+import time
+import threading
+import multiprocessing
+from multiprocessing.connection import wait as wait_connections
+
+from lazy import lazy_import, module_available
+from features import match_features
+from matching import (Frame, MatchResult, ScaleHints, MATCH_MODES, METHOD_TEMPLATE, MODE_FIRST_FOUND, default_workers,
+                      find_all_matches, find_all_multi_scale, match_multi_scale, match_template,
+                      match_template_fft, match_template_locate, match_template_pyramid)
+from templates import TemplateCache
+
+# Frames are passed as NumPy views of shared memory
+PROCESS_POOL_AVAILABLE = module_available("numpy")
+np = lazy_import("numpy")
+
+# Pools the detection engine can match on
+POOL_THREADS = "threads"
+POOL_PROCESSES = "processes"
+POOL_KINDS = (POOL_THREADS, POOL_PROCESSES)
+
+# Matchers a worker can use, "auto" picks the best installed backend
+WORKER_MATCHERS = {
+    "auto": match_template,
+    "numpy": match_template_fft,
+    "locate": match_template_locate,
+}
+
+# Workers are started fresh rather than forked from a process running Qt and threads
+START_METHOD = "spawn"
+
+# How often a search checks should_stop while waiting for workers
+POLL_INTERVAL = 0.05
+
+
+def worker_match(frame, template, confidence, options, hints):
+    """Match one template in a worker, the way DetectionEngine.match_full_area does."""
+    matcher_name, pyramid_levels, scales, find_all = options
+    matcher = WORKER_MATCHERS.get(matcher_name, match_template)
+
+    if template.method != METHOD_TEMPLATE:
+        match = match_features(frame, template, confidence, template.method)
+        if find_all:
+            return [match] if match is not None and match[0] >= confidence else []
+        return match
+
+    if find_all:
+        if len(scales) > 1:
+            return find_all_multi_scale(frame, template, confidence, scales, hints)
+        return find_all_matches(frame, template, confidence)
+
+    def match_unscaled(frame, template, confidence):
+        if pyramid_levels > 1 and matcher is match_template:
+            return match_template_pyramid(frame, template, confidence, pyramid_levels)
+        return matcher(frame, template, confidence)
+
+    if len(scales) > 1:
+        return match_multi_scale(frame, template, confidence, scales, hints, match_unscaled)
+    return match_unscaled(frame, template, confidence)
+
+
+def worker_main(conn):
+    """Serve match requests from the parent until it sends None."""
+    from multiprocessing import shared_memory
+    from matching import OPENCV_AVAILABLE
+    from PIL import Image
+
+    # Resident for the life of the worker
+    cache = TemplateCache()
+    hints = ScaleHints()
+    scales = None
+    shm = None
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            if request[0] == "load":
+                # A new run, scales found in the previous one may be out of date
+                hints.clear()
+                for path in request[1]:
+                    cache.add(path)
+                continue
+
+            # ("match", shared memory name, frames, jobs, confidence, options)
+            tag, shm_name, frame_specs, jobs, confidence, options = request
+            if options[2] != scales:
+                hints.clear()
+                scales = options[2]
+            if shm is None or shm.name != shm_name:
+                if shm is not None:
+                    shm.close()
+                shm = shared_memory.SharedMemory(name=shm_name)
+
+            frames = {}
+            image = None
+            for region, offset, shape, dtype, origin in frame_specs:
+                image = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+                if not OPENCV_AVAILABLE:
+                    # Templates are PIL images without OpenCV, so frames must be too
+                    image = Image.fromarray(image[:, :, ::-1].copy())
+                frames[region] = Frame(image, origin, region)
+
+            results = []
+            for index, region, path, image_mode, method in jobs:
+                start = time.perf_counter()
+                try:
+                    template = cache.get(path, image_mode, method)
+                    if template is None:
+                        result = None
+                    else:
+                        result = worker_match(frames[region], template, confidence, options, hints)
+                    results.append((index, result, time.perf_counter() - start, None))
+                except Exception as e:
+                    results.append((index, None, time.perf_counter() - start, str(e)))
+
+            # Views of the shared block must be gone before it can be closed
+            del frames, image
+            conn.send(results)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        if shm is not None:
+            shm.close()
+
+
+class ProcessMatchEngine:
+    """Match templates on worker processes, with the same searches as MatchEngine.
+
+    Templates are spread over the workers by path and stay decoded there.
+    Each frame is copied once into a shared memory block that the workers
+    read without copying. on_timing(template, seconds, result) and
+    on_error(template, message) report per-template results to the caller.
+    """
+
+    def __init__(self, workers=None, mode=MODE_FIRST_FOUND, matcher="auto",
+                 on_timing=None, on_error=None):
+        self.workers = max(1, int(workers or default_workers()))
+        self.mode = mode if mode in MATCH_MODES else MODE_FIRST_FOUND
+        self.matcher = matcher if matcher in WORKER_MATCHERS else "auto"
+        self.pyramid_levels = 1
+        self.scales = [1.0]
+        self.on_timing = on_timing
+        self.on_error = on_error
+        self._processes = []
+        self._connections = []
+        # Requests sent to each worker whose results haven't been read yet
+        self._unanswered = []
+        # Template path -> worker index
+        self._assignments = {}
+        self._shm = None
+        self._lock = threading.Lock()
+
+    def configure(self, workers=None, mode=None, pyramid_levels=None, scales=None):
+        """Change the number of processes, the match mode or the matching options."""
+        with self._lock:
+            if workers is not None:
+                workers = max(1, int(workers))
+                if workers != self.workers:
+                    self.workers = workers
+                    self._stop_workers()
+            if mode in MATCH_MODES:
+                self.mode = mode
+            if pyramid_levels is not None:
+                self.pyramid_levels = pyramid_levels
+            if scales is not None:
+                self.scales = list(scales)
+
+    def start(self, paths=()):
+        """Start the worker processes and have them decode their templates."""
+        with self._lock:
+            self._start_workers()
+            by_worker = {}
+            for path in paths:
+                by_worker.setdefault(self._worker_for(path), []).append(path)
+            for index, worker_paths in by_worker.items():
+                self._connections[index].send(("load", worker_paths))
+
+    def shutdown(self):
+        """Stop the worker processes and free the shared memory."""
+        with self._lock:
+            self._stop_workers()
+
+    def search(self, frame, templates, confidence, should_stop=None):
+        """Return the MatchResult for the frame according to the mode, or None."""
+        return self.search_jobs([(frame, template) for template in templates], confidence, should_stop)
+
+    def search_jobs(self, jobs, confidence, should_stop=None):
+        """Like MatchEngine.search_jobs(), for (frame, template) pairs."""
+        jobs = list(jobs)
+        results = self._run(jobs, confidence, False, should_stop)
+        if results is None:
+            return None
+
+        best = None
+        for index, (frame, template) in enumerate(jobs):
+            match = results.get(index)
+            if match is None or match[0] < confidence:
+                continue
+            result = MatchResult(template, match[1], match[0], frame)
+            if self.mode == MODE_FIRST_FOUND:
+                return result
+            if best is None or result.score > best.score:
+                best = result
+        return best
+
+    def search_all(self, frame, templates, confidence, should_stop=None):
+        """Return a MatchResult for every hit of every template, in template order."""
+        return self.search_all_jobs([(frame, template) for template in templates], confidence, should_stop)
+
+    def search_all_jobs(self, jobs, confidence, should_stop=None):
+        """Like MatchEngine.search_all_jobs(), for (frame, template) pairs."""
+        jobs = list(jobs)
+        results = self._run(jobs, confidence, True, should_stop)
+        if results is None:
+            return []
+        return [MatchResult(template, location, score, frame)
+                for index, (frame, template) in enumerate(jobs)
+                for score, location in (results.get(index) or [])]
+
+    def _run(self, jobs, confidence, find_all, should_stop):
+        """Send the jobs to the workers, returning {job index: result}, or None if stopped."""
+        if not jobs:
+            return {}
+        with self._lock:
+            self._start_workers()
+            # Workers still reading the previous frame must finish before it is overwritten
+            self._collect_unanswered()
+            frame_specs, region_names = self._share_frames([frame for frame, template in jobs])
+
+            by_worker = {}
+            for index, (frame, template) in enumerate(jobs):
+                job = (index, region_names[id(frame)], template.path, template.image_mode, template.method)
+                by_worker.setdefault(self._worker_for(template.path), []).append(job)
+
+            options = (self.matcher, self.pyramid_levels, self.scales, find_all)
+            pending = {}
+            for worker, worker_jobs in by_worker.items():
+                connection = self._connections[worker]
+                connection.send(("match", self._shm.name, frame_specs, worker_jobs, confidence, options))
+                self._unanswered[worker] += 1
+                pending[connection] = worker
+
+            results = {}
+            while pending:
+                if should_stop is not None and should_stop():
+                    # The answers are read before the next frame is shared
+                    return None
+                for connection in wait_connections(list(pending), POLL_INTERVAL):
+                    worker = pending.pop(connection)
+                    self._unanswered[worker] -= 1
+                    for index, result, seconds, error in connection.recv():
+                        template = jobs[index][1]
+                        if self.on_timing is not None:
+                            self.on_timing(template, seconds, result)
+                        if error is not None and self.on_error is not None:
+                            self.on_error(template, error)
+                        results[index] = result
+            return results
+
+    def _share_frames(self, frames):
+        """Copy the distinct frames into shared memory, returning their specs and keys."""
+        from multiprocessing import shared_memory
+
+        unique = []
+        region_names = {}
+        for frame in frames:
+            if id(frame) not in region_names:
+                # Frames of one search are told apart by position, not by region name
+                region_names[id(frame)] = len(unique)
+                unique.append(frame)
+
+        arrays = []
+        for frame in unique:
+            image = frame.image
+            if not hasattr(image, "shape"):
+                # PIL image without OpenCV, workers turn it back into one
+                image = np.asarray(image.convert("RGB"))[:, :, ::-1]
+            arrays.append(np.ascontiguousarray(image))
+
+        size = sum(array.nbytes for array in arrays)
+        if self._shm is None or self._shm.size < size:
+            self._free_shared_memory()
+            self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+        specs = []
+        offset = 0
+        for key, (frame, array) in enumerate(zip(unique, arrays)):
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf, offset=offset)
+            target[...] = array
+            del target
+            specs.append((key, offset, array.shape, array.dtype.str, frame.origin))
+            offset += array.nbytes
+        return specs, region_names
+
+    def _worker_for(self, path):
+        """Return the worker a template is pinned to, spreading new ones evenly."""
+        if path not in self._assignments:
+            counts = [0] * self.workers
+            for worker in self._assignments.values():
+                counts[worker] += 1
+            self._assignments[path] = counts.index(min(counts))
+        return self._assignments[path]
+
+    def _start_workers(self):
+        """Start the worker processes if they aren't running, must hold the lock."""
+        if self._processes:
+            return
+        context = multiprocessing.get_context(START_METHOD)
+        for _ in range(self.workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=worker_main, args=(child,), name="match-worker")
+            process.daemon = True
+            process.start()
+            child.close()
+            self._processes.append(process)
+            self._connections.append(parent)
+            self._unanswered.append(0)
+
+    def _collect_unanswered(self):
+        """Read and drop the results of searches that were stopped early."""
+        for worker, count in enumerate(self._unanswered):
+            for _ in range(count):
+                self._connections[worker].recv()
+            self._unanswered[worker] = 0
+
+    def _stop_workers(self):
+        """Stop the worker processes, must hold the lock."""
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (OSError, ValueError):
+                pass
+        for process in self._processes:
+            process.join(1.0)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()
+        self._processes = []
+        self._connections = []
+        self._unanswered = []
+        self._assignments = {}
+        self._free_shared_memory()
+
+    def _free_shared_memory(self):
+        """Release the shared frame block."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
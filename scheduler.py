@@ -0,0 +1,189 @@
+"""
+Wait scheduling for Auto Clicker with Image Detection.
+Waits on a threading.Event until a precise deadline, so intervals of a few
+milliseconds are honored and stopping wakes up any wait at once. The
+adaptive interval slows searching down while nothing happens on screen, and
+the target order decides which images a search matches, and in what order.
+"""
+import sys
+import time
+import threading
+
+# The OS timer can be ~15 ms coarse on Windows, the end of a wait spins instead
+SPIN_MARGIN = 0.002 if sys.platform.startswith("win") else 0.0005
+
+
+class Scheduler:
+    """Deadline waits that return early as soon as stop() is called."""
+
+    def __init__(self, spin_margin=SPIN_MARGIN):
+        self.spin_margin = spin_margin
+        self._stop = threading.Event()
+
+    def reset(self):
+        """Allow waiting again after a stop."""
+        self._stop.clear()
+
+    def stop(self):
+        """Wake up every current and future wait."""
+        self._stop.set()
+
+    @property
+    def stopped(self):
+        """Whether stop() was called since the last reset()."""
+        return self._stop.is_set()
+
+    def wait(self, seconds):
+        """Wait for seconds, returning the time actually waited, or None if stopped."""
+        start = time.perf_counter()
+        if not self.wait_until(start + max(0.0, seconds)):
+            return None
+        return time.perf_counter() - start
+
+    def wait_until(self, deadline):
+        """Wait until a time.perf_counter() deadline, returning False if stopped first."""
+        while True:
+            if self._stop.is_set():
+                return False
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return True
+            if remaining > self.spin_margin:
+                self._stop.wait(remaining - self.spin_margin)
+            else:
+                # Give other threads the CPU while spinning
+                time.sleep(0)
+
+
+# Adaptive scan rate defaults
+MIN_INTERVAL = 0.05
+MAX_INTERVAL = 2.0
+CPU_BUDGET = 0.25
+BACKOFF_FACTOR = 2.0
+# First back-off step when the minimum interval is 0
+MIN_BACKOFF_STEP = 0.01
+
+
+class AdaptiveInterval:
+    """Choose the wait between searches from recent activity and a CPU budget.
+
+    Quiet searches (no hit and no screen change) multiply the interval by
+    backoff up to max_interval, a hit or a change snaps it back to
+    min_interval. The interval is also kept long enough for the search to
+    use at most cpu_budget of one core, without going over max_interval.
+    """
+
+    def __init__(self, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 cpu_budget=CPU_BUDGET, backoff=BACKOFF_FACTOR):
+        self.backoff = backoff
+        self.interval = 0.0
+        self.configure(min_interval, max_interval, cpu_budget)
+        self.reset()
+
+    def configure(self, min_interval, max_interval, cpu_budget):
+        """Change the limits, keeping the current interval within them."""
+        self.min_interval = max(0.0, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.cpu_budget = cpu_budget
+        self.interval = min(self.max_interval, max(self.min_interval, self.interval))
+
+    def reset(self):
+        """Go back to the fastest rate."""
+        self.interval = self.min_interval
+
+    def next_interval(self, active, busy_time, cpu_time):
+        """Return the next wait after a search that took busy_time and cpu_time seconds."""
+        if active:
+            interval = self.min_interval
+        else:
+            interval = max(self.interval, MIN_BACKOFF_STEP) * self.backoff
+        if self.cpu_budget > 0:
+            # cpu_time / (busy_time + interval) <= cpu_budget
+            interval = max(interval, cpu_time / self.cpu_budget - busy_time)
+        self.interval = min(self.max_interval, max(self.min_interval, interval))
+        return self.interval
+
+
+# Weight of the latest search in the hit rate and match time averages
+ORDER_SMOOTHING = 0.1
+# Match time below which every image counts as equally cheap
+MIN_MATCH_COST = 1e-6
+
+
+class TargetOrder:
+    """Pick the target images a search matches, and their order.
+
+    Disabled images and images clicked less than their cooldown ago are
+    left out. The rest are ordered by priority, highest first. With
+    adaptive ordering, images of the same priority are then ordered by
+    recent hits per second of matching, so images that are often found
+    and cheap to match go first; images without a match yet go before
+    them, to get their averages.
+    """
+
+    def __init__(self, smoothing=ORDER_SMOOTHING):
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the hit rates, match times and click times."""
+        with self._lock:
+            # Path -> moving averages of found (1 or 0) and of the match time
+            self._hit_rates = {}
+            self._costs = {}
+            # Path -> time.monotonic() of the last click
+            self._clicked = {}
+
+    def record(self, path, seconds, found):
+        """Add one match of an image to its hit rate and match time averages."""
+        hit = 1.0 if found else 0.0
+        with self._lock:
+            if path not in self._costs:
+                self._hit_rates[path] = hit
+                self._costs[path] = seconds
+            else:
+                self._hit_rates[path] += self.smoothing * (hit - self._hit_rates[path])
+                self._costs[path] += self.smoothing * (seconds - self._costs[path])
+
+    def clicked(self, path, now=None):
+        """Start the cooldown of an image."""
+        with self._lock:
+            self._clicked[path] = time.monotonic() if now is None else now
+
+    def cooldown_left(self, entry, now=None):
+        """Return the seconds until an image may be clicked again, 0 if it may now."""
+        with self._lock:
+            clicked = self._clicked.get(entry["path"])
+        if clicked is None or entry["cooldown"] <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(0.0, clicked + entry["cooldown"] - now)
+
+    def ready_in(self, entries, now=None):
+        """Return the seconds until the first enabled image leaves its cooldown, None if none is enabled."""
+        waits = [self.cooldown_left(entry, now) for entry in entries if entry["enabled"]]
+        return min(waits) if waits else None
+
+    def select(self, entries, adaptive=False, now=None):
+        """Return the enabled target image entries not in cooldown, in search order."""
+        now = time.monotonic() if now is None else now
+        ready = [entry for entry in entries
+                 if entry["enabled"] and self.cooldown_left(entry, now) <= 0]
+        if not adaptive:
+            return sorted(ready, key=lambda entry: -entry["priority"])
+
+        with self._lock:
+            hit_rates = dict(self._hit_rates)
+            costs = dict(self._costs)
+
+        def key(entry):
+            path = entry["path"]
+            if path not in costs:
+                return (-entry["priority"], 0, 0.0, 0.0)
+            cost = max(costs[path], MIN_MATCH_COST)
+            # Cheaper images first among those never found
+            return (-entry["priority"], 1, -hit_rates[path] / cost, cost)
+
+        # Stable, so ties keep the order of the list
+        return sorted(ready, key=key)
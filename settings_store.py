@@ -0,0 +1,281 @@
+"""
+Settings persistence for Auto Clicker with Image Detection.
+Changes are coalesced and written on a background thread after a short
+debounce, through a temporary file that replaces settings.json atomically.
+Loading migrates files saved by older versions and drops invalid values.
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+
+# Version written into settings.json, files without one are version 1
+SETTINGS_VERSION = 2
+
+# Wait this long after the last change before writing, but never more than
+# SAVE_MAX_DELAY after the first unsaved change (e.g. while dragging a slider)
+SAVE_DELAY = 0.5
+SAVE_MAX_DELAY = 2.0
+
+# Expected type of each top-level setting, values of another type are dropped
+SETTING_TYPES = {
+    "search_area": dict,
+    "search_regions": list,
+    "confidence": (int, float),
+    "delay_time": str,
+    "click_delay_time": str,
+    "move_delay_time": str,
+    "adaptive_rate": bool,
+    "min_interval": str,
+    "max_interval": str,
+    "cpu_budget": (int, float),
+    "preview_only": bool,
+    "return_mouse": bool,
+    "save_debug_frames": bool,
+    "match_workers": int,
+    "match_mode": str,
+    "match_pool": str,
+    "find_all": bool,
+    "click_order": str,
+    "pyramid_levels": int,
+    "multi_scale": bool,
+    "scale_min": (int, float),
+    "scale_max": (int, float),
+    "scale_steps": int,
+    "capture_backend": str,
+    "replay_source": str,
+    "dry_run": bool,
+    "show_metrics": bool,
+    "roi_tracking": bool,
+    "skip_unchanged": bool,
+    "index_templates": bool,
+    "adaptive_order": bool,
+    "target_images": list,
+}
+
+# Delays typed into text boxes, saved as numbers by some older versions
+TEXT_SETTINGS = ("delay_time", "click_delay_time", "move_delay_time", "min_interval", "max_interval")
+
+AREA_KEYS = ("x1", "y1", "x2", "y2")
+
+# Expected type of the per-image options of a target image entry
+ENTRY_TYPES = {
+    "regions": list,
+    "enabled": bool,
+    "priority": int,
+    "cooldown": (int, float),
+}
+
+# Permissions of a newly created settings file
+SETTINGS_FILE_MODE = 0o644
+
+
+def migrate_settings(settings):
+    """Upgrade settings saved by an older version to SETTINGS_VERSION."""
+    version = settings.get("version", 1)
+    if version < 2:
+        # Target images were plain paths
+        settings["target_images"] = [
+            {"path": entry} if isinstance(entry, str) else entry
+            for entry in settings.get("target_images", [])
+        ]
+        for key in TEXT_SETTINGS:
+            if isinstance(settings.get(key), (int, float)) and not isinstance(settings[key], bool):
+                settings[key] = str(settings[key])
+    settings["version"] = SETTINGS_VERSION
+    return settings
+
+
+def valid_area(area):
+    """Check a search area dict, unselected (all None) areas are valid."""
+    if not isinstance(area, dict):
+        return False
+    values = [area.get(key) for key in AREA_KEYS]
+    if all(value is None for value in values):
+        return True
+    if not all(isinstance(value, int) for value in values):
+        return False
+    area["width"] = abs(area["x2"] - area["x1"])
+    area["height"] = abs(area["y2"] - area["y1"])
+    return area["x2"] > area["x1"] and area["y2"] > area["y1"]
+
+
+def validate_settings(settings):
+    """Drop invalid values, returning (settings, list of problems found)."""
+    if not isinstance(settings, dict):
+        raise ValueError("Settings file does not contain a settings object")
+
+    problems = []
+    for key, types in SETTING_TYPES.items():
+        if key in settings and not isinstance(settings[key], types):
+            problems.append(f"invalid {key}")
+            del settings[key]
+
+    if "search_area" in settings and not valid_area(settings["search_area"]):
+        problems.append("invalid search_area")
+        del settings["search_area"]
+    if "confidence" in settings:
+        settings["confidence"] = min(1.0, max(0.1, settings["confidence"]))
+
+    if "search_regions" in settings:
+        regions = []
+        for region in settings["search_regions"]:
+            if (valid_area(region) and isinstance(region.get("name"), str) and region["name"]
+                    and region["x1"] is not None):
+                regions.append(region)
+            else:
+                problems.append("invalid search area entry")
+        settings["search_regions"] = regions
+
+    if "target_images" in settings:
+        entries = []
+        for entry in settings["target_images"]:
+            if isinstance(entry, dict) and isinstance(entry.get("path"), str) and entry["path"]:
+                for key, types in ENTRY_TYPES.items():
+                    # bool is an int, but not a valid priority or cooldown
+                    if key in entry and (not isinstance(entry[key], types)
+                                         or (types is not bool and isinstance(entry[key], bool))):
+                        problems.append(f"invalid {key} of {os.path.basename(entry['path'])}")
+                        del entry[key]
+                entries.append(entry)
+            else:
+                problems.append("invalid target image entry")
+        settings["target_images"] = entries
+    return settings, problems
+
+
+def read_settings(path):
+    """Read, migrate and validate a settings file, returning (settings, problems)."""
+    with open(path, "r") as f:
+        settings = json.load(f)
+    if not isinstance(settings, dict):
+        raise ValueError("Settings file does not contain a settings object")
+    return validate_settings(migrate_settings(settings))
+
+
+def write_atomic(path, text):
+    """Write text to path through a temporary file, so readers never see half a file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=directory)
+    try:
+        # Keep the permissions of the file being replaced, mkstemp makes it private
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else SETTINGS_FILE_MODE
+        os.chmod(temp_path, mode)
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SettingsStore:
+    """Load settings.json and save it in the background, coalescing quick changes.
+
+    save() only takes a snapshot, the file is written by a worker thread
+    once no change came in for delay seconds. on_error(message) is called
+    from that thread when writing fails.
+    """
+
+    def __init__(self, path, delay=SAVE_DELAY, max_delay=SAVE_MAX_DELAY, on_error=None):
+        self.path = path
+        self.delay = delay
+        self.max_delay = max_delay
+        self.on_error = on_error
+        # Text waiting to be written, and the last text written or read
+        self._pending = None
+        self._written = None
+        self._first_change = 0.0
+        self._last_change = 0.0
+        self._closed = False
+        self._condition = threading.Condition()
+        # Held while taking and writing the pending text, so writes keep their order
+        self._write_lock = threading.Lock()
+        self._thread = None
+
+    def load(self):
+        """Return (settings, problems), or (None, []) if there is no settings file."""
+        if not os.path.exists(self.path):
+            return None, []
+        settings, problems = read_settings(self.path)
+        with self._condition:
+            self._written = self._dump(settings)
+        return settings, problems
+
+    def save(self, settings):
+        """Schedule settings to be written, replacing any unsaved earlier change."""
+        settings = dict(settings)
+        settings["version"] = SETTINGS_VERSION
+        # Serialized now, the caller may keep changing its dicts
+        text = self._dump(settings)
+        with self._condition:
+            if self._closed:
+                return
+            now = time.monotonic()
+            if self._pending is None:
+                self._first_change = now
+            self._pending = text
+            self._last_change = now
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="settings-writer")
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+
+    def flush(self):
+        """Write any unsaved change now, on the calling thread."""
+        with self._write_lock:
+            with self._condition:
+                text, self._pending = self._pending, None
+            if text is not None:
+                self._write(text)
+
+    def close(self):
+        """Write unsaved changes and stop the worker thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _dump(self, settings):
+        """Return settings as the text saved to the file."""
+        return json.dumps(settings, indent=4)
+
+    def _run(self):
+        """Write pending changes once they settle, until closed."""
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                deadline = min(self._last_change + self.delay, self._first_change + self.max_delay)
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    # Another change may push the deadline back
+                    self._condition.wait(remaining)
+                    continue
+            self.flush()
+
+    def _write(self, text):
+        """Write text unless the file already holds it."""
+        with self._condition:
+            if text == self._written:
+                return
+        try:
+            write_atomic(self.path, text)
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(f"Error saving settings: {str(e)}")
+            return
+        with self._condition:
+            self._written = text
@@ -0,0 +1,128 @@
+"""
+Startup profiling for Auto Clicker with Image Detection.
+Run the app with --profile-startup to print how long each module takes to
+import and each startup step takes to run, then exit.
+"""
+import sys
+import time
+import builtins
+import importlib
+import threading
+from contextlib import contextmanager
+
+# Modules loaded on first use, timed after startup to show what was saved
+DEFERRED_MODULES = ("numpy", "cv2", "mss", "pyautogui")
+
+# Imports faster than this are left out of the report
+MIN_REPORTED_MS = 1.0
+
+# Active profile, None unless enable() was called
+_profile = None
+
+
+class StartupProfile:
+    """Measure import time per top-level package and named startup steps."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # Package -> seconds spent importing it, excluding nested imports of other packages
+        self.imports = {}
+        self.steps = []
+        self._stack = []
+        self._thread = threading.get_ident()
+        self._original_import = builtins.__import__
+
+    def install(self):
+        """Start timing import statements."""
+        builtins.__import__ = self._import
+
+    def uninstall(self):
+        """Stop timing import statements."""
+        builtins.__import__ = self._original_import
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """Timed replacement for builtins.__import__."""
+        if level or name in sys.modules or threading.get_ident() != self._thread:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            package = name.partition(".")[0]
+            self.imports[package] = self.imports.get(package, 0.0) + elapsed - nested
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    @contextmanager
+    def step(self, name):
+        """Time the body of a with block as a startup step."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - start))
+
+    def report(self, deferred=DEFERRED_MODULES):
+        """Return the profile as text."""
+        total = time.perf_counter() - self.start
+        self.uninstall()
+
+        lines = [f"Startup took {total * 1000:.0f} ms", "", "Imports (excluding nested packages):"]
+        for package, seconds in sorted(self.imports.items(), key=lambda item: -item[1]):
+            if seconds * 1000 >= MIN_REPORTED_MS:
+                lines.append(f"  {package:<24} {seconds * 1000:8.1f} ms")
+
+        lines.append("")
+        lines.append("Startup steps:")
+        for name, seconds in self.steps:
+            lines.append(f"  {name:<24} {seconds * 1000:8.1f} ms")
+
+        # Show what the deferred modules would have added
+        lines.append("")
+        lines.append("Deferred until first use:")
+        for name in deferred:
+            if name in sys.modules:
+                lines.append(f"  {name:<24} already loaded at startup")
+                continue
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                lines.append(f"  {name:<24} not available ({type(e).__name__})")
+                continue
+            lines.append(f"  {name:<24} {(time.perf_counter() - start) * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+def enable():
+    """Start profiling, call it before the imports to be measured."""
+    global _profile
+    if _profile is None:
+        _profile = StartupProfile()
+        _profile.install()
+    return _profile
+
+
+def enabled():
+    """Check whether startup profiling is on."""
+    return _profile is not None
+
+
+@contextmanager
+def step(name):
+    """Time a startup step when profiling, do nothing otherwise."""
+    if _profile is None:
+        yield
+        return
+    with _profile.step(name):
+        yield
+
+
+def report():
+    """Print the profile."""
+    if _profile is not None:
+        print(_profile.report(), flush=True)
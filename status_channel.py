@@ -0,0 +1,63 @@
+"""
+Status updates from worker threads to the GUI of Auto Clicker with Image Detection.
+Workers overwrite the latest state instead of queueing one Qt event per
+update, and the GUI reads it on a timer, so the cost for the GUI stays the
+same however fast the search loop runs.
+"""
+import itertools
+
+
+class StatusChannel:
+    """Latest status message, hit counter and stop notice, posted from any thread.
+
+    Posting only assigns one attribute or advances an itertools counter,
+    both atomic in CPython, so it never takes a lock or blocks. drain()
+    returns what changed since the previous drain; status messages posted
+    in between are dropped except the newest.
+    """
+
+    def __init__(self):
+        # Orders status messages and stop notices posted from different threads
+        self._sequence = itertools.count(1)
+        self._hit_counter = itertools.count(1)
+        # (sequence, message) of the newest post, replaced as a whole
+        self._status = (0, None)
+        self._stopped = (0, None)
+        self._hits = 0
+        # What the last drain() saw
+        self._seen_status = 0
+        self._seen_stopped = 0
+        self._seen_hits = 0
+
+    def post_status(self, message):
+        """Set the status message shown next."""
+        self._status = (next(self._sequence), message)
+
+    def post_found(self):
+        """Count a hit."""
+        self._hits = next(self._hit_counter)
+
+    def post_stopped(self, message=None):
+        """Report that the search loop ended, with an optional reason."""
+        self._stopped = (next(self._sequence), message)
+
+    def drain(self):
+        """Return (newest status or None, hits since last drain, stopped, stop message).
+
+        A status posted before the stop notice is left out, the stop
+        message replaces it.
+        """
+        status_sequence, status = self._status
+        stopped_sequence, stop_message = self._stopped
+        # Two threads posting hits at once may store their counts out of order
+        hits = max(self._hits, self._seen_hits)
+
+        stopped = stopped_sequence > self._seen_stopped
+        if status_sequence <= self._seen_status or (stopped and status_sequence < stopped_sequence):
+            status = None
+        new_hits = hits - self._seen_hits
+
+        self._seen_status = max(self._seen_status, status_sequence)
+        self._seen_stopped = max(self._seen_stopped, stopped_sequence)
+        self._seen_hits = hits
+        return status, new_hits, stopped, stop_message
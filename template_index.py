@@ -0,0 +1,249 @@
+"""
+Template pre-filtering for Auto Clicker with Image Detection.
+Before the full match, each target image is checked against cheap color
+and thumbnail statistics of the frame, so with hundreds of target images only those that
+can plausibly be on screen are matched.
+"""
+import threading
+
+from lazy import lazy_import, module_available
+from matching import IMAGE_EDGES, METHOD_TEMPLATE
+
+# Color statistics are computed with NumPy, OpenCV only makes them faster
+TEMPLATE_INDEX_AVAILABLE = module_available("numpy")
+OPENCV_AVAILABLE = module_available("cv2")
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Colors are counted in a histogram of HISTOGRAM_LEVELS^3 bins
+HISTOGRAM_LEVELS = 8
+# Share of a template's pixels whose colors must appear in the frame
+MIN_COLOR_COVER = 0.95
+
+# Square window sizes templates are grouped by, each template uses the largest that fits
+WINDOW_SIZES = (8, 16, 32, 64, 128)
+# Windows are hashed by the mean color of their 2x2 quarters, in this many levels per channel
+THUMBNAIL_LEVELS = 8
+# Quarter means this close to a level boundary also count as the next level
+THUMBNAIL_MARGIN = 3.0
+# Templates with more possible codes than this skip the thumbnail check
+THUMBNAIL_MAX_CODES = 64
+# Window codes are hashed into a table of 2^THUMBNAIL_BITS flags per size group
+THUMBNAIL_BITS = 22
+# Odd multiplier spreading the codes over the table
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+def color_array(image):
+    """Return an image as a BGR uint8 array."""
+    if hasattr(image, "shape"):
+        if image.ndim == 2:
+            return np.repeat(image[:, :, np.newaxis], 3, axis=2)
+        return image
+    return np.asarray(image.convert("RGB"))[:, :, ::-1]
+
+
+def color_bins(image, levels):
+    """Return the histogram bin of every pixel, levels^3 bins in total."""
+    shift = 8 - (levels - 1).bit_length()
+    quantized = (image >> shift).astype(np.int32)
+    return (quantized[:, :, 0] * levels + quantized[:, :, 1]) * levels + quantized[:, :, 2]
+
+
+def grow_bins(present, levels):
+    """Mark the neighbors of every present bin, so small color shifts still count."""
+    cube = present.reshape(levels, levels, levels)
+    grown = cube.copy()
+    for axis in range(3):
+        for shift in (1, -1):
+            grown |= np.roll(cube, shift, axis=axis) & ~edge_mask(levels, axis, shift)
+    return grown.ravel()
+
+
+def edge_mask(levels, axis, shift):
+    """Mask the bins np.roll wrapped around, which aren't neighbors."""
+    mask = np.zeros((levels, levels, levels), dtype=bool)
+    index = [slice(None)] * 3
+    index[axis] = 0 if shift > 0 else levels - 1
+    mask[tuple(index)] = True
+    return mask
+
+
+def window_size(width, height):
+    """Return the window size group of a template, or None if it's too small."""
+    fitting = [size for size in WINDOW_SIZES if size <= min(width, height)]
+    return fitting[-1] if fitting else None
+
+
+def block_means(image, size):
+    """Return the mean color of every size x size block, indexed by its top-left corner."""
+    height, width = image.shape[:2]
+    if OPENCV_AVAILABLE:
+        means = cv2.boxFilter(image, cv2.CV_32F, (size, size), anchor=(0, 0),
+                              borderType=cv2.BORDER_REPLICATE)
+        return means[:height - size + 1, :width - size + 1]
+    table = np.zeros((height + 1, width + 1, image.shape[2]))
+    table[1:, 1:] = image.cumsum(axis=0, dtype=np.float64).cumsum(axis=1)
+    sums = table[size:, size:] - table[:-size, size:] - table[size:, :-size] + table[:-size, :-size]
+    return (sums / float(size * size)).astype(np.float32)
+
+
+def quarter_code(levels):
+    """Combine the B, G and R levels of a quarter into one number."""
+    count = THUMBNAIL_LEVELS
+    return (levels[..., 0] * count + levels[..., 1]) * count + levels[..., 2]
+
+
+def thumbnail_hash(top_left, top_right, bottom_left, bottom_right):
+    """Hash the four quarter codes of a window to a table index."""
+    count = np.uint64(THUMBNAIL_LEVELS ** 3)
+    code = top_left.astype(np.uint64)
+    for quarter in (top_right, bottom_left, bottom_right):
+        code = code * count + quarter.astype(np.uint64)
+    return (code * np.uint64(HASH_MULTIPLIER)) >> np.uint64(64 - THUMBNAIL_BITS)
+
+
+class FrameStats:
+    """Colors present in a frame, and thumbnail hashes of its windows per size group."""
+
+    def __init__(self, image):
+        self.image = color_array(image)
+        bins = color_bins(self.image, HISTOGRAM_LEVELS)
+        counts = np.bincount(bins.ravel(), minlength=HISTOGRAM_LEVELS ** 3)
+        self.colors = grow_bins(counts > 0, HISTOGRAM_LEVELS)
+        # Window size -> thumbnail hashes present, computed when a template needs them
+        self._thumbnails = {}
+        self._lock = threading.Lock()
+
+    def thumbnails(self, size):
+        """Return which thumbnail hashes occur among the size x size windows, or None."""
+        with self._lock:
+            if size not in self._thumbnails:
+                self._thumbnails[size] = self._window_thumbnails(size)
+            return self._thumbnails[size]
+
+    def _window_thumbnails(self, size):
+        """Mark the thumbnail hash of every window that fits in the frame."""
+        height, width = self.image.shape[:2]
+        if size > width or size > height:
+            return None
+        half = size // 2
+        step = 256.0 / THUMBNAIL_LEVELS
+        codes = quarter_code(np.minimum((block_means(self.image, half) / step).astype(np.int64),
+                                        THUMBNAIL_LEVELS - 1))
+        rows, columns = height - size + 1, width - size + 1
+        hashes = thumbnail_hash(codes[:rows, :columns], codes[:rows, half:half + columns],
+                                codes[half:half + rows, :columns], codes[half:half + rows, half:half + columns])
+        table = np.zeros(1 << THUMBNAIL_BITS, dtype=bool)
+        table[hashes.ravel()] = True
+        return table
+
+
+class TemplateStats:
+    """Color histogram and center window thumbnail hashes of a template."""
+
+    def __init__(self, image):
+        image = color_array(image)
+        height, width = image.shape[:2]
+        bins = color_bins(image, HISTOGRAM_LEVELS).ravel()
+        # Bins the template uses, with their share of its pixels
+        counts = np.bincount(bins, minlength=HISTOGRAM_LEVELS ** 3)
+        self.bins = np.flatnonzero(counts)
+        self.shares = counts[self.bins] / float(bins.size)
+        # Any window fully inside the template on screen sees the same pixels
+        self.size = window_size(width, height)
+        self.hashes = None
+        if self.size is not None:
+            x = (width - self.size) // 2
+            y = (height - self.size) // 2
+            half = self.size // 2
+            window = image[y:y + self.size, x:x + self.size].astype(np.float32)
+            quarters = [window[top:top + half, left:left + half].reshape(-1, 3).mean(axis=0)
+                        for top in (0, half) for left in (0, half)]
+            self.hashes = self._hashes(quarters)
+
+    def _hashes(self, quarters):
+        """Return every hash the center window may get, allowing for near-boundary means.
+
+        Returns None if there are too many to check.
+        """
+        step = 256.0 / THUMBNAIL_LEVELS
+        choices = []
+        for means in quarters:
+            options = [[]]
+            for mean in means:
+                level = min(int(mean / step), THUMBNAIL_LEVELS - 1)
+                levels = [level]
+                if mean - level * step < THUMBNAIL_MARGIN and level > 0:
+                    levels.append(level - 1)
+                if (level + 1) * step - mean < THUMBNAIL_MARGIN and level < THUMBNAIL_LEVELS - 1:
+                    levels.append(level + 1)
+                options = [option + [value] for option in options for value in levels]
+            choices.append([int(quarter_code(np.array(option))) for option in options])
+        if np.prod([len(choice) for choice in choices]) > THUMBNAIL_MAX_CODES:
+            return None
+        quarters = [np.array(choice) for choice in choices]
+        grid = np.meshgrid(*quarters, indexing="ij")
+        return [int(value) for value in thumbnail_hash(*[axis.ravel() for axis in grid])]
+
+    def plausible(self, frame_stats, check_thumbnails=True):
+        """Check whether the template could appear unchanged in the frame."""
+        cover = self.shares[frame_stats.colors[self.bins]].sum()
+        if cover < MIN_COLOR_COVER:
+            return False
+        if check_thumbnails and self.hashes is not None:
+            thumbnails = frame_stats.thumbnails(self.size)
+            if thumbnails is None or not any(thumbnails[code] for code in self.hashes):
+                return False
+        return True
+
+
+class TemplateIndex:
+    """Skip target images that can't be on screen, judged by colors and thumbnails.
+
+    Assumes a target appears with the colors it was saved with (give or
+    take a shade), true for screen content but not for brightness changes
+    that matching in edge mode tolerates. Edge mode and keypoint feature
+    images are never skipped. Template statistics are computed once per
+    image and cached; frame statistics once per frame, or kept while the
+    frame doesn't change.
+    """
+
+    def __init__(self):
+        # Search area -> FrameStats of the last frame
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Forget the statistics of previous frames."""
+        with self._lock:
+            self._frames.clear()
+
+    def frame_stats(self, frame):
+        """Return the FrameStats of a frame, reusing the last one if nothing changed."""
+        with self._lock:
+            previous = self._frames.get(frame.region)
+        if previous is not None and frame.dirty == []:
+            return previous
+        stats = frame.derived("index_stats", FrameStats)
+        with self._lock:
+            self._frames[frame.region] = stats
+        return stats
+
+    def candidates(self, jobs, check_thumbnails=True):
+        """Split (frame, template) jobs into (plausible, skipped) lists, keeping their order.
+
+        check_thumbnails should be False when templates are also matched
+        resized, their thumbnails change with the scale.
+        """
+        plausible, skipped = [], []
+        for frame, template in jobs:
+            if template.image_mode == IMAGE_EDGES or template.method != METHOD_TEMPLATE:
+                plausible.append((frame, template))
+                continue
+            stats = template.derived("index_stats", TemplateStats)
+            if stats.plausible(self.frame_stats(frame), check_thumbnails):
+                plausible.append((frame, template))
+            else:
+                skipped.append((frame, template))
+        return plausible, skipped
@@ -0,0 +1,131 @@
+"""
+Template store for Auto Clicker with Image Detection.
+Decodes each target image once and keeps it in memory until the file changes.
+"""
+import os
+import threading
+from PIL import Image
+
+from lazy import lazy_import, module_available
+from matching import IMAGE_COLOR, METHOD_TEMPLATE
+
+# Check if OpenCV is installed, it is only imported once an image is decoded
+OPENCV_AVAILABLE = module_available("cv2")
+cv2 = lazy_import("cv2")
+
+
+class Template:
+    """A decoded target image together with its precomputed data."""
+
+    def __init__(self, path, image, width, height, mtime, size,
+                 image_mode=IMAGE_COLOR, method=METHOD_TEMPLATE):
+        self.path = path
+        # BGR array when OpenCV is available, PIL image otherwise
+        self.image = image
+        self.width = width
+        self.height = height
+        # File signature used to detect changes on disk
+        self.mtime = mtime
+        self.size = size
+        # How the image is compared, from the target image settings, see variant()
+        self.image_mode = image_mode
+        self.method = method
+        # Data derived from the image, e.g. downscaled copies
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived(self, key, build):
+        """Return build(self.image), computing it only once per key."""
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = build(self.image)
+            return self._derived[key]
+
+    def variant(self, image_mode, method=METHOD_TEMPLATE):
+        """Return this image compared in image_mode and found by method.
+
+        Variants share the decoded image but keep their own derived data,
+        so target images with the same file and other settings don't mix.
+        """
+        if image_mode == self.image_mode and method == self.method:
+            return self
+        return self.derived(("variant", image_mode, method), lambda image: Template(
+            self.path, image, self.width, self.height, self.mtime, self.size, image_mode, method
+        ))
+
+
+class TemplateCache:
+    """Keep decoded target images in memory, reloading only changed files."""
+
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def add(self, path):
+        """Decode an image and add it to the cache."""
+        with self._lock:
+            return self._refresh(path)
+
+    def get(self, path, image_mode=IMAGE_COLOR, method=METHOD_TEMPLATE):
+        """Return the cached template in image_mode and found by method, reloading it if the file changed."""
+        with self._lock:
+            template = self._refresh(path)
+        if template is None:
+            return None
+        return template.variant(image_mode, method)
+
+    def remove(self, path):
+        """Drop an image from the cache."""
+        with self._lock:
+            self._templates.pop(path, None)
+
+    def clear(self):
+        """Drop all cached images."""
+        with self._lock:
+            self._templates.clear()
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._templates
+
+    def __len__(self):
+        with self._lock:
+            return len(self._templates)
+
+    def _refresh(self, path):
+        """Return an up-to-date entry for path, or None if it can't be read."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._templates.pop(path, None)
+            return None
+
+        template = self._templates.get(path)
+        if (template is not None and
+                template.mtime == stat.st_mtime and
+                template.size == stat.st_size):
+            return template
+
+        template = self._load(path, stat)
+        if template is None:
+            self._templates.pop(path, None)
+        else:
+            self._templates[path] = template
+        return template
+
+    def _load(self, path, stat):
+        """Decode an image file into a template entry."""
+        if OPENCV_AVAILABLE:
+            image = cv2.imread(path)
+            if image is None:
+                return None
+            height, width = image.shape[:2]
+        else:
+            try:
+                with Image.open(path) as img:
+                    image = img.convert("RGB")
+            except OSError:
+                return None
+            width, height = image.width, image.height
+
+        return Template(path, image, width, height, stat.st_mtime, stat.st_size)